@@ -1,9 +1,12 @@
-import React, { useState, useCallback } from 'react';
+import React, { useState, useCallback, useRef } from 'react';
 import { useDropzone } from 'react-dropzone';
 import { FaSearch, FaUpload } from 'react-icons/fa';
 import { DotBackground } from './components/DotBackground';
 import { FaBolt } from 'react-icons/fa';
 
+// Typing pause (ms) before the completions of the current word are requested
+const SUGGEST_DELAY_MS = 150;
+
 export default function App() {
   const [searchQuery, setSearchQuery] = useState('');
   const [jsonFile, setJsonFile] = useState(null);
@@ -12,9 +15,61 @@ export default function App() {
   const [selectedDocumentIndex, setSelectedDocumentIndex] = useState(null);
   const [documentLimit, setDocumentLimit] = useState(5); 
   const [fileUploading, setFileUploading] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
+  // Pending suggestion timer, in-flight suggestion request and the latest input value
+  const suggestTimer = useRef(null);
+  const suggestRequest = useRef(null);
+  const latestQuery = useRef('');
+
+  const fetchSuggestions = async (value) => {
+    // Complete the word being typed
+    const words = value.split(' ');
+    const prefix = words[words.length - 1];
+
+    if (suggestRequest.current) {
+      suggestRequest.current.abort();
+    }
+    const controller = new AbortController();
+    suggestRequest.current = controller;
+
+    try {
+      const response = await fetch(
+        `http://localhost:3000/api/suggest?prefix=${encodeURIComponent(prefix)}&limit=8`,
+        { signal: controller.signal }
+      );
+      if (!response.ok) {
+        return;
+      }
+      const result = await response.json();
+      // Drop a reply for input that has changed since it was requested
+      if (latestQuery.current !== value) {
+        return;
+      }
+      const head = words.slice(0, -1).join(' ');
+      setSuggestions(result.map(({ term }) => (head ? `${head} ${term}` : term)));
+    } catch (error) {
+      if (error.name !== 'AbortError') {
+        console.error('Error fetching suggestions:', error);
+      }
+    }
+  };
 
   const handleSearchChange = (event) => {
-    setSearchQuery(event.target.value);
+    const value = event.target.value;
+    setSearchQuery(value);
+    latestQuery.current = value;
+
+    // Ask for suggestions once typing pauses for SUGGEST_DELAY_MS, not on every keystroke
+    clearTimeout(suggestTimer.current);
+    const words = value.split(' ');
+    if (!words[words.length - 1]) {
+      if (suggestRequest.current) {
+        suggestRequest.current.abort();
+      }
+      setSuggestions([]);
+      return;
+    }
+    suggestTimer.current = setTimeout(() => fetchSuggestions(value), SUGGEST_DELAY_MS);
   };
 
   const handleFileChange = (event) => {
@@ -133,8 +188,14 @@ export default function App() {
                   value={searchQuery}
                   onChange={handleSearchChange}
                   placeholder="Enter search query"
+                  list="search-suggestions"
                   className="appearance-none bg-transparent border-none w-full text-white mr-3 py-1 px-2 leading-tight focus:outline-none"
                 />
+                <datalist id="search-suggestions">
+                  {suggestions.map((suggestion) => (
+                    <option key={suggestion} value={suggestion} />
+                  ))}
+                </datalist>
                 <button
                   type="submit"
                   className="flex-shrink-0 bg-blue-500 hover:bg-blue-700 border-blue-500 hover:border-blue-700 text-sm border-4 text-white py-1 px-2 rounded"
@@ -0,0 +1,407 @@
+import os
+import sys
+import lzma
+import mmap
+import time
+import zlib
+import struct
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Make the sibling documentIndex module importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from documentIndex import scan_records, parse_record
+
+# Column store of a DocumentBarrel 'barrel_X_to_Y.csv', derived from the CSV like its '.idx':
+#   barrel_X_to_Y.col   fixed-width arrays indexed by document position (documents sorted by Id):
+#                       Id, Score, CreationDate, an (offset, length) pair per text field, then the block index
+#   barrel_X_to_Y.txt   Title and Tag, the small text a result list shows, uncompressed
+#   barrel_X_to_Y.blob  Body, Answer and combined_token_ids of consecutive documents, packed into independently
+#                       compressed blocks of about BLOCK_BYTES; a blob offset is (block << 32) | offset in block
+# All three files start with the same build stamp so a reader never pairs columns with another build's text.
+# Once a store exists the CSV may be removed (see migrateDocumentStore.py); the store is then the only copy.
+# Stores are built by uploads, the compactor and migrateDocumentStore.py; queries only read current ones and fall
+# back to the CSV (through its '.idx') for a barrel whose store is missing or older than the CSV.
+COLUMN_MAGIC = b'BCOL'
+COLUMN_VERSION = 2
+# magic, version, codec, reserved, build stamp, document count, size of the source CSV, block count
+PREFIX = struct.Struct('<4sIIIQQQQ')
+STAMP = struct.Struct('<Q')
+DATE_WIDTH = 32
+NULL_INT = -2**63
+BLOCK_SHIFT = 32
+BLOCK_MASK = (1 << BLOCK_SHIFT) - 1
+
+TEXT_FIELDS = ('Title', 'Tag')
+BLOB_FIELDS = ('Body', 'Answer', 'combined_token_ids')
+HEAP_SUFFIX = {**{field: '.txt' for field in TEXT_FIELDS}, **{field: '.blob' for field in BLOB_FIELDS}}
+FIXED_FIELDS = ('Id', 'Score', 'CreationDate')
+
+BLOCK_BYTES = int(os.environ.get('BOLT_DOC_BLOCK_BYTES', 64 * 1024))
+BLOCK_CACHE_BYTES = int(os.environ.get('BOLT_DOC_BLOCK_CACHE_BYTES', 32 * 1024 * 1024))
+CODECS = {
+    'zlib': (1, lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (2, lzma.compress, lzma.decompress),
+}
+DECOMPRESSORS = {codec_id: decompress for codec_id, _, decompress in CODECS.values()}
+DEFAULT_CODEC = os.environ.get('BOLT_DOC_CODEC', 'zlib')
+
+_store_lock = threading.Lock()
+_open_stores = {}  # barrel_path -> ColumnStore
+_block_cache = OrderedDict()  # (blob path, stamp, block) -> decompressed bytes
+_block_cache_bytes = [0]
+_block_stats = {'hits': 0, 'misses': 0}
+
+
+def column_paths(barrel_path):
+    base = os.path.splitext(barrel_path)[0]
+    return {suffix: base + suffix for suffix in ('.col', '.txt', '.blob')}
+
+
+def has_column_store(barrel_path):
+    return os.path.exists(column_paths(barrel_path)['.col'])
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return NULL_INT
+
+
+def read_csv_documents(barrel_path):
+    """Parses a DocumentBarrel CSV into {Id: row dict}; a re-appended Id replaces the earlier row, as in the '.idx'."""
+    documents = {}
+    with open(barrel_path, 'rb') as f:
+        records = scan_records(f)
+        header_record = next(records, None)
+        if header_record is None:
+            raise ValueError(f"Document barrel {barrel_path} is empty")
+        header = parse_record(header_record[1])
+        if 'Id' not in header:
+            raise ValueError(f"Document barrel {barrel_path} has no 'Id' column")
+        for _, raw in records:
+            row = dict(zip(header, parse_record(raw)))
+            doc_id = _to_int(row.get('Id'))
+            if doc_id != NULL_INT:
+                documents[doc_id] = row
+    return documents
+
+
+def write_column_store(barrel_path, documents, source_size=0, codec=DEFAULT_CODEC, block_bytes=BLOCK_BYTES):
+    """
+    Writes the column, text and compressed blob files of a DocumentBarrel.
+
+    Args:
+        barrel_path (str): Path of the 'barrel_X_to_Y.csv' the store belongs to (the CSV itself may not exist).
+        documents (dict): Id -> row dict (values as strings or None).
+        source_size (int): Size of the CSV the rows were read from, to detect later appends.
+        codec (str): 'zlib' or 'lzma'.
+        block_bytes (int): Uncompressed size at which a blob block is closed.
+
+    Returns:
+        int: Number of documents stored.
+    """
+    codec_id, compress, _ = CODECS[codec]
+    ids = sorted(documents)
+    stamp = time.time_ns()
+    paths = column_paths(barrel_path)
+    text_heap = bytearray(STAMP.pack(stamp))
+    blob_file = bytearray(STAMP.pack(stamp))
+    block = bytearray()
+    blocks = []  # (file offset, compressed length)
+
+    def close_block():
+        compressed = compress(bytes(block))
+        blocks.append((len(blob_file), len(compressed)))
+        blob_file.extend(compressed)
+        block.clear()
+
+    text_columns = {field: ([], []) for field in TEXT_FIELDS + BLOB_FIELDS}
+    scores, dates = [], bytearray()
+    for doc_id in ids:
+        row = documents[doc_id]
+        score = row.get('Score')
+        scores.append(_to_int(score) if score not in (None, '') else NULL_INT)
+        dates += str(row.get('CreationDate') or '').encode('utf-8')[:DATE_WIDTH].ljust(DATE_WIDTH, b'\0')
+
+        # A document's blob fields always share one block, so reading it decompresses a single block
+        if len(block) >= block_bytes:
+            close_block()
+        for field, (offsets, lengths) in text_columns.items():
+            value = row.get(field)
+            encoded = str(value).encode('utf-8') if value not in (None, '') else None
+            if field in TEXT_FIELDS:
+                offsets.append(len(text_heap))
+                if encoded is not None:
+                    text_heap.extend(encoded)
+            else:
+                offsets.append((len(blocks) << BLOCK_SHIFT) | len(block))
+                if encoded is not None:
+                    block.extend(encoded)
+            lengths.append(len(encoded) if encoded is not None else -1)  # Empty cells read back as None
+    if block:
+        close_block()
+
+    count = len(ids)
+    temp = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(paths['.txt'] + temp, 'wb') as f:
+        f.write(text_heap)
+    with open(paths['.blob'] + temp, 'wb') as f:
+        f.write(blob_file)
+    with open(paths['.col'] + temp, 'wb') as f:
+        f.write(PREFIX.pack(COLUMN_MAGIC, COLUMN_VERSION, codec_id, 0, stamp, count, source_size, len(blocks)))
+        f.write(struct.pack(f'<{count}q', *ids))
+        f.write(struct.pack(f'<{count}q', *scores))
+        f.write(dates)
+        for field in TEXT_FIELDS + BLOB_FIELDS:
+            offsets, lengths = text_columns[field]
+            f.write(struct.pack(f'<{count}q', *offsets))
+            f.write(struct.pack(f'<{count}q', *lengths))
+        f.write(struct.pack(f'<{len(blocks)}q', *(offset for offset, _ in blocks)))
+        f.write(struct.pack(f'<{len(blocks)}q', *(length for _, length in blocks)))
+
+    # The text heaps go first: readers check the stamps and retry on a half-published build
+    for suffix in ('.txt', '.blob', '.col'):
+        os.replace(paths[suffix] + temp, paths[suffix])
+    return count
+
+
+def build_column_store(barrel_path, codec=DEFAULT_CODEC):
+    """
+    Builds the column store of a DocumentBarrel from its CSV.
+
+    Returns:
+        int: Number of documents stored.
+    """
+    source_size = os.path.getsize(barrel_path)
+    return write_column_store(barrel_path, read_csv_documents(barrel_path), source_size, codec)
+
+
+def add_documents(barrel_path, documents):
+    """
+    Adds documents (Id -> row dict) to a DocumentBarrel that only exists as a column store,
+    skipping Ids it already holds.
+
+    Returns:
+        int: Number of documents added.
+    """
+    current = get_column_store(barrel_path).all_documents()
+    added = {doc_id: row for doc_id, row in documents.items() if int(doc_id) not in current}
+    if added:
+        current.update((int(doc_id), row) for doc_id, row in added.items())
+        write_column_store(barrel_path, current)
+    return len(added)
+
+
+def _map(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class StaleColumnStore(Exception):
+    """Raised when the column and text files of a store come from different builds."""
+
+
+class ColumnStoreVersionError(ValueError):
+    """Raised for column files written by another version of this module."""
+
+
+class OutdatedColumnStore(Exception):
+    """Raised when a DocumentBarrel has no usable column store yet: read its CSV instead."""
+
+
+class ColumnStore:
+    """Memory-mapped column store of one DocumentBarrel; text is only paged in (and decompressed) when read."""
+
+    def __init__(self, barrel_path):
+        paths = column_paths(barrel_path)
+        self.columns = _map(paths['.col'])
+        magic, version, self.codec, _, self.stamp, self.count, self.source_size, self.block_count = \
+            PREFIX.unpack_from(self.columns, 0)
+        if magic != COLUMN_MAGIC or version != COLUMN_VERSION:
+            raise ColumnStoreVersionError(f"{paths['.col']} is not a version {COLUMN_VERSION} column store")
+        self.decompress = DECOMPRESSORS[self.codec]
+        self.mtime = os.path.getmtime(paths['.col'])
+        self.blob_path = paths['.blob']
+
+        view = memoryview(self.columns)
+        position = PREFIX.size
+        width = 8 * self.count
+        self.ids = view[position:position + width].cast('q')
+        self.scores = view[position + width:position + 2 * width].cast('q')
+        position += 2 * width
+        self.dates = view[position:position + DATE_WIDTH * self.count]
+        position += DATE_WIDTH * self.count
+        self.text_columns = {}
+        for field in TEXT_FIELDS + BLOB_FIELDS:
+            offsets = view[position:position + width].cast('q')
+            lengths = view[position + width:position + 2 * width].cast('q')
+            self.text_columns[field] = (offsets, lengths)
+            position += 2 * width
+        block_width = 8 * self.block_count
+        self.block_offsets = view[position:position + block_width].cast('q')
+        self.block_lengths = view[position + block_width:position + 2 * block_width].cast('q')
+
+        self.heaps = {suffix: _map(paths[suffix]) for suffix in ('.txt', '.blob')}
+        for heap in self.heaps.values():
+            if len(heap) < STAMP.size or STAMP.unpack_from(heap, 0)[0] != self.stamp:
+                raise StaleColumnStore(barrel_path)
+
+    def position(self, doc_id):
+        """Document position of an Id, or None when the barrel does not hold it."""
+        position = bisect_left(self.ids, doc_id)
+        if position < self.count and self.ids[position] == doc_id:
+            return position
+        return None
+
+    def block(self, number, counters=None):
+        """
+        Decompressed blob block, served from the shared LRU when it was read recently.
+        A hit or miss is also added to counters when given (the caller's per-read counts).
+        """
+        key = (self.blob_path, self.stamp, number)
+        with _store_lock:
+            data = _block_cache.get(key)
+            outcome = 'hits' if data is not None else 'misses'
+            _block_stats[outcome] += 1
+            if data is not None:
+                _block_cache.move_to_end(key)
+        if counters is not None:
+            name = f"document_block_cache_{outcome}"
+            counters[name] = counters.get(name, 0) + 1
+        if data is not None:
+            return data
+
+        offset = self.block_offsets[number]
+        data = self.decompress(self.heaps['.blob'][offset:offset + self.block_lengths[number]])
+        with _store_lock:
+            _block_cache[key] = data
+            _block_cache_bytes[0] += len(data)
+            while _block_cache_bytes[0] > BLOCK_CACHE_BYTES and len(_block_cache) > 1:
+                _block_cache_bytes[0] -= len(_block_cache.popitem(last=False)[1])
+        return data
+
+    def value(self, position, field, counters=None):
+        if field == 'Id':
+            return self.ids[position]
+        if field == 'Score':
+            score = self.scores[position]
+            return None if score == NULL_INT else score
+        if field == 'CreationDate':
+            date = bytes(self.dates[position * DATE_WIDTH:(position + 1) * DATE_WIDTH]).rstrip(b'\0')
+            return date.decode('utf-8', errors='replace') or None
+        offsets, lengths = self.text_columns[field]
+        length = lengths[position]
+        if length < 0:
+            return None
+        offset = offsets[position]
+        if field in TEXT_FIELDS:
+            data = self.heaps['.txt']
+        else:
+            data = self.block(offset >> BLOCK_SHIFT, counters)
+            offset &= BLOCK_MASK
+        return data[offset:offset + length].decode('utf-8', errors='replace')
+
+    def read(self, doc_ids, fields, counters=None):
+        """
+        Reads the requested fields of the given documents.
+
+        Args:
+            doc_ids (list): Document IDs to fetch.
+            fields (list): Field names, e.g. ['Id', 'Title', 'Score'].
+            counters (dict): Optional counter name -> value the block cache hits and misses are added to.
+
+        Returns:
+            dict: Document ID (str) -> {field: value}, for the IDs present in the barrel.
+        """
+        fields = [field for field in fields if field in FIXED_FIELDS or field in HEAP_SUFFIX]
+        documents = {}
+        for doc_id in doc_ids:
+            position = self.position(int(doc_id))
+            if position is not None:
+                documents[str(doc_id)] = {field: self.value(position, field, counters) for field in fields}
+        return documents
+
+    def all_documents(self):
+        """Every document as Id -> row dict of strings (None for empty cells), e.g. to rewrite the store."""
+        fields = FIXED_FIELDS + TEXT_FIELDS + BLOB_FIELDS
+        documents = {}
+        for position in range(self.count):
+            row = {field: self.value(position, field) for field in fields}
+            documents[row['Id']] = {
+                field: str(value) if isinstance(value, int) else value for field, value in row.items()
+            }
+        return documents
+
+
+def get_column_store(barrel_path):
+    """
+    Returns the resident column store of a DocumentBarrel, reopening it after a rebuild.
+    This never builds: stores are written by the ingest, the compactor and migrateDocumentStore.py,
+    so a query never pays for (or races on) a conversion.
+
+    Raises:
+        OutdatedColumnStore: The store is missing, from another version or older than the CSV (uploads
+            append to it); the CSV, which then still exists, is the one to read.
+    """
+    col_path = column_paths(barrel_path)['.col']
+    source_size = os.path.getsize(barrel_path) if os.path.exists(barrel_path) else None
+    with _store_lock:
+        store = _open_stores.get(barrel_path)
+    if store is not None and os.path.exists(col_path) and store.mtime == os.path.getmtime(col_path) \
+            and source_size in (None, store.source_size):
+        return store
+
+    for _ in range(3):
+        if not os.path.exists(col_path):
+            raise OutdatedColumnStore(f"{barrel_path} has no column store")
+        try:
+            store = ColumnStore(barrel_path)
+        except StaleColumnStore:
+            # Another process is publishing a build: read it once it is complete
+            time.sleep(0.05)
+            continue
+        except ColumnStoreVersionError as e:
+            if source_size is None:
+                raise
+            raise OutdatedColumnStore(str(e))
+        if source_size not in (None, store.source_size):
+            raise OutdatedColumnStore(f"The column store of {barrel_path} is older than the CSV")
+        with _store_lock:
+            _open_stores[barrel_path] = store
+        return store
+    raise StaleColumnStore(barrel_path)
+
+
+def column_store_is_current(barrel_path):
+    """Whether queries can read a DocumentBarrel's column store instead of falling back to its CSV."""
+    try:
+        get_column_store(barrel_path)
+        return True
+    except (OutdatedColumnStore, StaleColumnStore):
+        return False
+
+
+def read_columns(barrel_path, doc_ids, fields, counters=None):
+    """Reads the requested fields of documents of a DocumentBarrel through its column store."""
+    return get_column_store(barrel_path).read(doc_ids, fields, counters)
+
+
+def block_cache_stats():
+    """Hit/miss counters and size of the decompressed-block LRU."""
+    with _store_lock:
+        return {**_block_stats, 'blocks': len(_block_cache), 'bytes': _block_cache_bytes[0]}
+
+
+if __name__ == "__main__":
+    # Build the column store of every DocumentBarrel in a folder
+    folder = sys.argv[1] if len(sys.argv) > 1 else "./dataset/DocumentBarrels"
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.startswith('barrel_') and file_name.endswith('.csv'):
+            count = build_column_store(os.path.join(folder, file_name))
+            print(f"Stored {count} documents of {file_name} in columns")
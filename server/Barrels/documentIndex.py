@@ -0,0 +1,178 @@
+import os
+import io
+import csv
+import sys
+import json
+import threading
+
+# Each DocumentBarrel 'barrel_X_to_Y.csv' gets a sidecar 'barrel_X_to_Y.idx' (JSON):
+#   {"header": [...column names...], "size": <bytes of the CSV covered>, "rows": {"<Id>": [offset, length]}}
+# "size" lets an index catch up with rows appended after it was written by scanning only the new tail.
+DOCUMENT_BARREL_SIZE = 4000
+INTEGER_COLUMNS = ('Id', 'Score')
+# Column layout of the DocumentBarrels
+DOCUMENT_COLUMNS = ['Id', 'CreationDate', 'Score', 'Title', 'Body', 'Tag', 'Answer', 'combined_token_ids']
+
+csv.field_size_limit(2**31 - 1)
+
+_index_lock = threading.Lock()
+_index_cache = {}  # barrel_path -> index
+
+
+def document_barrel_name(doc_id, barrel_size=DOCUMENT_BARREL_SIZE):
+    """Returns the DocumentBarrel file name that holds a document ID."""
+    start = (int(doc_id) // barrel_size) * barrel_size
+    return f"barrel_{start}_to_{start + barrel_size - 1}.csv"
+
+
+def document_row(document, columns=DOCUMENT_COLUMNS):
+    """Maps an uploaded document (keys in any case, e.g. 'id') onto the DocumentBarrel columns."""
+    by_name = {str(key).lower(): value for key, value in document.items()}
+    return {column: by_name.get(column.lower()) for column in columns}
+
+
+def index_path(barrel_path):
+    return os.path.splitext(barrel_path)[0] + '.idx'
+
+
+def scan_records(f, offset=0):
+    """
+    Yields (offset, raw bytes) for every CSV record of a binary file, starting at offset.
+    Records may span several lines when a quoted field (Body, Answer) contains newlines.
+    """
+    f.seek(offset)
+    record = b''
+    record_start = offset
+    position = offset
+    for line in iter(f.readline, b''):
+        if not record:
+            record_start = position
+        record += line
+        position += len(line)
+        # An even number of quotes means every quoted field of the record is closed
+        if record.count(b'"') % 2 == 0:
+            yield record_start, record
+            record = b''
+    if record:
+        yield record_start, record
+
+
+def parse_record(raw):
+    """Parses the raw bytes of one CSV record into its list of fields."""
+    text = raw.decode('utf-8', errors='replace')
+    return next(csv.reader(io.StringIO(text)), [])
+
+
+def _scan_rows(barrel_path, index, offset):
+    id_column = index['header'].index('Id')
+    with open(barrel_path, 'rb') as f:
+        for record_start, raw in scan_records(f, offset):
+            fields = parse_record(raw)
+            if len(fields) <= id_column or not fields[id_column].strip():
+                continue
+            try:
+                doc_id = str(int(float(fields[id_column])))
+            except ValueError:
+                continue
+            index['rows'][doc_id] = [record_start, len(raw)]
+    index['size'] = os.path.getsize(barrel_path)
+
+
+def build_document_index(barrel_path):
+    """Scans a whole DocumentBarrel and writes its offset index."""
+    with open(barrel_path, 'rb') as f:
+        header_record = next(scan_records(f), None)
+    if header_record is None:
+        raise ValueError(f"Document barrel {barrel_path} is empty")
+    index = {'header': parse_record(header_record[1]), 'size': 0, 'rows': {}}
+    _scan_rows(barrel_path, index, len(header_record[1]))
+    save_document_index(barrel_path, index)
+    return index
+
+
+def save_document_index(barrel_path, index):
+    """Writes the offset index atomically."""
+    path = index_path(barrel_path)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(temp_path, path)
+    with _index_lock:
+        _index_cache[barrel_path] = index
+
+
+def update_document_index(barrel_path):
+    """
+    Brings the offset index of a DocumentBarrel up to date and returns it.
+    Rows appended since the index was written are scanned from the recorded size onwards;
+    anything else (missing, unreadable or shrunken barrel) triggers a full rebuild.
+    """
+    size = os.path.getsize(barrel_path)
+    with _index_lock:
+        index = _index_cache.get(barrel_path)
+    if index is None:
+        try:
+            with open(index_path(barrel_path), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return build_document_index(barrel_path)
+
+    if index.get('size') == size:
+        with _index_lock:
+            _index_cache[barrel_path] = index
+        return index
+    if index.get('size', 0) > size or 'Id' not in index.get('header', []):
+        return build_document_index(barrel_path)
+
+    # Extend a copy so concurrent readers of the cached index are not disturbed
+    index = {'header': index['header'], 'size': index['size'], 'rows': dict(index['rows'])}
+    _scan_rows(barrel_path, index, index['size'])
+    save_document_index(barrel_path, index)
+    return index
+
+
+def _convert(column, value):
+    if value == '':
+        return None  # Same as the NaN -> None cleaning of the pandas path
+    if column in INTEGER_COLUMNS:
+        try:
+            return int(float(value))
+        except ValueError:
+            return value
+    return value
+
+
+def read_documents(barrel_path, doc_ids):
+    """
+    Reads only the requested rows of a DocumentBarrel.
+
+    Args:
+        barrel_path (str): Path to the 'barrel_X_to_Y.csv' file.
+        doc_ids (list): Document IDs to fetch.
+
+    Returns:
+        dict: Document ID (str) -> row dictionary, for the IDs present in the barrel.
+    """
+    index = update_document_index(barrel_path)
+    header = index['header']
+    documents = {}
+    with open(barrel_path, 'rb') as f:
+        for doc_id in doc_ids:
+            location = index['rows'].get(str(doc_id))
+            if location is None:
+                continue
+            f.seek(location[0])
+            fields = parse_record(f.read(location[1]))
+            documents[str(doc_id)] = {
+                column: _convert(column, value) for column, value in zip(header, fields)
+            }
+    return documents
+
+
+if __name__ == "__main__":
+    # Build the offset index of every DocumentBarrel in a folder
+    folder = sys.argv[1] if len(sys.argv) > 1 else "./dataset/DocumentBarrels"
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.startswith('barrel_') and file_name.endswith('.csv'):
+            index = build_document_index(os.path.join(folder, file_name))
+            print(f"Indexed {len(index['rows'])} documents of {file_name}")
@@ -3,10 +3,17 @@ import csv
 from collections import defaultdict
 import sys
 
+# Add the 'server/barrel' directory to the sys.path for module import
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'barrel'))
+
+from binaryBarrels import parse_document_ids
+from barrelManifest import publish_barrels, staging_folder
+from barrelPartitioner import posting_bytes, write_partitioned_barrels
+
 # Set the field size limit to a large but valid value (2^31 - 1, maximum for 32-bit)
 csv.field_size_limit(2**31 - 1)
 
-def create_barrels_with_range(inverted_index_file, barrel_dir, num_barrels=500):
+def create_barrels_with_range(inverted_index_file, barrel_dir, num_barrels=500, write_binary=False):
     if not os.path.exists(inverted_index_file):
         print(f"File {inverted_index_file} does not exist.")
         return
@@ -31,52 +38,27 @@ def create_barrels_with_range(inverted_index_file, barrel_dir, num_barrels=500):
 
     # Sort tokens by the numeric Token_ID (only the part before '#')
     sorted_tokens = sorted(inverted_index.keys(), key=lambda x: int(x.split('#')[0]))
-
-    # If there are fewer tokens than barrels, adjust the number of barrels to the number of tokens
-    total_tokens = len(sorted_tokens)
-    num_barrels = min(num_barrels, total_tokens)  # Adjust the number of barrels if needed
-
-    # Calculate how many tokens should go into each barrel
-    tokens_per_barrel = total_tokens // num_barrels
-    remainder = total_tokens % num_barrels  # Handle any remaining tokens
-
-    # Iterate over the tokens to assign them to barrels
-    token_index = 0
-    for barrel_num in range(num_barrels):
-        # Calculate the range of tokens for the current barrel
-        if barrel_num < remainder:
-            barrel_size = tokens_per_barrel + 1  # Extra token for this barrel
-        else:
-            barrel_size = tokens_per_barrel
-
-        barrel_tokens = sorted_tokens[token_index:token_index + barrel_size]
-        token_index += barrel_size
-
-        # Set barrel start and end based on Token_IDs
-        barrel_start = int(barrel_tokens[0].split('#')[0])  # Token_ID before '#'
-        barrel_end = int(barrel_tokens[-1].split('#')[0])  # Token_ID before '#'
-
-        # Fill the current barrel with the document IDs of these tokens
-        current_barrel = {token: inverted_index[token] for token in barrel_tokens}
-
-        # Create or update the barrel file
-        barrel_filename = f"{barrel_start}-{barrel_end}.csv"
-        barrel_file_path = os.path.join(barrel_dir, barrel_filename)
-
-        # Write the barrel data to the file
-        with open(barrel_file_path, 'w', newline='', encoding='ISO-8859-1') as barrel_file:
-            writer = csv.writer(barrel_file)
-            writer.writerow(["Token_ID", "Document_IDs"])
-
-            # Write the tokens and their document IDs
-            for token, doc_ids in sorted(current_barrel.items(), key=lambda x: int(x[0].split('#')[0])):
-                writer.writerow([token, ',,'.join(doc_ids)])
-
-        print(f"Barrel {barrel_start}-{barrel_end} created with {len(current_barrel)} tokens.")
+    postings = {token: parse_document_ids(',,'.join(inverted_index[token])) for token in sorted_tokens}
+
+    # Aim for num_barrels barrels of equal posting bytes instead of equal token counts;
+    # very frequent terms get barrels of their own
+    total_bytes = sum(posting_bytes(doc_ids) for doc_ids in postings.values())
+    staging_dir = staging_folder(barrel_dir)
+    statistics = write_partitioned_barrels(
+        staging_dir,
+        ((token, postings[token]) for token in sorted_tokens),
+        target_bytes=max(total_bytes // max(num_barrels, 1), 1),
+        write_binary=write_binary,
+    )
+
+    # Replace the previous build's ranges with the new ones, with their balance statistics
+    publish_barrels(staging_dir, barrel_dir, statistics)
+    print(f"Barrel manifest written to {barrel_dir}.")
 
 # Example usage
-create_barrels_with_range(
-    inverted_index_file="./dataset/inverted_indexa.csv",  # New inverted index file
-    barrel_dir="./dataset/barrels",  # Path to your barrel directory
-    num_barrels=500  # Default is 500 barrels, but it will be adjusted if tokens are fewer than 500
-)
+if __name__ == "__main__":
+    create_barrels_with_range(
+        inverted_index_file="./dataset/inverted_indexa.csv",  # New inverted index file
+        barrel_dir="./dataset/barrels",  # Path to your barrel directory
+        num_barrels=500  # Default is 500 barrels, but it will be adjusted if tokens are fewer than 500
+    )
@@ -0,0 +1,102 @@
+import os
+import sys
+
+# Make the sibling modules importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from documentIndex import index_path
+from columnStore import (
+    BLOCK_BYTES, DATE_WIDTH, DEFAULT_CODEC, ColumnStore, FIXED_FIELDS, HEAP_SUFFIX,
+    column_paths, read_csv_documents, write_column_store,
+)
+
+# Converts the 'barrel_X_to_Y.csv' DocumentBarrels of a folder into block-compressed column stores,
+# checks every document reads back unchanged, and optionally removes the CSV (and its '.idx') afterwards.
+
+
+def expected_value(field, value):
+    """What the column store returns for a CSV cell."""
+    if value in (None, ''):
+        return None
+    if field in ('Id', 'Score'):
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+    if field == 'CreationDate':
+        return value.encode('utf-8')[:DATE_WIDTH].decode('utf-8', errors='replace')
+    return value
+
+
+def verify_store(barrel_path, documents):
+    """Returns the Ids whose stored fields differ from the CSV rows."""
+    store = ColumnStore(barrel_path)
+    fields = list(FIXED_FIELDS) + list(HEAP_SUFFIX)
+    stored = store.read(list(documents), fields)
+    mismatches = []
+    for doc_id, row in documents.items():
+        expected = {field: expected_value(field, row.get(field)) for field in fields}
+        if stored.get(str(doc_id)) != expected:
+            mismatches.append(doc_id)
+    return mismatches
+
+
+def store_size(barrel_path):
+    return sum(os.path.getsize(path) for path in column_paths(barrel_path).values() if os.path.exists(path))
+
+
+def migrate_barrel(barrel_path, codec=DEFAULT_CODEC, block_bytes=BLOCK_BYTES, remove_csv=False):
+    """
+    Converts one DocumentBarrel.
+
+    Returns:
+        tuple: (documents, CSV bytes, store bytes, verified)
+    """
+    csv_size = os.path.getsize(barrel_path)
+    documents = read_csv_documents(barrel_path)
+    write_column_store(barrel_path, documents, csv_size, codec, block_bytes)
+    mismatches = verify_store(barrel_path, documents)
+    if mismatches:
+        print(f"{barrel_path}: {len(mismatches)} document(s) differ after conversion, e.g. Id {mismatches[0]}; "
+              f"keeping the CSV", file=sys.stderr)
+    elif remove_csv:
+        os.remove(barrel_path)
+        if os.path.exists(index_path(barrel_path)):
+            os.remove(index_path(barrel_path))
+    return len(documents), csv_size, store_size(barrel_path), not mismatches
+
+
+def migrate_folder(folder, codec=DEFAULT_CODEC, block_bytes=BLOCK_BYTES, remove_csv=False):
+    total_csv = total_store = 0
+    for file_name in sorted(os.listdir(folder)):
+        if not (file_name.startswith('barrel_') and file_name.endswith('.csv')):
+            continue
+        count, csv_size, size, verified = migrate_barrel(os.path.join(folder, file_name), codec, block_bytes, remove_csv)
+        total_csv += csv_size
+        total_store += size
+        status = "verified" if verified else "MISMATCH"
+        print(f"{file_name}: {count} documents, {csv_size} -> {size} bytes ({csv_size / max(size, 1):.1f}x), {status}")
+    if total_store:
+        print(f"Total: {total_csv} -> {total_store} bytes ({total_csv / total_store:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    # python Barrels/migrateDocumentStore.py [folder] [--codec zlib|lzma] [--block-bytes N] [--remove-csv]
+    arguments = sys.argv[1:]
+    options = {}
+    positional = []
+    index = 0
+    while index < len(arguments):
+        if arguments[index] in ('--codec', '--block-bytes') and index + 1 < len(arguments):
+            options[arguments[index]] = arguments[index + 1]
+            index += 2
+            continue
+        if not arguments[index].startswith('--'):
+            positional.append(arguments[index])
+        index += 1
+    migrate_folder(
+        positional[0] if positional else "./dataset/DocumentBarrels",
+        codec=options.get('--codec', DEFAULT_CODEC),
+        block_bytes=int(options.get('--block-bytes', BLOCK_BYTES)),
+        remove_csv='--remove-csv' in arguments,
+    )
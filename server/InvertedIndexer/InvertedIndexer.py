@@ -1,7 +1,13 @@
 import pandas as pd
 import os
+import sys
 
-def create_Inverted_Index(input_file, output_file):
+# Make the sibling fieldStats module importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fieldStats import write_field_stats, token_field
+
+def create_Inverted_Index(input_file, output_file, stats_dir=None):
     try:
         # Check if the input file exists
         if not os.path.exists(input_file):
@@ -23,15 +29,28 @@ def create_Inverted_Index(input_file, output_file):
         # Create a dictionary to store the inverted index
         inverted_index = {}
 
+        # Field statistics for ranking: per-document field lengths and per-term document sets
+        doc_lengths = {}
+        term_documents = {}
+
         # Build the inverted index
         for _, row in df.iterrows():
             token_ids = str(row['combined_token_ids']).split()
+            lengths = {'title': 0, 'tag': 0}
             for word in token_ids:
                 # Remove any commas from the token_id (if any)
                 clean_word = word.replace(",", "")
                 # Add the ID to the set for the word
                 inverted_index.setdefault(clean_word, set()).add(row['Id'])
 
+                try:
+                    term_id, field = token_field(clean_word)
+                except ValueError:
+                    continue  # Skip 'nan' and other non-token values
+                lengths[field] += 1
+                term_documents.setdefault(term_id, set()).add(row['Id'])
+            doc_lengths[int(row['Id'])] = (lengths['title'], lengths['tag'])
+
         # Prepare data for output
         output_data = []
         for word, ids in inverted_index.items():
@@ -43,6 +62,13 @@ def create_Inverted_Index(input_file, output_file):
         output_df.to_csv(output_file, index=False)
 
         print(f"Inverted index created successfully: {output_file}")
+
+        # Precompute the statistics BM25F ranking needs at query time
+        if stats_dir is None:
+            stats_dir = os.path.join(os.path.dirname(output_file), 'field_stats')
+        term_dfs = {term_id: len(ids) for term_id, ids in term_documents.items()}
+        write_field_stats(stats_dir, doc_lengths, term_dfs)
+        print(f"Field statistics written to {stats_dir}")
         return output_file
 
     except FileNotFoundError as fnf_error:
@@ -57,4 +83,5 @@ def create_Inverted_Index(input_file, output_file):
         print(f"An unexpected error occurred: {e}")
 
 # Example usage
-create_Inverted_Index("./dataset/MergedData_with_tokens.csv", "./dataset/Inverted_Index.csv")
+if __name__ == "__main__":
+    create_Inverted_Index("./dataset/MergedData_with_tokens.csv", "./dataset/Inverted_Index.csv")
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+# Make the sibling builders and the '../barrel' modules importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'barrel'))
+
+from spimiIndexer import build_index_spimi
+from numpyIndexer import build_index_numpy
+from binaryBarrels import read_csv_barrel
+from fieldStats import current_stats_folder
+
+# Builds the index of the same tokenized CSV with the SPIMI and the NumPy builders into scratch folders and
+# checks that both produce the same barrels and the same field statistics (BM25F reads the latter, so a
+# difference in field lengths changes the ranking even when the postings agree). Also reports both build times.
+STATS_FILES = ('documents.bin', 'terms.bin', 'summary.json')
+
+
+def build_timed(build, input_file, output_dir, **options):
+    barrel_dir = os.path.join(output_dir, 'barrels')
+    stats_dir = os.path.join(output_dir, 'field_stats')
+    started = time.perf_counter()
+    build(input_file, barrel_dir, stats_dir=stats_dir, **options)
+    return barrel_dir, stats_dir, time.perf_counter() - started
+
+
+def barrel_files(barrel_dir):
+    return sorted(name for name in os.listdir(barrel_dir) if name.endswith('.csv'))
+
+
+def compare_outputs(spimi_barrels, spimi_stats, numpy_barrels, numpy_stats):
+    """
+    Returns:
+        list: Descriptions of the differences between the two builds (empty when they agree).
+    """
+    differences = []
+    spimi_files, numpy_files = barrel_files(spimi_barrels), barrel_files(numpy_barrels)
+    if spimi_files != numpy_files:
+        differences.append(f"barrel files differ: {sorted(set(spimi_files) ^ set(numpy_files))[:10]}")
+    for name in sorted(set(spimi_files) & set(numpy_files)):
+        spimi_postings = read_csv_barrel(os.path.join(spimi_barrels, name))
+        numpy_postings = read_csv_barrel(os.path.join(numpy_barrels, name))
+        if spimi_postings != numpy_postings:
+            tokens = [token for token in set(spimi_postings) | set(numpy_postings)
+                      if spimi_postings.get(token) != numpy_postings.get(token)]
+            differences.append(f"barrel {name}: postings of {len(tokens)} tokens differ, e.g. {sorted(tokens)[:5]}")
+
+    spimi_stats, numpy_stats = current_stats_folder(spimi_stats), current_stats_folder(numpy_stats)
+    for name in STATS_FILES:
+        with open(os.path.join(spimi_stats, name), 'rb') as f:
+            spimi_bytes = f.read()
+        with open(os.path.join(numpy_stats, name), 'rb') as f:
+            numpy_bytes = f.read()
+        if spimi_bytes != numpy_bytes:
+            differences.append(f"field statistics {name} differ")
+    return differences
+
+
+def compare_builders(input_file, write_binary=False, keep=False):
+    """
+    Builds input_file with both builders and compares the results.
+
+    Returns:
+        tuple: (differences, SPIMI seconds, NumPy seconds).
+    """
+    scratch = tempfile.mkdtemp(prefix='bolt-compare-')
+    try:
+        spimi_barrels, spimi_stats, spimi_seconds = build_timed(
+            build_index_spimi, input_file, os.path.join(scratch, 'spimi'), write_binary=write_binary)
+        numpy_barrels, numpy_stats, numpy_seconds = build_timed(
+            build_index_numpy, input_file, os.path.join(scratch, 'numpy'), write_binary=write_binary)
+        differences = compare_outputs(spimi_barrels, spimi_stats, numpy_barrels, numpy_stats)
+    finally:
+        if keep:
+            print(f"Builds kept in {scratch}")
+        else:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return differences, spimi_seconds, numpy_seconds
+
+
+if __name__ == "__main__":
+    # python InvertedIndexer/compareBuilders.py [tokens csv] [--binary] [--keep]; exits with 1 when the builds differ
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    differences, spimi_seconds, numpy_seconds = compare_builders(
+        arguments[0] if arguments else "./dataset/MergedData_with_tokens.csv",
+        write_binary='--binary' in sys.argv, keep='--keep' in sys.argv,
+    )
+    print(f"SPIMI {spimi_seconds:.2f}s, NumPy {numpy_seconds:.2f}s ({spimi_seconds / numpy_seconds:.2f}x)")
+    for difference in differences:
+        print(f"MISMATCH: {difference}")
+    if differences:
+        sys.exit(1)
+    print("Both builders produced the same barrels and field statistics.")
@@ -0,0 +1,206 @@
+import os
+import json
+import shutil
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+# Field statistics written at index-build time and read by the ranking code:
+#   summary.json   : document count, per-field average lengths and array sizes
+#   documents.bin  : sorted document IDs (int64), then title lengths and tag lengths (uint32 each)
+#   terms.bin      : sorted numeric Token_IDs (int64), then document frequencies (uint32)
+# A term's document frequency counts the documents holding it in any field (title '#' or tag).
+# Each build writes the three files into a new 'gen-NNNNNN' folder of the stats folder and publishes it by
+# replacing the CURRENT file (which names it) in one rename, so a reader never pairs a summary with another
+# build's arrays. A stats folder without CURRENT holds the files itself (statistics built before generations).
+FIELDS = ('title', 'tag')
+DEFAULT_STATS_DIR = './dataset/field_stats'
+CURRENT_FILE = 'CURRENT'
+GENERATION_PREFIX = 'gen-'
+
+
+def token_field(token):
+    """Returns (numeric Token_ID, field name) for a Token_ID string such as '1234#' or '1234'."""
+    token = str(token).strip()
+    if token.endswith('#'):
+        return int(token[:-1]), 'title'
+    return int(token), 'tag'
+
+
+# Rows buffered per column while the statistics are streamed to disk
+WRITE_CHUNK = 64 * 1024
+
+
+def write_field_stats(stats_dir, doc_lengths, term_dfs):
+    """
+    Writes the field statistics.
+
+    Args:
+        stats_dir (str): Output folder.
+        doc_lengths (dict): Document ID -> (title length, tag length) in tokens.
+        term_dfs (dict): Numeric Token_ID -> number of documents holding the term.
+    """
+    write_sorted_field_stats(
+        stats_dir,
+        ((doc_id, *doc_lengths[doc_id]) for doc_id in sorted(doc_lengths)),
+        ((term_id, term_dfs[term_id]) for term_id in sorted(term_dfs)),
+    )
+
+
+def current_stats_folder(stats_dir=DEFAULT_STATS_DIR):
+    """Returns the folder holding the published field statistics of stats_dir."""
+    try:
+        with open(os.path.join(stats_dir, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            name = f.read().strip()
+    except OSError:
+        return stats_dir
+    return os.path.join(stats_dir, name) if name else stats_dir
+
+
+def _generations(stats_dir):
+    """Returns the names of the generation folders of stats_dir, oldest first."""
+    return sorted(
+        name for name in os.listdir(stats_dir)
+        if name.startswith(GENERATION_PREFIX) and name[len(GENERATION_PREFIX):].isdigit()
+    )
+
+
+def write_sorted_field_stats(stats_dir, documents, terms):
+    """
+    Writes the field statistics from sorted streams, holding only a chunk of them in memory,
+    and publishes them as the next generation of stats_dir.
+
+    Args:
+        stats_dir (str): Output folder.
+        documents (iterable): (document ID, title length, tag length) in ascending, unique document ID order.
+        terms (iterable): (numeric Token_ID, document frequency) in ascending, unique Token_ID order.
+    """
+    os.makedirs(stats_dir, exist_ok=True)
+    temp_dir = os.path.join(stats_dir, f".tmp-{os.getpid()}")
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+    try:
+        _write_stats_files(temp_dir, documents, terms)
+
+        # A concurrent build may claim the same generation: take the next one
+        generations = _generations(stats_dir)
+        generation = int(generations[-1][len(GENERATION_PREFIX):]) + 1 if generations else 1
+        while True:
+            name = f"{GENERATION_PREFIX}{generation:06d}"
+            try:
+                os.rename(temp_dir, os.path.join(stats_dir, name))
+                break
+            except OSError:
+                if not os.path.exists(os.path.join(stats_dir, name)):
+                    raise
+                generation += 1
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    current_path = os.path.join(stats_dir, CURRENT_FILE)
+    temp_path = f"{current_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(name)
+    os.replace(temp_path, current_path)
+
+    # Keep the previous generation for readers that resolved it just before the switch
+    for old in _generations(stats_dir)[:-2]:
+        if old != name:
+            shutil.rmtree(os.path.join(stats_dir, old), ignore_errors=True)
+
+
+def _write_stats_files(folder, documents, terms):
+    document_count, (_, title_total, tag_total) = _write_columns(
+        os.path.join(folder, 'documents.bin'), documents, ('q', 'I', 'I'))
+    term_count, _ = _write_columns(os.path.join(folder, 'terms.bin'), terms, ('q', 'I'))
+
+    summary = {
+        'document_count': document_count,
+        'term_count': term_count,
+        'average_length': {
+            'title': title_total / document_count if document_count else 0,
+            'tag': tag_total / document_count if document_count else 0,
+        },
+    }
+    with open(os.path.join(folder, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f)
+
+
+def _write_columns(path, rows, typecodes):
+    """
+    Writes rows as consecutive arrays, one per column: the first column goes straight to path and the
+    others to scratch files appended to it at the end.
+
+    Returns:
+        tuple: (number of rows, per-column sums)
+    """
+    paths = [path] + [f"{path}.{column}.tmp" for column in range(1, len(typecodes))]
+    files = [open(column_path, 'wb') for column_path in paths]
+    count = 0
+    sums = [0] * len(typecodes)
+    rows = iter(rows)
+    try:
+        while True:
+            chunk = list(islice(rows, WRITE_CHUNK))
+            if not chunk:
+                break
+            count += len(chunk)
+            for column, values in enumerate(zip(*chunk)):
+                array(typecodes[column], values).tofile(files[column])
+                sums[column] += sum(values)
+        for column_file in files[1:]:
+            column_file.close()
+        for column_path in paths[1:]:
+            with open(column_path, 'rb') as column_file:
+                shutil.copyfileobj(column_file, files[0])
+    finally:
+        for column_file in files:
+            column_file.close()
+        for column_path in paths[1:]:
+            if os.path.exists(column_path):
+                os.remove(column_path)
+    return count, sums
+
+
+def _read_arrays(path, typecodes, count):
+    arrays = []
+    with open(path, 'rb') as f:
+        for typecode in typecodes:
+            values = array(typecode)
+            values.fromfile(f, count)
+            arrays.append(values)
+    return arrays
+
+
+class FieldStats:
+    """Resident view of the field statistics with bisect lookups."""
+
+    def __init__(self, stats_dir=DEFAULT_STATS_DIR, folder=None):
+        # folder: an already resolved current_stats_folder(stats_dir)
+        stats_dir = folder or current_stats_folder(stats_dir)
+        self.folder = stats_dir
+        with open(os.path.join(stats_dir, 'summary.json'), 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        self.document_count = summary['document_count']
+        self.average_length = summary['average_length']
+        self.doc_ids, self.title_lengths, self.tag_lengths = _read_arrays(
+            os.path.join(stats_dir, 'documents.bin'), ('q', 'I', 'I'), summary['document_count']
+        )
+        self.term_ids, self.term_dfs = _read_arrays(
+            os.path.join(stats_dir, 'terms.bin'), ('q', 'I'), summary['term_count']
+        )
+
+    def lengths(self, doc_id):
+        """Returns {'title': n, 'tag': m} for a document, or None if it was indexed after the stats."""
+        position = bisect_left(self.doc_ids, doc_id)
+        if position < len(self.doc_ids) and self.doc_ids[position] == doc_id:
+            return {'title': self.title_lengths[position], 'tag': self.tag_lengths[position]}
+        return None
+
+    def document_frequency(self, term_id):
+        """Returns the document frequency of a numeric Token_ID, or None if the term is unknown."""
+        position = bisect_left(self.term_ids, term_id)
+        if position < len(self.term_ids) and self.term_ids[position] == term_id:
+            return self.term_dfs[position]
+        return None
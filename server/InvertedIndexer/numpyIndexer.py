@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Make the sibling fieldStats and the '../barrel' modules importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'barrel'))
+
+from fieldStats import write_field_stats
+from barrelManifest import publish_barrels, staging_folder
+from barrelPartitioner import TARGET_BARREL_BYTES, write_partitioned_barrels
+
+# Field codes of the (term_id, field, doc_id) triples; tag sorts before title like in the barrels
+FIELD_TAG = 0
+FIELD_TITLE = 1
+
+
+# Bytes str.split() separates on, plus the NUL that joins the rows in parse_tokens
+SEPARATOR_BYTES = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x00'
+# int64 holds every Token_ID of up to 18 digits
+MAX_TOKEN_DIGITS = 18
+POWERS_OF_TEN = 10 ** np.arange(MAX_TOKEN_DIGITS, dtype=np.int64)
+
+
+def parse_tokens(texts):
+    """
+    Parses the combined_token_ids of every row at once on the bytes of the joined column, with the
+    tokenization of the SPIMI and legacy builders: commas removed, split on whitespace, and Token_IDs
+    made of digits with an optional '#' title suffix (anything else, such as 'nan', is skipped).
+
+    Args:
+        texts (list): The combined_token_ids string of every row.
+
+    Returns:
+        tuple: (term_ids, is_title, rows) aligned arrays, rows being the index in texts of each token.
+    """
+    data = np.frombuffer('\0'.join(texts).encode('utf-8', 'replace'), dtype=np.uint8)
+    data = data[data != ord(',')]
+    row_of_byte = np.cumsum(data == 0)
+    separator = np.isin(data, np.frombuffer(SEPARATOR_BYTES, dtype=np.uint8))
+
+    # Tokens are the runs of non-separator bytes
+    bounded = np.concatenate(([True], separator, [True]))
+    starts = np.flatnonzero(~bounded[1:-1] & bounded[:-2])
+    ends = np.flatnonzero(~bounded[1:-1] & bounded[2:]) + 1
+
+    # Keep the tokens whose bytes are all digits but for a final '#'
+    non_digit = np.concatenate(([0], np.cumsum((data < ord('0')) | (data > ord('9')))))
+    is_title = data[ends - 1] == ord('#')
+    digits = ends - starts - is_title
+    valid = (non_digit[ends] - non_digit[starts] == is_title) & (digits > 0)
+    starts, digits, is_title = starts[valid], digits[valid], is_title[valid]
+    if len(digits) and digits.max() > MAX_TOKEN_DIGITS:
+        raise ValueError(f"Token_ID of more than {MAX_TOKEN_DIGITS} digits in the input")
+
+    # Value of every token: its digits times the powers of ten, summed per token
+    offsets = np.concatenate(([0], np.cumsum(digits)[:-1]))
+    token_of_digit = np.repeat(np.arange(len(digits)), digits)
+    position = np.arange(int(digits.sum())) - offsets[token_of_digit]
+    digit_values = (data[starts[token_of_digit] + position] - ord('0')).astype(np.int64)
+    weighted = digit_values * POWERS_OF_TEN[digits[token_of_digit] - position - 1]
+    term_ids = np.add.reduceat(weighted, offsets) if len(digits) else np.zeros(0, dtype=np.int64)
+    return term_ids, is_title, row_of_byte[starts]
+
+
+def load_triples(input_file):
+    """
+    Reads the tokenized CSV into three aligned int64 arrays (term IDs, field codes and document IDs)
+    plus the per-document field lengths, without a Python loop per token.
+
+    Returns:
+        tuple: (term_ids, fields, doc_ids, doc_lengths) where doc_lengths maps Id -> (title, tag) lengths.
+    """
+    df = pd.read_csv(input_file, usecols=['Id', 'combined_token_ids'], encoding='ISO-8859-1',
+                     dtype={'combined_token_ids': str})
+    row_ids = pd.to_numeric(df['Id'], errors='coerce')
+    df = df[row_ids.notna()]
+    row_ids = row_ids[row_ids.notna()].to_numpy().astype(np.int64)
+
+    term_ids, is_title, rows = parse_tokens(df['combined_token_ids'].fillna('').tolist())
+    fields = np.where(is_title, FIELD_TITLE, FIELD_TAG).astype(np.int64)
+    return term_ids, fields, row_ids[rows], document_lengths(row_ids, rows, is_title)
+
+
+def document_lengths(row_ids, rows, is_title):
+    """
+    Title and tag lengths of every row, counting each token occurrence (before postings are deduplicated),
+    like the SPIMI and legacy builders: a row without valid tokens has (0, 0) and an Id listed twice keeps
+    the lengths of its last row.
+    """
+    title_lengths = np.bincount(rows[is_title], minlength=len(row_ids))
+    tag_lengths = np.bincount(rows[~is_title], minlength=len(row_ids))
+    return {
+        doc_id: (title_length, tag_length)
+        for doc_id, title_length, tag_length in zip(row_ids.tolist(), title_lengths.tolist(), tag_lengths.tolist())
+    }
+
+
+def group_postings(term_ids, fields, doc_ids):
+    """
+    Sorts the triples once and finds the posting-list boundaries.
+
+    Returns:
+        tuple: (term_ids, fields, doc_ids) sorted by term, field, document without duplicates,
+        and the start offsets of every (term, field) posting list (with a final end offset).
+    """
+    order = np.lexsort((doc_ids, fields, term_ids))
+    term_ids, fields, doc_ids = term_ids[order], fields[order], doc_ids[order]
+
+    # A document listing the same token twice contributes one posting
+    keep = np.ones(len(term_ids), dtype=bool)
+    keep[1:] = (np.diff(term_ids) != 0) | (np.diff(fields) != 0) | (np.diff(doc_ids) != 0)
+    term_ids, fields, doc_ids = term_ids[keep], fields[keep], doc_ids[keep]
+
+    boundaries = np.flatnonzero((np.diff(term_ids) != 0) | (np.diff(fields) != 0)) + 1
+    starts = np.concatenate(([0], boundaries, [len(term_ids)])) if len(term_ids) else np.array([0])
+    return term_ids, fields, doc_ids, starts
+
+
+def document_frequencies(term_ids, doc_ids):
+    """Per-term document frequencies (documents holding the term in any field), computed on the arrays."""
+    order = np.lexsort((doc_ids, term_ids))
+    sorted_terms, sorted_docs = term_ids[order], doc_ids[order]
+    distinct = np.ones(len(sorted_terms), dtype=bool)
+    distinct[1:] = (np.diff(sorted_terms) != 0) | (np.diff(sorted_docs) != 0)
+    terms, dfs = np.unique(sorted_terms[distinct], return_counts=True)
+    return dict(zip(terms.tolist(), dfs.tolist()))
+
+
+def build_index_numpy(input_file, barrel_dir, target_bytes=TARGET_BARREL_BYTES, write_binary=False, stats_dir=None,
+                      tokens_per_barrel=None):
+    """
+    Builds the barrels, the barrel manifest and the field statistics from the tokenized CSV in memory,
+    with one lexsort over int64 arrays instead of per-posting Python objects.
+    The barrels are written to a staging folder and replace the previous build's all at once.
+
+    Args:
+        input_file (str): The forward index CSV, e.g. './dataset/MergedData_with_tokens.csv'.
+        barrel_dir (str): Output folder of the barrels.
+        target_bytes (int): Posting bytes per barrel; very frequent terms get barrels of their own.
+        write_binary (bool): Also write the binary copy of every barrel.
+        stats_dir (str): Field statistics folder; defaults to 'field_stats' next to the barrel folder.
+        tokens_per_barrel (int): Optional cap on the number of Token_IDs per barrel.
+
+    Returns:
+        int: Number of barrels written.
+    """
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Input file '{input_file}' does not exist.")
+    os.makedirs(barrel_dir, exist_ok=True)
+
+    started = time.time()
+    term_ids, fields, doc_ids, doc_lengths = load_triples(input_file)
+    print(f"Loaded {len(term_ids)} postings in {time.time() - started:.1f}s")
+
+    term_ids, fields, doc_ids, starts = group_postings(term_ids, fields, doc_ids)
+
+    # Write size-balanced barrels straight from the sorted arrays
+    staging_dir = staging_folder(barrel_dir)
+    entries = (
+        (f"{term_ids[start]}{'#' if fields[start] == FIELD_TITLE else ''}", doc_ids[start:end].tolist())
+        for start, end in zip(starts[:-1].tolist(), starts[1:].tolist())
+    )
+    statistics = write_partitioned_barrels(
+        staging_dir, entries, target_bytes=target_bytes, max_tokens=tokens_per_barrel, write_binary=write_binary,
+    )
+
+    # Replace the previous build's ranges with the new ones, with their balance statistics
+    publish_barrels(staging_dir, barrel_dir, statistics)
+    print(f"Barrel manifest written to {barrel_dir}.")
+
+    # Precompute the statistics BM25F ranking needs at query time
+    if stats_dir is None:
+        stats_dir = os.path.join(os.path.dirname(os.path.abspath(barrel_dir)), 'field_stats')
+    write_field_stats(stats_dir, doc_lengths, document_frequencies(term_ids, doc_ids))
+    print(f"Field statistics written to {stats_dir}")
+
+    print(f"Index of {len(starts) - 1} tokens built in {time.time() - started:.1f}s")
+    return len(statistics)
+
+
+if __name__ == "__main__":
+    # python InvertedIndexer/numpyIndexer.py [tokens csv] [barrel folder] [--binary]
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    barrels = build_index_numpy(
+        arguments[0] if len(arguments) > 0 else "./dataset/MergedData_with_tokens.csv",
+        arguments[1] if len(arguments) > 1 else "./dataset/barrels",
+        write_binary='--binary' in sys.argv,
+    )
+    print(f"{barrels} barrels written.")
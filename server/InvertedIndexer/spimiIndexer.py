@@ -0,0 +1,246 @@
+import os
+import sys
+import csv
+import heapq
+import shutil
+from array import array
+
+# Make the sibling fieldStats and the '../barrel' modules importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'barrel'))
+
+from fieldStats import write_sorted_field_stats, token_field
+from barrelManifest import publish_barrels, staging_folder
+from barrelPartitioner import TARGET_BARREL_BYTES, write_partitioned_barrels
+
+# Single-pass in-memory indexing (SPIMI): postings are collected in memory until MEMORY_BUDGET bytes
+# (estimated) are reached, then flushed as a sorted run file ("Token_ID<TAB>id,id,...\n" lines) along with the
+# field lengths of the run's documents ("id<TAB>title<TAB>tag\n" lines). The runs are k-way merged straight into
+# the final barrels, so no intermediate Inverted_Index.csv exists; the document frequencies counted during that
+# merge and the merged lengths are streamed to the field statistics, so neither is ever held whole in memory.
+MEMORY_BUDGET = int(os.environ.get('BOLT_INDEX_MEMORY', 512 * 1024 * 1024))
+# Rough in-memory cost of one posting (array('q') slot), of one term (key, array and dict entry)
+# and of one document's field lengths (key, tuple and dict entry)
+POSTING_BYTES = 8
+TERM_BYTES = 200
+DOCUMENT_BYTES = 150
+
+
+def token_sort_key(token):
+    """Barrel order: numeric Token_ID, the tag token before its '#' title token."""
+    term_id, field = token_field(token)
+    return term_id, field == 'title'
+
+
+def flush_run(postings, run_dir, run_number):
+    """Writes the in-memory postings as a sorted run file and returns its path."""
+    path = os.path.join(run_dir, f"run-{run_number:05d}.tsv")
+    with open(path, 'w', encoding='utf-8') as f:
+        for token in sorted(postings, key=token_sort_key):
+            doc_ids = sorted(set(postings[token]))
+            f.write(f"{token}\t{','.join(map(str, doc_ids))}\n")
+    return path
+
+
+def flush_lengths(doc_lengths, run_dir, run_number):
+    """Writes the field lengths of the run's documents, sorted by document ID, and returns the file path."""
+    path = os.path.join(run_dir, f"lengths-{run_number:05d}.tsv")
+    with open(path, 'w', encoding='utf-8') as f:
+        for doc_id in sorted(doc_lengths):
+            title_length, tag_length = doc_lengths[doc_id]
+            f.write(f"{doc_id}\t{title_length}\t{tag_length}\n")
+    return path
+
+
+def read_lengths(path, run_number):
+    """Yields (document ID, run number, title length, tag length) from a lengths file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            doc_id, title_length, tag_length = line.split('\t')
+            yield int(doc_id), run_number, int(title_length), int(tag_length)
+
+
+def merge_lengths(length_paths):
+    """K-way merges the lengths files into (document ID, title length, tag length) in document ID order;
+    a document listed again (a repeated Id) keeps the lengths of its last row, as the in-memory builders do."""
+    current = None
+    for doc_id, _, title_length, tag_length in heapq.merge(
+            *(read_lengths(path, run_number) for run_number, path in enumerate(length_paths))):
+        if current is not None and current[0] != doc_id:
+            yield current
+        current = (doc_id, title_length, tag_length)
+    if current is not None:
+        yield current
+
+
+def read_run(path):
+    """Yields (sort key, Token_ID, sorted document IDs) from a run file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            token, _, doc_ids = line.rstrip('\n').partition('\t')
+            yield token_sort_key(token), token, [int(doc_id) for doc_id in doc_ids.split(',') if doc_id]
+
+
+def merge_runs(run_paths):
+    """K-way merges sorted runs, yielding (Token_ID, sorted unique document IDs) in barrel order."""
+    current_key = current_token = None
+    current_lists = []
+    for key, token, doc_ids in heapq.merge(*(read_run(path) for path in run_paths), key=lambda entry: entry[0]):
+        if key != current_key:
+            if current_token is not None:
+                yield current_token, _merge_postings(current_lists)
+            current_key, current_token, current_lists = key, token, []
+        current_lists.append(doc_ids)
+    if current_token is not None:
+        yield current_token, _merge_postings(current_lists)
+
+
+def _merge_postings(posting_lists):
+    if len(posting_lists) == 1:
+        return posting_lists[0]
+    merged = []
+    for doc_id in heapq.merge(*posting_lists):
+        if not merged or merged[-1] != doc_id:
+            merged.append(doc_id)
+    return merged
+
+
+def with_document_frequencies(entries, dfs_file):
+    """
+    Passes merged (Token_ID, document IDs) pairs through, writing each term's document frequency to dfs_file
+    on the way ("term<TAB>df\n" lines, in term order since the merge emits the terms in order).
+    """
+    previous_term, previous_doc_ids, document_frequency = None, [], 0
+    for token, doc_ids in entries:
+        term_id, _ = token_field(token)
+        if term_id == previous_term:
+            # The '#' title token follows its tag token: df counts documents holding the term in any field
+            document_frequency = len(set(previous_doc_ids) | set(doc_ids))
+        else:
+            if previous_term is not None:
+                dfs_file.write(f"{previous_term}\t{document_frequency}\n")
+            document_frequency = len(doc_ids)
+        previous_term, previous_doc_ids = term_id, doc_ids
+        yield token, doc_ids
+    if previous_term is not None:
+        dfs_file.write(f"{previous_term}\t{document_frequency}\n")
+
+
+def read_document_frequencies(path):
+    """Yields (numeric Token_ID, document frequency) from the file with_document_frequencies wrote."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            term_id, document_frequency = line.split('\t')
+            yield int(term_id), int(document_frequency)
+
+
+def build_index_spimi(input_file, barrel_dir, target_bytes=TARGET_BARREL_BYTES, memory_budget=MEMORY_BUDGET,
+                      write_binary=False, stats_dir=None, run_dir=None, tokens_per_barrel=None):
+    """
+    Builds the barrels, the barrel manifest and the field statistics from the tokenized CSV
+    (columns 'Id' and 'combined_token_ids') in a single streaming pass with bounded memory.
+    The barrels are written to a staging folder and replace the previous build's all at once.
+
+    Args:
+        input_file (str): The forward index CSV, e.g. './dataset/MergedData_with_tokens.csv'.
+        barrel_dir (str): Output folder of the barrels.
+        target_bytes (int): Posting bytes per barrel; very frequent terms get barrels of their own.
+        memory_budget (int): Estimated bytes of postings and field lengths held in memory before a run is flushed.
+        write_binary (bool): Also write the binary copy of every barrel.
+        stats_dir (str): Field statistics folder; defaults to 'field_stats' next to the barrel folder.
+        run_dir (str): Scratch folder for the sorted runs; defaults to '<barrel_dir>/.spimi-runs'.
+        tokens_per_barrel (int): Optional cap on the number of Token_IDs per barrel.
+
+    Returns:
+        int: Number of barrels written.
+    """
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Input file '{input_file}' does not exist.")
+    os.makedirs(barrel_dir, exist_ok=True)
+    run_dir = run_dir or os.path.join(barrel_dir, '.spimi-runs')
+    if os.path.exists(run_dir):
+        shutil.rmtree(run_dir)
+    os.makedirs(run_dir)
+
+    csv.field_size_limit(2**31 - 1)
+    postings = {}
+    estimated_bytes = 0
+    run_paths = []
+    length_paths = []
+    doc_lengths = {}
+
+    # Pass 1: invert the input, flushing a sorted run whenever the budget is reached
+    with open(input_file, 'r', encoding='ISO-8859-1', newline='') as f:
+        reader = csv.DictReader(f)
+        missing_columns = [column for column in ('combined_token_ids', 'Id') if column not in (reader.fieldnames or [])]
+        if missing_columns:
+            raise ValueError(f"Input file is missing required columns: {', '.join(missing_columns)}")
+
+        for row in reader:
+            try:
+                doc_id = int(float(row['Id']))
+            except (TypeError, ValueError):
+                continue
+            lengths = {'title': 0, 'tag': 0}
+            for word in str(row['combined_token_ids']).split():
+                # Remove any commas from the token_id (if any)
+                token = word.replace(",", "")
+                try:
+                    _, field = token_field(token)
+                except ValueError:
+                    continue  # Skip 'nan' and other non-token values
+                lengths[field] += 1
+
+                doc_ids = postings.get(token)
+                if doc_ids is None:
+                    doc_ids = postings[token] = array('q')
+                    estimated_bytes += TERM_BYTES
+                doc_ids.append(doc_id)
+                estimated_bytes += POSTING_BYTES
+            doc_lengths[doc_id] = (lengths['title'], lengths['tag'])
+            estimated_bytes += DOCUMENT_BYTES
+
+            if estimated_bytes >= memory_budget:
+                run_paths.append(flush_run(postings, run_dir, len(run_paths)))
+                length_paths.append(flush_lengths(doc_lengths, run_dir, len(length_paths)))
+                print(f"Flushed run {len(run_paths)} ({len(postings)} tokens, {len(doc_lengths)} documents)")
+                postings = {}
+                doc_lengths = {}
+                estimated_bytes = 0
+
+    if postings or doc_lengths:
+        run_paths.append(flush_run(postings, run_dir, len(run_paths)))
+        length_paths.append(flush_lengths(doc_lengths, run_dir, len(length_paths)))
+    postings = doc_lengths = None
+
+    # Pass 2: k-way merge the runs straight into size-balanced barrels, counting document frequencies on the way
+    staging_dir = staging_folder(barrel_dir)
+    dfs_path = os.path.join(run_dir, 'document-frequencies.tsv')
+    with open(dfs_path, 'w', encoding='utf-8') as dfs_file:
+        statistics = write_partitioned_barrels(
+            staging_dir, with_document_frequencies(merge_runs(run_paths), dfs_file),
+            target_bytes=target_bytes, max_tokens=tokens_per_barrel, write_binary=write_binary,
+        )
+
+    # Replace the previous build's ranges with the new ones, with their balance statistics
+    publish_barrels(staging_dir, barrel_dir, statistics)
+    print(f"Barrel manifest written to {barrel_dir}.")
+
+    # Precompute the statistics BM25F ranking needs at query time
+    if stats_dir is None:
+        stats_dir = os.path.join(os.path.dirname(os.path.abspath(barrel_dir)), 'field_stats')
+    write_sorted_field_stats(stats_dir, merge_lengths(length_paths), read_document_frequencies(dfs_path))
+    print(f"Field statistics written to {stats_dir}")
+    shutil.rmtree(run_dir)
+    return len(statistics)
+
+
+if __name__ == "__main__":
+    # python InvertedIndexer/spimiIndexer.py [tokens csv] [barrel folder] [--binary]
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    barrels = build_index_spimi(
+        arguments[0] if len(arguments) > 0 else "./dataset/MergedData_with_tokens.csv",
+        arguments[1] if len(arguments) > 1 else "./dataset/barrels",
+        write_binary='--binary' in sys.argv,
+    )
+    print(f"{barrels} barrels written.")
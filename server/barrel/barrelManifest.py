@@ -0,0 +1,197 @@
+import os
+import re
+import sys
+import json
+import shutil
+from bisect import bisect_right
+
+# Make the sibling indexGeneration module importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from indexGeneration import bump_generation, generation_file
+
+# The manifest lives next to the barrels and lists them sorted by start token:
+#   {"barrels": [{"start": 0, "end": 3999, "file": "0-3999.bin", "posting_bytes": 1234}, ...]}
+# Builders using the size-balanced partitioner also record "tokens", "postings", "max_postings" and "hot".
+MANIFEST_NAME = 'manifest.json'
+BARREL_PATTERN = re.compile(r"^(\d+)-(\d+)\.(csv|bin)$")
+
+
+class BarrelManifest:
+    """Sorted barrel ranges with bisect lookup."""
+
+    def __init__(self, barrels):
+        self.barrels = sorted(barrels, key=lambda barrel: (barrel['start'], barrel['end']))
+        self.starts = [barrel['start'] for barrel in self.barrels]
+
+    def find(self, token_id):
+        """Returns every barrel whose range holds token_id (neighbouring ranges may share a boundary)."""
+        token_id = int(token_id)
+        found = []
+        index = bisect_right(self.starts, token_id) - 1
+        while index >= 0 and self.barrels[index]['end'] >= token_id:
+            found.append(self.barrels[index])
+            index -= 1
+        found.reverse()
+        return found
+
+    def free_range(self, token_id, width=4000):
+        """
+        Returns a (start, end) range holding token_id that does not overlap any existing barrel.
+        The range is aligned to width where the neighbouring barrels allow it.
+        """
+        token_id = int(token_id)
+        index = bisect_right(self.starts, token_id)
+        low = self.barrels[index - 1]['end'] + 1 if index > 0 else 0
+        high = self.starts[index] - 1 if index < len(self.starts) else None
+
+        start = max(token_id - token_id % width, low)
+        end = start + width - 1
+        if high is not None:
+            end = min(end, high)
+        return start, end
+
+    def to_dict(self):
+        return {'barrels': self.barrels}
+
+
+def manifest_path(barrel_dir):
+    return os.path.join(barrel_dir, MANIFEST_NAME)
+
+
+def describe_barrel(barrel_dir, file_name):
+    """Builds the manifest entry of one barrel file, or returns None for non-barrel files."""
+    match = BARREL_PATTERN.match(file_name)
+    if not match:
+        return None
+    return {
+        'start': int(match.group(1)),
+        'end': int(match.group(2)),
+        'file': file_name,
+        'posting_bytes': os.path.getsize(os.path.join(barrel_dir, file_name)),
+    }
+
+
+def build_manifest(barrel_dir, statistics=None):
+    """
+    Scans the barrel folder and returns a fresh manifest (binary barrels win over their CSV).
+    statistics optionally maps (start, end) to extra per-barrel statistics recorded by the builder.
+    """
+    barrels = {}
+    for file_name in os.listdir(barrel_dir):
+        entry = describe_barrel(barrel_dir, file_name)
+        if entry is None:
+            continue
+        key = (entry['start'], entry['end'])
+        if key not in barrels or file_name.endswith('.bin'):
+            barrels[key] = entry
+    for key, barrel_statistics in (statistics or {}).items():
+        if key in barrels:
+            barrels[key].update(barrel_statistics)
+    return BarrelManifest(barrels.values())
+
+
+def save_manifest(barrel_dir, manifest):
+    """Writes the manifest atomically so readers never see a partial file."""
+    path = manifest_path(barrel_dir)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest.to_dict(), f)
+    os.replace(temp_path, path)
+
+
+def load_manifest(barrel_dir):
+    """Loads the manifest of a barrel folder, building and saving it first if it is missing or unreadable."""
+    try:
+        with open(manifest_path(barrel_dir), 'r', encoding='utf-8') as f:
+            return BarrelManifest(json.load(f)['barrels'])
+    except (OSError, ValueError, KeyError):
+        manifest = build_manifest(barrel_dir)
+        save_manifest(barrel_dir, manifest)
+        return manifest
+
+
+def update_manifest(barrel_dir, file_names):
+    """Refreshes the entries of the given barrel files (adding new ones) and saves the manifest."""
+    manifest = load_manifest(barrel_dir)
+    barrels = {(barrel['start'], barrel['end']): barrel for barrel in manifest.barrels}
+    for file_name in file_names:
+        if not os.path.exists(os.path.join(barrel_dir, file_name)):
+            continue
+        entry = describe_barrel(barrel_dir, file_name)
+        if entry is None:
+            continue
+        key = (entry['start'], entry['end'])
+        current = barrels.get(key)
+        # Keep pointing at the binary barrel when the CSV of the same range changes
+        if current and current['file'].endswith('.bin') and file_name.endswith('.csv'):
+            bin_name = current['file']
+            if os.path.exists(os.path.join(barrel_dir, bin_name)):
+                entry = describe_barrel(barrel_dir, bin_name)
+        # Keep the build statistics of the range (uploads only add a few postings)
+        barrels[key] = {**current, **entry} if current else entry
+    manifest = BarrelManifest(barrels.values())
+    save_manifest(barrel_dir, manifest)
+    return manifest
+
+
+def staging_folder(barrel_dir):
+    """Empty scratch folder inside barrel_dir (so publishing is a rename) that a full build writes its barrels to."""
+    staging_dir = os.path.join(barrel_dir, f".build-{os.getpid()}")
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    os.makedirs(staging_dir)
+    return staging_dir
+
+
+def publish_barrels(staging_dir, barrel_dir, statistics=None):
+    """
+    Replaces the barrels of barrel_dir with those of a full build written to staging_dir.
+
+    The new files are moved in, the manifest switched to them and the index generation bumped; only then are
+    the barrel files of the previous build that the new one did not overwrite removed, so no stale range is
+    ever left for find() to serve. Other files of the folder (the SymSpell index, ...) are kept.
+
+    Returns:
+        BarrelManifest: The published manifest.
+    """
+    manifest = build_manifest(staging_dir, statistics)
+    published = set()
+    for file_name in os.listdir(staging_dir):
+        if describe_barrel(staging_dir, file_name) is not None:
+            os.replace(os.path.join(staging_dir, file_name), os.path.join(barrel_dir, file_name))
+            published.add(file_name)
+    save_manifest(barrel_dir, manifest)
+    bump_generation(generation_file(barrel_dir))
+
+    for file_name in os.listdir(barrel_dir):
+        if file_name not in published and BARREL_PATTERN.match(file_name):
+            os.remove(os.path.join(barrel_dir, file_name))
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return manifest
+
+
+def balance_report(manifest):
+    """Summarises how evenly the posting bytes are spread over the barrels of a manifest."""
+    sizes = sorted(barrel['posting_bytes'] for barrel in manifest.barrels)
+    if not sizes:
+        return {'barrels': 0}
+    return {
+        'barrels': len(sizes),
+        'hot_barrels': sum(1 for barrel in manifest.barrels if barrel.get('hot')),
+        'min_bytes': sizes[0],
+        'median_bytes': sizes[len(sizes) // 2],
+        'max_bytes': sizes[-1],
+        'max_to_median': round(sizes[-1] / max(sizes[len(sizes) // 2], 1), 2),
+    }
+
+
+if __name__ == "__main__":
+    # python barrel/barrelManifest.py [barrel folder] [--stats]
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    folder = arguments[0] if arguments else "./dataset/barrels"
+    if '--stats' in sys.argv:
+        print(json.dumps(balance_report(load_manifest(folder)), indent=2))
+    else:
+        save_manifest(folder, build_manifest(folder))
+        print(f"Manifest written to {manifest_path(folder)}")
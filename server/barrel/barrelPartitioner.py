@@ -0,0 +1,136 @@
+import os
+import csv
+import sys
+
+# Make the sibling modules importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from binaryBarrels import write_binary_barrel
+
+# Posting-list sizes are Zipf-distributed, so barrels are cut by posting bytes instead of token count:
+# a barrel is closed once it holds about TARGET_BARREL_BYTES, and a term whose postings alone reach
+# HOT_TERM_FRACTION of the target (its tag and '#' title tokens together) gets a barrel of its own.
+TARGET_BARREL_BYTES = int(os.environ.get('BOLT_BARREL_BYTES', 4 * 1024 * 1024))
+HOT_TERM_FRACTION = float(os.environ.get('BOLT_HOT_TERM_FRACTION', 0.5))
+
+
+def token_term(token):
+    """Numeric Token_ID of a token string such as '1234#' or '1234'."""
+    return int(str(token).split('#')[0])
+
+
+def posting_bytes(doc_ids):
+    """Size of a posting list in the CSV barrels ('id,id,...'), which is what a search has to read and parse."""
+    return len(','.join(map(str, doc_ids)))
+
+
+class SizeBalancedPartitioner:
+    """
+    Groups terms, fed in Token_ID order, into barrels of roughly target_bytes of postings.
+
+    add_term() and finish() return the barrels completed so far as (entries, hot) pairs, where entries is
+    the list of (Token_ID, document IDs) of the barrel and hot tells whether it is a dedicated hot-term barrel.
+    """
+
+    def __init__(self, target_bytes=TARGET_BARREL_BYTES, hot_bytes=None, max_tokens=None):
+        self.target_bytes = target_bytes
+        self.hot_bytes = hot_bytes if hot_bytes is not None else max(int(target_bytes * HOT_TERM_FRACTION), 1)
+        self.max_tokens = max_tokens
+        self.current = []
+        self.current_bytes = 0
+
+    def add_term(self, entries):
+        completed = []
+        term_bytes = sum(posting_bytes(doc_ids) for _, doc_ids in entries)
+        if term_bytes >= self.hot_bytes:
+            completed.extend(self.finish())
+            completed.append((entries, True))
+            return completed
+
+        full = self.current_bytes + term_bytes > self.target_bytes
+        if self.max_tokens is not None:
+            full = full or len(self.current) + len(entries) > self.max_tokens
+        if self.current and full:
+            completed.extend(self.finish())
+        self.current.extend(entries)
+        self.current_bytes += term_bytes
+        return completed
+
+    def finish(self):
+        if not self.current:
+            return []
+        completed = [(self.current, False)]
+        self.current = []
+        self.current_bytes = 0
+        return completed
+
+
+def group_terms(sorted_entries):
+    """Groups (Token_ID, document IDs) pairs sorted by numeric Token_ID into one list per term."""
+    group = []
+    for token, doc_ids in sorted_entries:
+        if group and token_term(group[-1][0]) != token_term(token):
+            yield group
+            group = []
+        group.append((token, doc_ids))
+    if group:
+        yield group
+
+
+def barrel_statistics(entries, hot=False):
+    """Per-barrel statistics recorded in the manifest to check the balance of a build."""
+    sizes = [len(doc_ids) for _, doc_ids in entries]
+    return {
+        'tokens': len(entries),
+        'postings': sum(sizes),
+        'max_postings': max(sizes, default=0),
+        'hot': hot,
+    }
+
+
+def write_barrel(barrel_dir, entries, write_binary=False):
+    """
+    Writes one '<start>-<end>.csv' barrel (and optionally its binary copy) from (Token_ID, sorted document IDs)
+    pairs in Token_ID order.
+
+    Returns:
+        str: The barrel file name.
+    """
+    start = token_term(entries[0][0])
+    end = token_term(entries[-1][0])
+    barrel_filename = f"{start}-{end}.csv"
+    barrel_file_path = os.path.join(barrel_dir, barrel_filename)
+    with open(barrel_file_path, 'w', newline='', encoding='ISO-8859-1') as barrel_file:
+        writer = csv.writer(barrel_file)
+        writer.writerow(["Token_ID", "Document_IDs"])
+        for token, doc_ids in entries:
+            writer.writerow([token, ','.join(map(str, doc_ids))])
+
+    # Optionally write the compact binary copy that the search path prefers
+    if write_binary:
+        write_binary_barrel(os.path.splitext(barrel_file_path)[0] + '.bin', dict(entries))
+    return barrel_filename
+
+
+def write_partitioned_barrels(barrel_dir, sorted_entries, target_bytes=TARGET_BARREL_BYTES,
+                              hot_bytes=None, max_tokens=None, write_binary=False):
+    """
+    Partitions (Token_ID, sorted document IDs) pairs in Token_ID order into size-balanced barrels and writes them.
+
+    Returns:
+        dict: (start, end) -> barrel statistics, to be recorded in the manifest.
+    """
+    partitioner = SizeBalancedPartitioner(target_bytes, hot_bytes, max_tokens)
+    statistics = {}
+
+    def write(completed):
+        for entries, hot in completed:
+            barrel_filename = write_barrel(barrel_dir, entries, write_binary)
+            statistics[(token_term(entries[0][0]), token_term(entries[-1][0]))] = barrel_statistics(entries, hot)
+            kind = "hot-term barrel" if hot else "barrel"
+            print(f"Created {kind} {barrel_filename} with {len(entries)} tokens.")
+
+    for entries in group_terms(sorted_entries):
+        write(partitioner.add_term(entries))
+    write(partitioner.finish())
+    return statistics
@@ -0,0 +1,223 @@
+import os
+import sys
+import csv
+import mmap
+import struct
+from barrelManifest import build_manifest, save_manifest
+
+# Binary inverted barrel layout (all integers little-endian):
+#   header   : magic (8 bytes) + number of tokens (u32)
+#   table    : one (key u64, posting offset u32, document count u32) entry per token, sorted by key
+#   postings : delta-encoded document IDs, each delta written as a variable-byte integer
+# A token key is the numeric Token_ID shifted left by one, with the low bit set for title ("#") tokens.
+MAGIC = b'BOLTBRL1'
+HEADER = struct.Struct('<8sI')
+ENTRY = struct.Struct('<QII')
+
+csv.field_size_limit(2**31 - 1)
+
+
+def token_key(token):
+    """Converts a Token_ID such as '1234' or '1234#' into its sortable integer key."""
+    token = str(token).strip()
+    if token.endswith('#'):
+        return (int(token[:-1]) << 1) | 1
+    return int(token) << 1
+
+
+def key_token(key):
+    """Converts an integer key back into its Token_ID string."""
+    return f"{key >> 1}#" if key & 1 else str(key >> 1)
+
+
+def parse_document_ids(value):
+    """Parses a Document_IDs cell (IDs joined by ',' or ',,') into a sorted list of unique ints."""
+    doc_ids = set()
+    for part in str(value).split(','):
+        part = part.strip()
+        if part:
+            try:
+                doc_ids.add(int(float(part)))
+            except ValueError:
+                pass  # Skip 'nan' and other junk
+    return sorted(doc_ids)
+
+
+def encode_postings(doc_ids):
+    """Delta-encodes a sorted list of document IDs as variable-byte integers."""
+    out = bytearray()
+    previous = 0
+    for doc_id in doc_ids:
+        delta = doc_id - previous
+        previous = doc_id
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_postings(buffer, start, count):
+    """Decodes count delta/varint document IDs from buffer starting at byte offset start."""
+    doc_ids = []
+    previous = 0
+    position = start
+    for _ in range(count):
+        value = 0
+        shift = 0
+        while True:
+            byte = buffer[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        previous += value
+        doc_ids.append(previous)
+    return doc_ids
+
+
+def write_binary_barrel(file_path, postings):
+    """
+    Writes a binary barrel.
+
+    Args:
+        file_path (str): Destination path (conventionally '<start>-<end>.bin').
+        postings (dict): Token_ID string -> iterable of document IDs.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    entries = sorted(
+        (token_key(token), sorted(set(int(doc_id) for doc_id in doc_ids)))
+        for token, doc_ids in postings.items()
+    )
+
+    table = bytearray()
+    data = bytearray()
+    for key, doc_ids in entries:
+        table += ENTRY.pack(key, len(data), len(doc_ids))
+        data += encode_postings(doc_ids)
+
+    # Write to a temporary file first so readers never see a half-written barrel
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(entries)))
+        f.write(table)
+        f.write(data)
+    os.replace(temp_path, file_path)
+    return HEADER.size + len(table) + len(data)
+
+
+class BinaryBarrel:
+    """Memory-mapped reader that decodes only the posting list a lookup asks for."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.token_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{file_path} is not a binary barrel")
+        self._data_start = HEADER.size + self.token_count * ENTRY.size
+
+    def _entry(self, index):
+        return ENTRY.unpack_from(self._map, HEADER.size + index * ENTRY.size)
+
+    def _find(self, key):
+        # Binary search over the fixed-width token table
+        low, high = 0, self.token_count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            if entry[0] < key:
+                low = middle + 1
+            elif entry[0] > key:
+                high = middle - 1
+            else:
+                return entry
+        return None
+
+    def lookup(self, token):
+        """Returns the sorted document IDs of a Token_ID, or an empty list when it is absent."""
+        entry = self._find(token_key(token))
+        if entry is None:
+            return []
+        _, offset, count = entry
+        return decode_postings(self._map, self._data_start + offset, count)
+
+    def document_frequency(self, token):
+        """Returns the number of documents of a Token_ID without decoding its postings."""
+        entry = self._find(token_key(token))
+        return entry[2] if entry else 0
+
+    def __contains__(self, token):
+        return self._find(token_key(token)) is not None
+
+    def items(self):
+        """Yields every (Token_ID, document IDs) pair in key order."""
+        for index in range(self.token_count):
+            key, offset, count = self._entry(index)
+            yield key_token(key), decode_postings(self._map, self._data_start + offset, count)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_csv_barrel(file_path):
+    """Reads a CSV barrel into a Token_ID -> sorted document IDs dictionary."""
+    postings = {}
+    with open(file_path, 'r', encoding='ISO-8859-1', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if len(row) < 2 or not row[0].strip():
+                continue
+            doc_ids = parse_document_ids(row[1])
+            token = row[0].strip()
+            postings[token] = sorted(set(postings.get(token, [])) | set(doc_ids))
+    return postings
+
+
+def convert_csv_barrel(csv_path, bin_path=None):
+    """Converts one CSV barrel into a binary barrel next to it and returns the binary path."""
+    if bin_path is None:
+        bin_path = os.path.splitext(csv_path)[0] + '.bin'
+    write_binary_barrel(bin_path, read_csv_barrel(csv_path))
+    return bin_path
+
+
+def convert_barrel_folder(barrel_dir):
+    """Converts every '<start>-<end>.csv' barrel of a folder into the binary format."""
+    csv_bytes = 0
+    bin_bytes = 0
+    converted = 0
+    for file_name in sorted(os.listdir(barrel_dir)):
+        if not file_name.endswith('.csv') or '-' not in file_name:
+            continue
+        csv_path = os.path.join(barrel_dir, file_name)
+        try:
+            bin_path = convert_csv_barrel(csv_path)
+        except (ValueError, OSError) as e:
+            print(f"Error converting {csv_path}: {e}")
+            continue
+        csv_bytes += os.path.getsize(csv_path)
+        bin_bytes += os.path.getsize(bin_path)
+        converted += 1
+
+    # Point the manifest at the binary barrels
+    save_manifest(barrel_dir, build_manifest(barrel_dir))
+
+    ratio = csv_bytes / bin_bytes if bin_bytes else 0
+    print(f"Converted {converted} barrels: {csv_bytes} bytes of CSV -> {bin_bytes} bytes binary ({ratio:.1f}x smaller).")
+
+
+if __name__ == "__main__":
+    convert_barrel_folder(sys.argv[1] if len(sys.argv) > 1 else "./dataset/barrels")
@@ -0,0 +1,52 @@
+import os
+import sys
+
+try:
+    import fcntl  # Serializes concurrent bumps (not available on Windows)
+except ImportError:
+    fcntl = None
+
+# Counter of index changes visible to searches. Every writer that changes search results (an upload
+# publishing a segment, a full index build) bumps it; caches key their entries on it instead of being flushed.
+GENERATION_FILE = './dataset/index_generation'
+
+
+def generation_file(barrel_dir):
+    """Generation file of the index whose token barrels live in barrel_dir."""
+    return os.path.join(os.path.dirname(os.path.abspath(barrel_dir)), 'index_generation')
+
+
+def current_generation(path=GENERATION_FILE):
+    """Returns the current index generation (0 when nothing has bumped it yet)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_generation(path=GENERATION_FILE):
+    """
+    Increments the index generation atomically.
+
+    Returns:
+        int: The new generation.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.lock', 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        generation = current_generation(path) + 1
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(str(generation))
+        os.replace(temp_path, path)
+    return generation
+
+
+if __name__ == "__main__":
+    # python barrel/indexGeneration.py [--bump]
+    if '--bump' in sys.argv[1:]:
+        print(bump_generation())
+    else:
+        print(current_generation())
@@ -1,8 +1,17 @@
 import os
 import csv
 from collections import defaultdict
+import sys
 
-def create_barrels_with_range(inverted_index_file, barrel_dir, tokens_per_barrel=3000):
+# Make the sibling binaryBarrels module importable when this file is imported from elsewhere
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from binaryBarrels import parse_document_ids
+from barrelManifest import publish_barrels, staging_folder
+from barrelPartitioner import TARGET_BARREL_BYTES, write_partitioned_barrels
+
+def create_barrels_with_range(inverted_index_file, barrel_dir, tokens_per_barrel=3000, write_binary=False,
+                              target_bytes=TARGET_BARREL_BYTES):
     if not os.path.exists(inverted_index_file):
         print(f"File {inverted_index_file} does not exist.")
         return
@@ -31,43 +40,22 @@ def create_barrels_with_range(inverted_index_file, barrel_dir, tokens_per_barrel
     # Sort tokens by Token_ID (numerically if possible)
     sorted_tokens = sorted(inverted_index.keys(), key=lambda x: int(x.split('#')[0]))
 
-    # Calculate the number of barrels needed based on the tokens_per_barrel
-    total_tokens = len(sorted_tokens)
-    num_barrels = (total_tokens + tokens_per_barrel - 1) // tokens_per_barrel  # Ceiling division
-
-    # Iterate over the tokens to assign them to barrels
-    token_index = 0
-
-    for barrel_num in range(num_barrels):
-        # Calculate the range of tokens for the current barrel
-        barrel_tokens = sorted_tokens[token_index:token_index + tokens_per_barrel]
-        token_index += len(barrel_tokens)
-
-        # Set barrel start and end tokens
-        barrel_start = barrel_tokens[0]
-        barrel_end = barrel_tokens[-1]
-
-        # Fill the current barrel with the document IDs of these tokens
-        current_barrel = {token: inverted_index[token] for token in barrel_tokens}
-
-        # Create or update the barrel file
-        barrel_filename = f"{barrel_start.split('#')[0]}-{barrel_end.split('#')[0]}.csv"
-        barrel_file_path = os.path.join(barrel_dir, barrel_filename)
-
-        # Write the barrel data to the file
-        with open(barrel_file_path, 'w', newline='', encoding='ISO-8859-1') as barrel_file:
-            writer = csv.writer(barrel_file)
-            writer.writerow(["Token_ID", "Document_IDs"])
-
-            # Write the tokens and their document IDs
-            for token, doc_ids in sorted(current_barrel.items(), key=lambda x: int(x[0].split('#')[0])):
-                writer.writerow([token, ',,'.join(doc_ids)])
+    # Cut barrels by posting bytes (at most tokens_per_barrel tokens each); very frequent terms get their own
+    staging_dir = staging_folder(barrel_dir)
+    statistics = write_partitioned_barrels(
+        staging_dir,
+        ((token, parse_document_ids(',,'.join(inverted_index[token]))) for token in sorted_tokens),
+        target_bytes=target_bytes, max_tokens=tokens_per_barrel, write_binary=write_binary,
+    )
 
-        print(f"Barrel {barrel_start}-{barrel_end} created with {len(current_barrel)} tokens.")
+    # Replace the previous build's ranges with the new ones, with their balance statistics
+    publish_barrels(staging_dir, barrel_dir, statistics)
+    print(f"Barrel manifest written to {barrel_dir}.")
 
 # Example usage
-create_barrels_with_range(
-    inverted_index_file="./dataset/Inverted_Index.csv",  # New inverted index file
-    barrel_dir="./dataset/barrels",  # Path to your barrel directory
-    tokens_per_barrel=3000  # Specify 3000 tokens per barrel
-)
+if __name__ == "__main__":
+    create_barrels_with_range(
+        inverted_index_file="./dataset/Inverted_Index.csv",  # New inverted index file
+        barrel_dir="./dataset/barrels",  # Path to your barrel directory
+        tokens_per_barrel=3000  # Specify 3000 tokens per barrel
+    )
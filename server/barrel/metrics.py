@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import fcntl  # Serializes concurrent snapshot merges (not available on Windows)
+except ImportError:
+    fcntl = None
+
+# Process-wide latency histograms and counters of the search and upload paths.
+#
+# Code wraps each stage in span('search.lemmatize') and counts work with count('barrels_opened');
+# both go to the process totals and, while a request runs inside trace(), to that request's breakdown.
+# A trace also collects the query plan facts the search code notes (terms, barrels, list sizes) for EXPLAIN.
+# searchDaemon.py returns snapshot() to the Node server, which sums the workers and serves them in the
+# Prometheus text format. Short-lived processes (uploads, the compactor) add theirs to a file with save_metrics.
+METRICS_FOLDER = './dataset/metrics'
+
+# Upper bounds (seconds) of the stage latency histogram buckets; the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_counters = {}    # name -> total
+_histograms = {}  # stage -> {'counts': [per bucket, +Inf last], 'sum': seconds}
+_local = threading.local()
+
+
+class RequestTrace:
+    """Per-request stage times, counters and plan notes, filled by the code run inside trace()."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}    # stage -> [seconds, calls]
+        self.counters = {}
+        self.plan = {}
+
+    def add(self, stage, seconds):
+        totals = self.stages.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+    def breakdown(self):
+        """The breakdown returned to clients: milliseconds and calls per stage, plus the request counters."""
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'stages': {
+                stage: {'ms': round(seconds * 1000, 3), 'calls': calls}
+                for stage, (seconds, calls) in self.stages.items()
+            },
+            'counters': dict(self.counters),
+        }
+
+
+def current_trace():
+    """The trace of the request running on this thread, or None."""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def trace(request_trace=None):
+    """Collects the spans and counts of the enclosed code (on this thread) into a RequestTrace."""
+    previous = current_trace()
+    _local.trace = request_trace or RequestTrace()
+    try:
+        yield _local.trace
+    finally:
+        _local.trace = previous
+
+
+def observe(stage, seconds):
+    """Records one timing of a stage."""
+    bucket = bisect_left(BUCKETS, seconds)
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = {'counts': [0] * (len(BUCKETS) + 1), 'sum': 0.0}
+        histogram['counts'][bucket] += 1
+        histogram['sum'] += seconds
+    request_trace = current_trace()
+    if request_trace is not None:
+        request_trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Times the enclosed block as one call of stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+def count(name, value=1):
+    """Adds value to a counter, e.g. count('postings_decoded', len(postings))."""
+    if not value:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    request_trace = current_trace()
+    if request_trace is not None:
+        request_trace.counters[name] = request_trace.counters.get(name, 0) + value
+
+
+def note(key, value):
+    """Sets a fact of the current request's query plan, e.g. note('candidates', 120)."""
+    request_trace = current_trace()
+    if request_trace is not None:
+        request_trace.plan[key] = value
+
+
+def note_item(key, item):
+    """Appends an entry to a list of the current request's query plan, e.g. one per looked-up term."""
+    request_trace = current_trace()
+    if request_trace is not None:
+        request_trace.plan.setdefault(key, []).append(item)
+
+
+def snapshot(clear=False):
+    """
+    JSON-serializable copy of the process totals (histogram counts are per bucket, not cumulative).
+    With clear set the totals restart from zero, atomically with the copy.
+    """
+    with _lock:
+        current = {
+            'buckets': list(BUCKETS),
+            'counters': dict(_counters),
+            'histograms': {
+                stage: {'counts': list(histogram['counts']), 'sum': histogram['sum']}
+                for stage, histogram in _histograms.items()
+            },
+        }
+        if clear:
+            _counters.clear()
+            _histograms.clear()
+    return current
+
+
+def merge_snapshots(first, second):
+    """Sum of two snapshots taken with the same buckets."""
+    merged = {
+        'buckets': list(BUCKETS),
+        'counters': dict(first.get('counters', {})),
+        'histograms': {stage: {'counts': list(h['counts']), 'sum': h['sum']}
+                       for stage, h in first.get('histograms', {}).items()},
+    }
+    for name, value in second.get('counters', {}).items():
+        merged['counters'][name] = merged['counters'].get(name, 0) + value
+    for stage, histogram in second.get('histograms', {}).items():
+        target = merged['histograms'].setdefault(stage, {'counts': [0] * (len(BUCKETS) + 1), 'sum': 0.0})
+        target['counts'] = [a + b for a, b in zip(target['counts'], histogram['counts'])]
+        target['sum'] += histogram['sum']
+    return merged
+
+
+def save_metrics(path):
+    """
+    Adds the totals of this process to the snapshot file at path and starts counting from zero again,
+    so processes that exit (uploads) or run in the background (the compactor) are included in /api/metrics.
+    """
+    current = snapshot(clear=True)
+    if not current['counters'] and not current['histograms']:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.lock', 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('buckets') != list(BUCKETS):
+                saved = {}  # Written with other buckets: start over rather than mix them
+        except (OSError, ValueError):
+            saved = {}
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(merge_snapshots(saved, current), f)
+        os.replace(temp_path, path)
+
+
+if __name__ == "__main__":
+    # python barrel/metrics.py [snapshot file]: prints a saved snapshot
+    with open(sys.argv[1] if len(sys.argv) > 1 else os.path.join(METRICS_FOLDER, 'upload.json')) as f:
+        print(json.dumps(json.load(f), indent=2))
@@ -0,0 +1,296 @@
+import os
+import sys
+import csv
+import json
+import math
+import time
+import shutil
+import threading
+
+# Add the '../Barrels' folder to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Barrels'))
+
+from binaryBarrels import BinaryBarrel, write_binary_barrel
+from documentIndex import DOCUMENT_COLUMNS, build_document_index, read_documents
+
+# Uploads are written as small immutable segments, each a folder 'seg-<id>' holding:
+#   postings.bin   : binary barrel (Token_ID -> document IDs) of the uploaded documents
+#   documents.csv  : the uploaded rows, with a documents.idx offset index like the DocumentBarrels
+#   segment.json   : {"id", "generation", "documents", "tokens", "bytes", "created"}
+# Queries merge the base barrels with every live segment; the compactor merges segments of similar
+# size (size-tiered) and folds them into the base barrels once there are too many or they grow too big.
+# Segments are ordered by (id, generation): a merged segment keeps the highest ID of its inputs, with the
+# next generation, so it stays older than every segment published after its newest input.
+DEFAULT_SEGMENT_FOLDER = './dataset/segments'
+SEGMENT_PREFIX = 'seg-'
+POSTINGS_FILE = 'postings.bin'
+DOCUMENTS_FILE = 'documents.csv'
+META_FILE = 'segment.json'
+
+# Segments whose sizes fall in the same tier (powers of MERGE_FACTOR above MIN_SEGMENT_BYTES) are merged together
+MERGE_FACTOR = int(os.environ.get('BOLT_SEGMENT_MERGE_FACTOR', 4))
+MIN_SEGMENT_BYTES = int(os.environ.get('BOLT_MIN_SEGMENT_BYTES', 64 * 1024))
+# Past either limit, every segment is folded into the base barrels
+MAX_SEGMENTS = int(os.environ.get('BOLT_MAX_SEGMENTS', 16))
+MAX_SEGMENT_BYTES = int(os.environ.get('BOLT_MAX_SEGMENT_BYTES', 64 * 1024 * 1024))
+
+_segments_lock = threading.Lock()
+_segment_sets = {}  # folder -> SegmentSet
+
+
+def segment_name(segment_id, generation=0):
+    """'seg-00000012' for an upload, 'seg-00000012-m0001' for its first merge; names sort in segment order."""
+    name = f"{SEGMENT_PREFIX}{segment_id:08d}"
+    return f"{name}-m{generation:04d}" if generation else name
+
+
+def segment_key(name):
+    """(id, generation) of a segment name."""
+    segment_id, _, generation = name[len(SEGMENT_PREFIX):].partition('-m')
+    return int(segment_id), int(generation or 0)
+
+
+def list_segment_names(folder=DEFAULT_SEGMENT_FOLDER):
+    """Returns the names of the published segments, oldest first."""
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        name for name in os.listdir(folder)
+        if name.startswith(SEGMENT_PREFIX) and os.path.exists(os.path.join(folder, name, META_FILE))
+    )
+
+
+def write_segment(folder, postings, documents, header=None, segment_id=None, generation=0):
+    """
+    Writes an immutable segment and publishes it with an atomic rename.
+
+    Args:
+        folder (str): The segment folder.
+        postings (dict): Token_ID string -> iterable of document IDs.
+        documents (list): Row dictionaries (with an 'Id' column) of the segment documents.
+        header (list): Column order of documents.csv; defaults to the DocumentBarrel columns.
+        segment_id (int): ID of a merged segment; uploads claim the next free ID.
+        generation (int): Merge generation of a merged segment.
+
+    Returns:
+        str: Path of the published segment.
+    """
+    os.makedirs(folder, exist_ok=True)
+    temp_dir = os.path.join(folder, f".tmp-{os.getpid()}-{threading.get_ident()}")
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+
+    posting_bytes = write_binary_barrel(os.path.join(temp_dir, POSTINGS_FILE), postings)
+
+    header = header or DOCUMENT_COLUMNS
+    documents_path = os.path.join(temp_dir, DOCUMENTS_FILE)
+    with open(documents_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=header, extrasaction='ignore')
+        writer.writeheader()
+        for document in documents:
+            writer.writerow({column: '' if value is None else value for column, value in document.items()})
+    if documents:
+        build_document_index(documents_path)
+
+    meta = {
+        'documents': len(documents),
+        'tokens': len(postings),
+        'bytes': posting_bytes + os.path.getsize(documents_path),
+        'created': time.time(),
+    }
+
+    # Claim the next free segment ID (or merge generation); a concurrent writer may take the same one,
+    # so retry on collision
+    if segment_id is None:
+        names = list_segment_names(folder)
+        segment_id = segment_key(names[-1])[0] + 1 if names else 1
+    while True:
+        meta['id'] = segment_id
+        meta['generation'] = generation
+        with open(os.path.join(temp_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        segment_path = os.path.join(folder, segment_name(segment_id, generation))
+        try:
+            os.rename(temp_dir, segment_path)
+            return segment_path
+        except OSError:
+            if not os.path.exists(segment_path):
+                raise
+            if generation:
+                generation += 1
+            else:
+                segment_id += 1
+
+
+def remove_segment(segment_path):
+    """Unpublishes a segment (its metadata first, so readers stop listing it) and deletes its files."""
+    try:
+        os.remove(os.path.join(segment_path, META_FILE))
+    except FileNotFoundError:
+        pass
+    shutil.rmtree(segment_path, ignore_errors=True)
+
+
+class Segment:
+    """Read access to one published segment."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.id = self.meta['id']
+        self.generation = self.meta.get('generation', 0)
+        self.order = (self.id, self.generation)
+        self.size = self.meta.get('bytes', 0)
+        self.postings = BinaryBarrel(os.path.join(path, POSTINGS_FILE))
+        self.documents_path = os.path.join(path, DOCUMENTS_FILE)
+
+    def lookup(self, token):
+        return self.postings.lookup(token)
+
+    def read_documents(self, doc_ids):
+        if not self.meta.get('documents'):
+            return {}
+        return read_documents(self.documents_path, doc_ids)
+
+    def all_documents(self):
+        """Returns every row of the segment as (header, list of raw string rows)."""
+        with open(self.documents_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            return header, [row for row in reader if row]
+
+
+class SegmentSet:
+    """The live segments of a folder, newest first."""
+
+    def __init__(self, folder, names):
+        self.folder = folder
+        self.names = tuple(names)
+        self.segments = []
+        for name in reversed(self.names):
+            try:
+                self.segments.append(Segment(os.path.join(folder, name)))
+            except (OSError, ValueError, KeyError) as e:
+                # Removed by the compactor between the listing and the open
+                print(f"Skipping segment {name}: {e}", file=sys.stderr)
+
+    def lookup(self, token):
+        """Returns the sorted document IDs of a Token_ID across every segment."""
+        doc_ids = set()
+        for segment in self.segments:
+            doc_ids.update(segment.lookup(token))
+        return sorted(doc_ids)
+
+    def read_documents(self, doc_ids):
+        """Returns Document ID (str) -> row for the requested IDs found in a segment, newest copy first."""
+        documents = {}
+        missing = [str(doc_id) for doc_id in doc_ids]
+        for segment in self.segments:
+            if not missing:
+                break
+            try:
+                documents.update(segment.read_documents(missing))
+            except OSError as e:
+                print(f"Error reading segment {segment.path}: {e}", file=sys.stderr)
+            missing = [doc_id for doc_id in missing if doc_id not in documents]
+        return documents
+
+    def contains_document(self, doc_id):
+        return str(doc_id) in self.read_documents([doc_id])
+
+
+def get_segments(folder=DEFAULT_SEGMENT_FOLDER):
+    """Returns the resident SegmentSet of a folder, reopening it whenever a segment is published or removed."""
+    names = tuple(list_segment_names(folder))
+    with _segments_lock:
+        segment_set = _segment_sets.get(folder)
+        if segment_set is not None and segment_set.names == names:
+            return segment_set
+    segment_set = SegmentSet(folder, names)
+    with _segments_lock:
+        _segment_sets[folder] = segment_set
+    return segment_set
+
+
+def segment_tier(size):
+    """Size tier of a segment: 0 up to MIN_SEGMENT_BYTES, then one tier per MERGE_FACTOR times larger."""
+    if size <= MIN_SEGMENT_BYTES:
+        return 0
+    return 1 + int(math.log(size / MIN_SEGMENT_BYTES, MERGE_FACTOR))
+
+
+def plan_compaction(segments):
+    """
+    Chooses the next compaction step for the given segments (oldest first).
+
+    Returns:
+        tuple | None: ('fold', segments) to fold them into the base barrels, ('merge', segments) to merge
+        MERGE_FACTOR adjacent segments of the lowest tier into a single segment, or None when nothing needs compacting.
+    """
+    if not segments:
+        return None
+    if len(segments) > MAX_SEGMENTS or sum(segment.size for segment in segments) > MAX_SEGMENT_BYTES:
+        return 'fold', segments
+
+    # Only adjacent segments are merged: the merged segment takes the place of its newest input, so merging
+    # around a segment would move the older copies of its documents in front of it
+    tiers = [segment_tier(segment.size) for segment in segments]
+    best = None
+    for start in range(len(segments) - MERGE_FACTOR + 1):
+        run_tiers = set(tiers[start:start + MERGE_FACTOR])
+        if len(run_tiers) == 1 and (best is None or tiers[start] < tiers[best]):
+            best = start
+    return ('merge', segments[best:best + MERGE_FACTOR]) if best is not None else None
+
+
+def newest_postings(segments):
+    """
+    Token_ID -> document IDs of the given segments, where each document contributes only the postings of its
+    newest copy: a document uploaded again must not keep matching the terms of an older version.
+    """
+    postings = {}
+    newer_documents = set()  # Ids of the documents of the segments already visited (newer ones)
+    for segment in sorted(segments, key=lambda segment: segment.order, reverse=True):
+        for token, doc_ids in segment.postings.items():
+            current = [doc_id for doc_id in doc_ids if str(doc_id) not in newer_documents]
+            if current:
+                postings.setdefault(token, set()).update(current)
+        header, rows = segment.all_documents()
+        if 'Id' in header:
+            id_column = header.index('Id')
+            newer_documents.update(row[id_column] for row in rows if len(row) > id_column)
+    return postings
+
+
+def merge_segments(folder, segments):
+    """
+    Merges segments into one new segment and removes them. The newest copy of a document wins, for its row
+    and its postings alike, and the merged segment takes the place of the newest input in the segment order.
+    """
+    documents = {}
+    header = list(DOCUMENT_COLUMNS)
+    for segment in sorted(segments, key=lambda segment: segment.order):
+        segment_header, rows = segment.all_documents()
+        header.extend(column for column in segment_header if column not in header)
+        for row in rows:
+            document = dict(zip(segment_header, row))
+            documents[document.get('Id')] = document
+
+    newest = max(segment.order for segment in segments)
+    merged_path = write_segment(
+        folder, newest_postings(segments), list(documents.values()), header,
+        segment_id=newest[0], generation=newest[1] + 1,
+    )
+    for segment in segments:
+        remove_segment(segment.path)
+    return merged_path
+
+
+if __name__ == "__main__":
+    # List the live segments of a folder and their tiers
+    folder = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SEGMENT_FOLDER
+    for segment in get_segments(folder).segments:
+        print(f"{os.path.basename(segment.path)}: {segment.meta['documents']} documents, "
+              f"{segment.meta['tokens']} tokens, {segment.size} bytes, tier {segment_tier(segment.size)}")
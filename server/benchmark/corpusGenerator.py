@@ -0,0 +1,214 @@
+import os
+import csv
+import sys
+import json
+import random
+from itertools import accumulate
+
+# Synthetic StackOverflow-shaped corpus: Questions.csv, Tags.csv and Answers.csv with the columns
+# datamerger/Merger.py expects. Title/body words and tags follow Zipf distributions (rank r drawn with
+# weight 1 / r^s), so a few tags cover a large share of the questions like language tags do.
+ZIPF_EXPONENT = 1.1
+SYLLABLES = ['ba', 'co', 'de', 'fi', 'ga', 'hu', 'ja', 'ki', 'lo', 'ma', 'ne', 'po', 'qua', 'ri', 'sa',
+             'tu', 've', 'wo', 'xi', 'zo', 'ar', 'en', 'ist', 'on', 'ul']
+COMMON_TAGS = ['python', 'javascript', 'java', 'c#', 'php', 'android', 'html', 'jquery', 'c++', 'css',
+               'ios', 'mysql', 'sql', 'r', 'node.js', 'arrays', 'c', 'django', 'pandas', 'json']
+
+
+def make_vocabulary(size, rng):
+    """Distinct pseudo-words of two to four syllables."""
+    words = []
+    seen = set()
+    while len(words) < size:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+class ZipfSampler:
+    """Draws items with probability proportional to 1 / rank^exponent."""
+
+    def __init__(self, items, rng, exponent=ZIPF_EXPONENT):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(accumulate(1.0 / (rank ** exponent) for rank in range(1, len(items) + 1)))
+
+    def sample(self, count):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights, k=count)
+
+    def distinct(self, count):
+        chosen = []
+        while len(chosen) < count:
+            for item in self.sample(count):
+                if item not in chosen:
+                    chosen.append(item)
+                if len(chosen) == count:
+                    break
+        return chosen
+
+
+def html_paragraphs(words, rng, paragraphs):
+    parts = []
+    for index in range(paragraphs):
+        parts.append(f"<p>{' '.join(words.sample(rng.randint(15, 40)))}</p>")
+        if rng.random() < 0.4:
+            parts.append(f"<pre><code>for item in {words.sample(1)[0]}:\n    print(item, {index})</code></pre>")
+    return ''.join(parts)
+
+
+def creation_date(rng):
+    return (f"20{rng.randint(8, 16):02d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            f"T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z")
+
+
+def make_samplers(vocabulary_size, tag_count, seed):
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    tags = COMMON_TAGS[:tag_count] + make_vocabulary(max(tag_count - len(COMMON_TAGS), 0), random.Random(seed + 1))
+    return rng, ZipfSampler(vocabulary, rng), ZipfSampler(tags[:tag_count], rng)
+
+
+def generate_question(question_id, rng, words, tags):
+    return {
+        'Id': question_id,
+        'CreationDate': creation_date(rng),
+        'Score': max(int(rng.expovariate(0.3)) - 1, -5),
+        'Title': ' '.join(words.sample(rng.randint(4, 12))).capitalize() + '?',
+        'Body': html_paragraphs(words, rng, rng.randint(1, 4)),
+        'Tag': tags.distinct(rng.randint(1, 5)),
+    }
+
+
+def generate_corpus(output_dir, questions=10000, answers_per_question=2.0, vocabulary_size=5000, tag_count=500,
+                    seed=42, first_id=80):
+    """
+    Writes Questions.csv, Tags.csv and Answers.csv into output_dir.
+
+    Args:
+        output_dir (str): Destination folder.
+        questions (int): Number of questions.
+        answers_per_question (float): Mean number of answers (Poisson-like).
+        vocabulary_size (int): Number of distinct title/body words.
+        tag_count (int): Number of distinct tags.
+        seed (int): Random seed; the same arguments always give the same corpus.
+        first_id (int): Id of the first question; Ids then grow with random gaps.
+
+    Returns:
+        dict: Counts and the vocabulary / tag lists, for building query mixes.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng, words, tags = make_samplers(vocabulary_size, tag_count, seed)
+
+    question_id = first_id
+    answer_id = first_id + 1
+    answer_count = 0
+    with open(os.path.join(output_dir, 'Questions.csv'), 'w', newline='', encoding='ISO-8859-1') as qf, \
+            open(os.path.join(output_dir, 'Tags.csv'), 'w', newline='', encoding='ISO-8859-1') as tf, \
+            open(os.path.join(output_dir, 'Answers.csv'), 'w', newline='', encoding='ISO-8859-1') as af:
+        question_writer = csv.writer(qf)
+        tag_writer = csv.writer(tf)
+        answer_writer = csv.writer(af)
+        question_writer.writerow(['Id', 'OwnerUserId', 'CreationDate', 'ClosedDate', 'Score', 'Title', 'Body'])
+        tag_writer.writerow(['Id', 'Tag'])
+        answer_writer.writerow(['Id', 'OwnerUserId', 'CreationDate', 'ParentId', 'Score', 'Body'])
+
+        for _ in range(questions):
+            question = generate_question(question_id, rng, words, tags)
+            question_writer.writerow([
+                question_id, rng.randint(1, 10**6), question['CreationDate'], '', question['Score'],
+                question['Title'], question['Body'],
+            ])
+            for tag in question['Tag']:
+                tag_writer.writerow([question_id, tag])
+            for _ in range(int(rng.expovariate(1 / answers_per_question)) if answers_per_question else 0):
+                answer_writer.writerow([
+                    answer_id, rng.randint(1, 10**6), creation_date(rng), question_id,
+                    int(rng.expovariate(0.3)), html_paragraphs(words, rng, rng.randint(1, 3)),
+                ])
+                answer_id += rng.randint(1, 5)
+                answer_count += 1
+            question_id += rng.randint(1, 20)
+
+    return {
+        'questions': questions,
+        'answers': answer_count,
+        'last_id': question_id,
+        'vocabulary': words.items,
+        'tags': tags.items,
+    }
+
+
+def generate_upload(path, count, first_id, vocabulary_size=5000, tag_count=500, seed=7):
+    """Writes a JSON upload (the format file-upload/uploadFile.py accepts) of count new questions."""
+    rng, words, tags = make_samplers(vocabulary_size, tag_count, seed)
+    documents = []
+    for offset in range(count):
+        question = generate_question(first_id + offset, rng, words, tags)
+        documents.append({
+            'id': question['Id'],
+            'CreationDate': question['CreationDate'],
+            'Score': question['Score'],
+            'Title': question['Title'],
+            'Body': question['Body'],
+            'Tag': ','.join(question['Tag']),
+            'Answer': html_paragraphs(words, rng, 1),
+        })
+    with open(path, 'w', encoding='ISO-8859-1') as f:
+        json.dump(documents, f)
+    return count
+
+
+def misspell(word, rng):
+    """One random edit (deletion, substitution or transposition), to exercise the fuzzy fallback."""
+    if len(word) < 4:
+        return word
+    position = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(('delete', 'substitute', 'transpose'))
+    if edit == 'delete':
+        return word[:position] + word[position + 1:]
+    if edit == 'substitute':
+        return word[:position] + rng.choice('aeiou') + word[position + 1:]
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+def query_mix(vocabulary, tags, count, seed=3):
+    """
+    A replayable list of (kind, query) pairs covering the query syntax: frequent tags, rare words,
+    AND / OR / NOT combinations and misspellings.
+    """
+    rng = random.Random(seed)
+    words = ZipfSampler(vocabulary, rng)
+    tag_words = [tag for tag in tags if tag.isalpha()]
+    hot_tags = tag_words[:10]
+    rare_words = vocabulary[len(vocabulary) // 2:]
+    kinds = [
+        ('hot_tag', lambda: rng.choice(hot_tags)),
+        ('rare_word', lambda: rng.choice(rare_words)),
+        ('and', lambda: ' '.join(words.sample(2))),
+        ('hot_and', lambda: f"{rng.choice(hot_tags)} {rng.choice(hot_tags)}"),
+        ('or', lambda: f"{words.sample(1)[0]} OR {rng.choice(hot_tags)}"),
+        ('not', lambda: f"{rng.choice(hot_tags)} -{words.sample(1)[0]}"),
+        ('phrase', lambda: ' '.join(words.sample(3))),
+        ('misspelled', lambda: misspell(words.sample(1)[0], rng)),
+    ]
+    queries = []
+    for _ in range(count):
+        kind, make = rng.choice(kinds)
+        queries.append((kind, make()))
+    return queries
+
+
+def prefix_mix(vocabulary, count, seed=4):
+    """Prefixes (two to four characters) of Zipf-sampled words, to replay against the suggest endpoint."""
+    rng = random.Random(seed)
+    words = ZipfSampler(vocabulary, rng)
+    return [word[:rng.randint(2, 4)] for word in words.sample(count)]
+
+
+if __name__ == "__main__":
+    # python benchmark/corpusGenerator.py [output folder] [questions]
+    folder = sys.argv[1] if len(sys.argv) > 1 else "./benchmark/corpus"
+    summary = generate_corpus(folder, questions=int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
+    print(f"Wrote {summary['questions']} questions and {summary['answers']} answers to {folder}")
@@ -0,0 +1,406 @@
+import os
+import sys
+import csv
+import json
+import math
+import time
+import shutil
+import resource
+import platform
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Server folder and the component folders the pipeline modules are imported from
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_DIRS = ['benchmark', 'datamerger', 'forwardindexer', 'lemmatizer', 'InvertedIndexer', 'barrel', 'Barrels',
+               os.path.join('file-upload', 'components'), 'file-upload', 'search-query']
+for module_dir in MODULE_DIRS:
+    path = os.path.join(SERVER_DIR, module_dir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from corpusGenerator import generate_corpus, generate_upload, prefix_mix, query_mix
+
+# End-to-end build and query benchmark on a synthetic corpus.
+#
+# Every stage runs in a fresh process whose working directory is the benchmark folder, so the
+# './dataset/...' paths the components use (barrels, lexicon, lemma table, segments) point at the
+# benchmark's own dataset and never at the real one, and each stage's peak RSS is its own.
+# The vocabulary (lt1.csv), lemma table, lexicon and SymSpell index are built like in a deployment, so every
+# query kind, misspellings and suggestions included, exercises the real path; a query kind that returns
+# nothing fails the run. Results are written as JSON; --compare flags stages and query percentiles that got slower.
+DEFAULT_WORK_DIR = './benchmark/run'
+INDEXERS = ('legacy', 'spimi', 'numpy')
+REGRESSION_THRESHOLD = 0.10
+RESULTS_VERSION = 2
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process and its finished children (ru_maxrss is KiB on Linux)."""
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+
+def folder_bytes(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'p50_ms': percentile(ordered, 0.50),
+        'p95_ms': percentile(ordered, 0.95),
+        'p99_ms': percentile(ordered, 0.99),
+        'max_ms': ordered[-1] if ordered else None,
+    }
+
+
+# Pipeline stages. Each runs inside the benchmark folder and returns a dict of stage metrics.
+
+def stage_merge(corpus_dir):
+    from Merger import merge_datasets
+    rows = merge_datasets(
+        os.path.join(corpus_dir, 'Questions.csv'),
+        os.path.join(corpus_dir, 'Tags.csv'),
+        os.path.join(corpus_dir, 'Answers.csv'),
+        './dataset/MergedData.csv',
+    )
+    return {'rows': rows}
+
+
+def stage_vocabulary():
+    """
+    Builds the vocabulary (lt1.csv) and the lemma table from the merged data, then the lexicon from the
+    vocabulary, and relabels the vocabulary with the lexicon's term IDs (the IDs the forward index will use).
+    """
+    from lemmatizer_and_tokenizer import lemmatize_and_save
+    from lexicon import Lexicon, build_lexicon
+    vocabulary_file = './dataset/lt1.csv'
+    lemmatize_and_save('./dataset/MergedData.csv', vocabulary_file)
+
+    csv.field_size_limit(2**31 - 1)
+    with open(vocabulary_file, 'r', encoding='ISO-8859-1', newline='') as f:
+        rows = [row for row in csv.DictReader(f) if row.get('lemmatizedtag')]
+    terms = build_lexicon([row['lemmatizedtag'] for row in rows], './dataset/lexicon.bin')
+
+    lexicon = Lexicon('./dataset/lexicon.bin')
+    relabeled = {}
+    for row in rows:
+        term_id = lexicon.lookup(row['lemmatizedtag'])
+        if term_id is not None:
+            token = f"{term_id}#" if row['id'].strip().endswith('#') else str(term_id)
+            relabeled[(token, row['lemmatizedtag'].strip().lower())] = None
+    lexicon.close()
+    temp_path = f"{vocabulary_file}.tmp"
+    with open(temp_path, 'w', encoding='ISO-8859-1', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'lemmatizedtag'])
+        writer.writerows(relabeled)
+    os.replace(temp_path, vocabulary_file)
+    return {'terms': terms, 'vocabulary_rows': len(relabeled)}
+
+
+def stage_forward(workers=None):
+    from forwardindexer import process_data_parallel
+    process_data_parallel('./dataset/MergedData.csv', './dataset/MergedData_with_tokens.csv', workers)
+    return {'bytes': os.path.getsize('./dataset/MergedData_with_tokens.csv')}
+
+
+def stage_inverted(indexer):
+    tokens_file = './dataset/MergedData_with_tokens.csv'
+    if indexer == 'spimi':
+        from spimiIndexer import build_index_spimi
+        barrels = build_index_spimi(tokens_file, './dataset/barrels')
+    elif indexer == 'numpy':
+        from numpyIndexer import build_index_numpy
+        barrels = build_index_numpy(tokens_file, './dataset/barrels')
+    else:
+        from InvertedIndexer import create_Inverted_Index
+        from invertedIndexBarrels import create_barrels_with_range
+        if create_Inverted_Index(tokens_file, './dataset/Inverted_Index.csv') is None:
+            raise RuntimeError("Inverted index build failed")
+        create_barrels_with_range('./dataset/Inverted_Index.csv', './dataset/barrels')
+        barrels = len([name for name in os.listdir('./dataset/barrels') if name.endswith('.csv')])
+    return {'indexer': indexer, 'barrels': barrels}
+
+
+def stage_fuzzy():
+    """SymSpell index of the vocabulary, weighted by the document frequencies of the new field statistics."""
+    from fuzzy import build_fuzzy_index
+    index = build_fuzzy_index()
+    return {'terms': len(index.terms), 'deletes': len(index.deletes)}
+
+
+def stage_documents():
+    from BarrelsData import create_document_barrels
+    from documentIndex import DOCUMENT_BARREL_SIZE
+    from columnStore import build_column_store
+    folder = './dataset/DocumentBarrels'
+    barrels = create_document_barrels('./dataset/MergedData_with_tokens.csv', folder, DOCUMENT_BARREL_SIZE)
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.startswith('barrel_') and file_name.endswith('.csv'):
+            build_column_store(os.path.join(folder, file_name))
+    return {'barrels': barrels}
+
+
+def stage_ingest(upload_file, documents):
+    from uploadFile import process_upload
+    from compactor import compact
+    dataset = os.path.abspath('./dataset')
+    started = time.perf_counter()
+    published = process_upload(upload_file, dataset)
+    publish_seconds = time.perf_counter() - started
+    steps = compact(os.path.join(dataset, 'segments'), os.path.join(dataset, 'barrels'),
+                    os.path.join(dataset, 'DocumentBarrels'))
+    return {
+        'documents': documents,
+        'published': published,
+        'publish_seconds': publish_seconds,
+        'docs_per_second': published / max(publish_seconds, 1e-9),
+        'compaction_steps': steps,
+    }
+
+
+def stage_queries(queries, prefixes, limit, warmup):
+    from queryEngine import searchQuery
+    from suggest import suggest
+    for _, query in queries[:warmup]:
+        searchQuery(query, limit)
+    for prefix in prefixes[:warmup]:
+        suggest(prefix)
+
+    latencies = {}
+    answered = {}
+    empty = 0
+    errors = 0
+
+    def record(kind, started, result):
+        latencies.setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+        answered[kind] = answered.get(kind, 0) + (1 if isinstance(result, list) and result else 0)
+
+    for kind, query in queries:
+        started = time.perf_counter()
+        result = searchQuery(query, limit)
+        record(kind, started, result)
+        if isinstance(result, dict):
+            if result.get('error') == "No results found.":
+                empty += 1
+            else:
+                errors += 1
+    for prefix in prefixes:
+        started = time.perf_counter()
+        record('suggest', started, suggest(prefix))
+
+    # A kind that never returns anything measures an early exit, not the path it is meant to cover
+    silent = sorted(kind for kind in latencies if not answered[kind])
+    if silent:
+        raise RuntimeError(f"No results for any query of kind(s): {', '.join(silent)}")
+
+    every = [latency for kind, values in latencies.items() if kind != 'suggest' for latency in values]
+    return {
+        'queries': len(every),
+        'suggestions': len(prefixes),
+        'empty': empty,
+        'errors': errors,
+        'latency': latency_summary(every),
+        'by_kind': {kind: {**latency_summary(values), 'answered': answered[kind]}
+                    for kind, values in sorted(latencies.items())},
+    }
+
+
+STAGES = {
+    'merge': stage_merge,
+    'vocabulary': stage_vocabulary,
+    'forward_index': stage_forward,
+    'inverted_index': stage_inverted,
+    'fuzzy_index': stage_fuzzy,
+    'document_barrels': stage_documents,
+    'ingest': stage_ingest,
+    'queries': stage_queries,
+}
+
+
+def _run_stage(work_dir, stage, kwargs):
+    os.chdir(work_dir)
+    started = time.perf_counter()
+    metrics = STAGES[stage](**kwargs)
+    return {'seconds': time.perf_counter() - started, 'peak_rss_bytes': peak_rss_bytes(), **metrics}
+
+
+def run_stage(work_dir, stage, **kwargs):
+    """Runs one stage in a fresh process (spawned, so its RSS does not start from this process's)."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        result = executor.submit(_run_stage, work_dir, stage, kwargs).result()
+    print(f"[{stage}] {result['seconds']:.2f}s, peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MiB")
+    return result
+
+
+def run_benchmark(work_dir=DEFAULT_WORK_DIR, questions=10000, indexer='spimi', query_count=500, upload_count=200,
+                  limit=30, workers=None, seed=42, suggest_count=100):
+    """
+    Generates a corpus, builds the whole index from it, ingests an upload and replays a query mix.
+
+    Args:
+        work_dir (str): Benchmark folder; its previous contents are removed.
+        questions (int): Questions in the synthetic corpus.
+        indexer (str): 'legacy' (InvertedIndexer + invertedIndexBarrels), 'spimi' or 'numpy'.
+        query_count (int): Queries replayed against the finished index.
+        upload_count (int): Documents in the ingest upload.
+        limit (int): Results per query.
+        workers (int): Forward indexer processes (every CPU by default).
+        seed (int): Corpus seed; the same seed and scale give the same corpus and query mix.
+        suggest_count (int): Prefixes replayed against suggest.
+
+    Returns:
+        dict: The benchmark results.
+    """
+    if indexer not in INDEXERS:
+        raise ValueError(f"Unknown indexer '{indexer}', expected one of {', '.join(INDEXERS)}")
+    work_dir = os.path.abspath(work_dir)
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    corpus_dir = os.path.join(work_dir, 'corpus')
+    os.makedirs(os.path.join(work_dir, 'dataset'))
+
+    started = time.perf_counter()
+    corpus = generate_corpus(corpus_dir, questions=questions, seed=seed)
+    generation_seconds = time.perf_counter() - started
+    upload_file = os.path.join(work_dir, 'upload.json')
+    generate_upload(upload_file, upload_count, corpus['last_id'] + 1, seed=seed + 1)
+    queries = query_mix(corpus['vocabulary'], corpus['tags'], query_count, seed=seed + 2)
+    prefixes = prefix_mix(corpus['vocabulary'], suggest_count, seed=seed + 3)
+
+    stages = {
+        'merge': run_stage(work_dir, 'merge', corpus_dir=corpus_dir),
+        'vocabulary': run_stage(work_dir, 'vocabulary'),
+        'forward_index': run_stage(work_dir, 'forward_index', workers=workers),
+        'inverted_index': run_stage(work_dir, 'inverted_index', indexer=indexer),
+        'fuzzy_index': run_stage(work_dir, 'fuzzy_index'),
+        'document_barrels': run_stage(work_dir, 'document_barrels'),
+    }
+    build_seconds = sum(stage['seconds'] for stage in stages.values())
+    dataset = os.path.join(work_dir, 'dataset')
+    index_bytes = {
+        'barrels': folder_bytes(os.path.join(dataset, 'barrels')),
+        'document_barrels': folder_bytes(os.path.join(dataset, 'DocumentBarrels')),
+        'field_stats': folder_bytes(os.path.join(dataset, 'field_stats')),
+        'corpus': folder_bytes(corpus_dir),
+    }
+    stages['ingest'] = run_stage(work_dir, 'ingest', upload_file=upload_file, documents=upload_count)
+    stages['queries'] = run_stage(work_dir, 'queries', queries=queries, prefixes=prefixes, limit=limit,
+                                  warmup=min(20, query_count))
+
+    return {
+        'version': RESULTS_VERSION,
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'config': {'questions': questions, 'answers': corpus['answers'], 'indexer': indexer, 'queries': query_count,
+                   'upload': upload_count, 'limit': limit, 'workers': workers, 'seed': seed,
+                   'suggestions': suggest_count},
+        'generation_seconds': generation_seconds,
+        'build_seconds': build_seconds,
+        'build_peak_rss_bytes': max(stage['peak_rss_bytes'] for name, stage in stages.items()
+                                    if name not in ('ingest', 'queries')),
+        'index_bytes': index_bytes,
+        'vocabulary_bytes': {name: os.path.getsize(os.path.join(dataset, name))
+                             for name in ('lt1.csv', 'lemma_table.tsv', 'lexicon.bin')},
+        'ingest_docs_per_second': stages['ingest']['docs_per_second'],
+        'query_latency': stages['queries']['latency'],
+        'stages': stages,
+    }
+
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Lists the measurements that got worse than baseline by more than threshold (a fraction).
+
+    Returns:
+        list: (name, baseline value, current value) for every regression.
+    """
+    checks = [('build_seconds', False), ('build_peak_rss_bytes', False), ('ingest_docs_per_second', True)]
+    pairs = [(name, baseline.get(name), current.get(name), higher_is_better) for name, higher_is_better in checks]
+    for stage, metrics in current.get('stages', {}).items():
+        pairs.append((f"stages.{stage}.seconds", baseline.get('stages', {}).get(stage, {}).get('seconds'),
+                      metrics.get('seconds'), False))
+    for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+        pairs.append((f"query_latency.{key}", baseline.get('query_latency', {}).get(key),
+                      current.get('query_latency', {}).get(key), False))
+
+    regressions = []
+    for name, before, after, higher_is_better in pairs:
+        if not before or after is None:
+            continue
+        change = (before - after) / before if higher_is_better else (after - before) / before
+        if change > threshold:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def print_summary(results):
+    latency = results['query_latency']
+    print(f"Corpus: {results['config']['questions']} questions, {results['config']['answers']} answers")
+    print(f"Build: {results['build_seconds']:.1f}s, peak RSS {results['build_peak_rss_bytes'] / 2**20:.0f} MiB")
+    print("Index: " + ', '.join(f"{name} {size / 2**20:.1f} MiB" for name, size in results['index_bytes'].items()))
+    print(f"Ingest: {results['ingest_docs_per_second']:.0f} docs/s")
+    print(f"Queries: p50 {latency['p50_ms']:.2f}ms, p95 {latency['p95_ms']:.2f}ms, p99 {latency['p99_ms']:.2f}ms")
+    for kind, summary in results['stages']['queries']['by_kind'].items():
+        print(f"  {kind}: {summary['count']} queries ({summary['answered']} with results), "
+              f"p50 {summary['p50_ms']:.2f}ms, p95 {summary['p95_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    # python benchmark/runBenchmark.py [--questions N] [--indexer legacy|spimi|numpy] [--queries N] [--upload N]
+    #     [--suggestions N] [--workers N] [--seed N] [--work-dir DIR] [--output results.json]
+    #     [--compare baseline.json] [--threshold 0.1]
+    options = {}
+    argv = iter(sys.argv[1:])
+    for argument in argv:
+        if argument.startswith('--'):
+            options[argument[2:]] = next(argv, None)
+
+    results = run_benchmark(
+        work_dir=options.get('work-dir', DEFAULT_WORK_DIR),
+        questions=int(options.get('questions', 10000)),
+        indexer=options.get('indexer', 'spimi'),
+        query_count=int(options.get('queries', 500)),
+        upload_count=int(options.get('upload', 200)),
+        workers=int(options['workers']) if options.get('workers') else None,
+        seed=int(options.get('seed', 42)),
+        suggest_count=int(options.get('suggestions', 100)),
+    )
+    output = options.get('output', './benchmark/results.json')
+    save_results(results, output)
+    print_summary(results)
+    print(f"Results written to {output}")
+
+    if options.get('compare'):
+        with open(options['compare']) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, float(options.get('threshold', REGRESSION_THRESHOLD)))
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.4g} -> {after:.4g}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {options['compare']}")
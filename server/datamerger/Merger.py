@@ -1,39 +1,53 @@
 import pandas as pd
-# Read the CSV files
 
-dfT = pd.DataFrame(pd.read_csv('./server/jsondataset/Tags.csv', encoding='ISO-8859-1'))
-dfQ = pd.DataFrame(pd.read_csv('./server/jsondataset/Questions.csv', encoding='ISO-8859-1'))
-dfA = pd.DataFrame(pd.read_csv('./server/jsondataset/Answers.csv', encoding='ISO-8859-1'))
 
-# Drop columns that are not needed
-dfQ = dfQ.drop(columns=["OwnerUserId", "ClosedDate"])
+def merge_datasets(questions_file, tags_file, answers_file, output_file):
+    """
+    Merges the StackOverflow questions, tags and answers into one row per question
+    (Id, CreationDate, Score, Title, Body, Tag, Answer) and saves it as CSV.
+    """
+    # Read the CSV files
+    dfT = pd.DataFrame(pd.read_csv(tags_file, encoding='ISO-8859-1'))
+    dfQ = pd.DataFrame(pd.read_csv(questions_file, encoding='ISO-8859-1'))
+    dfA = pd.DataFrame(pd.read_csv(answers_file, encoding='ISO-8859-1'))
 
-# Merge the questions.csv and tags.csv
-dfm = dfQ.merge(dfT, on="Id", how="left")
+    # Drop columns that are not needed
+    dfQ = dfQ.drop(columns=["OwnerUserId", "ClosedDate"])
 
-# Group the tags by Id and join them with a comma
-dfm['Tag'] = dfm.groupby('Id')['Tag'].transform(
-    lambda x: ','.join(str(tag) for tag in x.dropna().unique())
-)
-# Drop the duplicates after grouping
-dfm = dfm.drop_duplicates(subset='Id', keep='first')
+    # Merge the questions.csv and tags.csv
+    dfm = dfQ.merge(dfT, on="Id", how="left")
 
-# Drop the columns that are not needed from the answers DataFrame
-dfA = dfA.drop(columns=["Id","OwnerUserId", "CreationDate", "Score"])
+    # Group the tags by Id and join them with a comma
+    dfm['Tag'] = dfm.groupby('Id')['Tag'].transform(
+        lambda x: ','.join(str(tag) for tag in x.dropna().unique())
+    )
+    # Drop the duplicates after grouping
+    dfm = dfm.drop_duplicates(subset='Id', keep='first')
 
-# Rename the column ParentId to Id in the answers DataFrame
-dfA.rename(columns={"ParentId": "Id", "Body": "Answer"}, inplace=True)
+    # Drop the columns that are not needed from the answers DataFrame
+    dfA = dfA.drop(columns=["Id","OwnerUserId", "CreationDate", "Score"])
 
-# Group the answers by Id and join them with a comma
-dfA_grouped = dfA.groupby('Id')['Answer'].apply(lambda x: ',,,,,'.join(x.dropna().unique())).reset_index()
+    # Rename the column ParentId to Id in the answers DataFrame
+    dfA.rename(columns={"ParentId": "Id", "Body": "Answer"}, inplace=True)
 
-# Merge the answers DataFrame with the merged tags and questions DataFrame
-dfm = dfm.merge(dfA_grouped, on='Id', how='left')
+    # Group the answers by Id and join them with a comma
+    dfA_grouped = dfA.groupby('Id')['Answer'].apply(lambda x: ',,,,,'.join(x.dropna().unique())).reset_index()
 
-# Drop any duplicate rows based on the 'Id' column
-dfm = dfm.drop_duplicates(subset='Id', keep='first')
+    # Merge the answers DataFrame with the merged tags and questions DataFrame
+    dfm = dfm.merge(dfA_grouped, on='Id', how='left')
 
+    # Drop any duplicate rows based on the 'Id' column
+    dfm = dfm.drop_duplicates(subset='Id', keep='first')
 
-# Save the merged DataFrame to a CSV file
-dfm.to_csv("./server/jsondataset/Mergeddata.csv", index=False)
+    # Save the merged DataFrame to a CSV file
+    dfm.to_csv(output_file, index=False)
+    return len(dfm)
 
+
+if __name__ == "__main__":
+    merge_datasets(
+        './server/jsondataset/Questions.csv',
+        './server/jsondataset/Tags.csv',
+        './server/jsondataset/Answers.csv',
+        './server/jsondataset/Mergeddata.csv',
+    )
@@ -1,6 +1,7 @@
 import {spawn} from "child_process"
 import { fileURLToPath } from 'url';
-import { dirname, resolve } from 'path';
+import { dirname, resolve, join } from 'path';
+import fse from "fs-extra";
 
 export async function uploadDocument(filePath) {
   const __filename = fileURLToPath(import.meta.url);
@@ -34,91 +35,334 @@ export async function uploadDocument(filePath) {
 }
 
 
-export function searchDocuments(args, limit) {
-  return new Promise((resolve, reject) => {
-    const words = args.split(" ");
+// The whole query (AND / OR / NOT) is evaluated and ranked by search-query/queryEngine.py
+// fields is an optional comma-separated projection such as "Id,Title,Score"
+// With timings set the result is { results, timings }, timings being the per-stage breakdown of the request
+export function searchDocuments(args, limit, fields, timings) {
+  const request = { op: "query", query: args, limit: parseInt(limit, 10) || 30 };
+  if (fields) {
+    request.fields = String(fields).split(",");
+  }
+  if (timings) {
+    request.timings = true;
+    return getSearchPool()
+      .send(request, true)
+      .then((response) => ({
+        results: Array.isArray(response.result) ? response.result : [],
+        timings: response.timings,
+      }))
+      .catch((error) => {
+        throw `Error executing search query: ${error}`;
+      });
+  }
+  return getSearchPool()
+    .send(request)
+    // A query without matches comes back as {"error": "No results found."}
+    .then((results) => (Array.isArray(results) ? results : []))
+    .catch((error) => {
+      throw `Error executing search query: ${error}`;
+    });
+}
 
-    // Run the Python script for each word in parallel
-    const promises = words.map((word) => runPythonScript(word, limit));
 
-    // Wait for all promises to resolve or reject
-    Promise.all(promises)
-      .then(async(results) => {
+// EXPLAIN plan of a query (search-query/slowQueryLog.py query_plan): terms, token IDs, barrels,
+// posting-list and candidate sizes and stage times of an uncached run, without the documents
+export function explainQuery(args, limit, fields) {
+  const request = { op: "query", query: args, limit: parseInt(limit, 10) || 30, explain: true };
+  if (fields) {
+    request.fields = String(fields).split(",");
+  }
+  return getSearchPool()
+    .send(request)
+    .catch((error) => {
+      throw `Error explaining search query: ${error}`;
+    });
+}
 
-        // After getting results, slice the first `limit` documents
-        const docs = results.slice(0, limit);
-        const sortedResults = mergeAndPrioritizeResults(docs, limit); // Pass limit to merge function
-        resolve(sortedResults);
-      })
-      .catch((error) => {
-        reject(`Error executing Python script: ${error}`);
-      });
-  });
+
+// Prefix completions from the vocabulary trie in search-query/suggest.py
+export function suggestTerms(prefix, limit) {
+  return getSearchPool()
+    .send({ op: "suggest", prefix, limit: parseInt(limit, 10) || 10 })
+    .then((results) => (Array.isArray(results) ? results : []))
+    .catch((error) => {
+      throw `Error fetching suggestions: ${error}`;
+    });
 }
 
-function mergeAndPrioritizeResults(resultsArray, limit) {
-  const mergedResults = {};
 
-  // Aggregate results and count occurrences
-  resultsArray.forEach((results) => {
-    results.forEach((doc) => {
-      const docId = doc.Id;
-      if (!mergedResults[docId]) {
-        mergedResults[docId] = { ...doc, occurrence: 1 };
-      } else {
-        mergedResults[docId].occurrence += 1;
-        mergedResults[docId].Score += doc.Score; // Adjust if needed
-      }
+// Result cache counters of the search workers, summed over the pool (search-query/resultCache.py)
+export function cacheStats() {
+  return getSearchPool()
+    .broadcast({ op: "cache_stats" })
+    .then((perWorker) => {
+      const counters = ["hits", "file_hits", "misses", "evictions", "file_evictions", "stores", "entries", "bytes"];
+      const total = Object.fromEntries(
+        counters.map((counter) => [counter, perWorker.reduce((sum, stats) => sum + (stats[counter] || 0), 0)])
+      );
+      const lookups = total.hits + total.file_hits + total.misses;
+      total.hit_rate = lookups ? (total.hits + total.file_hits) / lookups : 0;
+      total.generation = Math.max(...perWorker.map((stats) => stats.generation ?? 0));
+      return { ...total, workers: perWorker };
+    })
+    .catch((error) => {
+      throw `Error collecting cache statistics: ${error}`;
     });
-  });
+}
 
-  // Convert to array and sort
-  const sortedResults = Object.values(mergedResults).sort((a, b) => {
-    // Primary: Sort by occurrences
-    if (b.occurrence !== a.occurrence) {
-      return b.occurrence - a.occurrence;
-    }
 
-    // Secondary: Sort by Score
-    if (b.Score !== a.Score) {
-      return b.Score - a.Score;
+// Metric snapshots written by the upload and compactor processes (barrel/metrics.py save_metrics)
+const METRICS_FOLDER = resolve("./dataset/metrics");
+
+// Sum of barrel/metrics.py snapshots: counters and gauges add up, histogram buckets add up per stage
+function mergeSnapshots(snapshots) {
+  const merged = { buckets: [], counters: {}, gauges: {}, histograms: {} };
+  for (const snapshot of snapshots) {
+    merged.buckets = snapshot.buckets || merged.buckets;
+    for (const kind of ["counters", "gauges"]) {
+      for (const [name, value] of Object.entries(snapshot[kind] || {})) {
+        merged[kind][name] = (merged[kind][name] || 0) + value;
+      }
     }
-    if(b.CreationDate !== a.CreationDate){
-    return b.CreationDate - a.CreationDate;
+    for (const [stage, histogram] of Object.entries(snapshot.histograms || {})) {
+      const target = (merged.histograms[stage] ??= { counts: histogram.counts.map(() => 0), sum: 0 });
+      histogram.counts.forEach((count, index) => {
+        target.counts[index] += count;
+      });
+      target.sum += histogram.sum;
     }
-  });
+  }
+  return merged;
+}
 
-  return sortedResults.slice(0, limit);
+// Prometheus text exposition format (version 0.0.4) of a merged snapshot
+function prometheusText(snapshot, workers) {
+  const lines = [
+    "# HELP bolt_search_workers Search worker processes that answered the scrape.",
+    "# TYPE bolt_search_workers gauge",
+    `bolt_search_workers ${workers}`,
+    "# HELP bolt_stage_seconds Time spent per search, upload and compaction stage.",
+    "# TYPE bolt_stage_seconds histogram",
+  ];
+  for (const stage of Object.keys(snapshot.histograms).sort()) {
+    const { counts, sum } = snapshot.histograms[stage];
+    let cumulative = 0;
+    counts.forEach((count, index) => {
+      cumulative += count;
+      const le = index < snapshot.buckets.length ? snapshot.buckets[index] : "+Inf";
+      lines.push(`bolt_stage_seconds_bucket{stage="${stage}",le="${le}"} ${cumulative}`);
+    });
+    lines.push(`bolt_stage_seconds_sum{stage="${stage}"} ${sum}`);
+    lines.push(`bolt_stage_seconds_count{stage="${stage}"} ${cumulative}`);
+  }
+  for (const name of Object.keys(snapshot.counters).sort()) {
+    lines.push(`# TYPE bolt_${name}_total counter`, `bolt_${name}_total ${snapshot.counters[name]}`);
+  }
+  for (const name of Object.keys(snapshot.gauges).sort()) {
+    lines.push(`# TYPE bolt_${name} gauge`, `bolt_${name} ${snapshot.gauges[name]}`);
+  }
+  return lines.join("\n") + "\n";
 }
 
+// Metrics of every search worker plus the saved upload / compactor snapshots, in Prometheus text format
+export async function metricsText() {
+  try {
+    const perWorker = await getSearchPool().broadcast({ op: "metrics" });
+    const files = (await fse.pathExists(METRICS_FOLDER))
+      ? (await fse.readdir(METRICS_FOLDER)).filter((name) => name.endsWith(".json"))
+      : [];
+    const saved = await Promise.all(
+      files.map((name) => fse.readJson(join(METRICS_FOLDER, name)).catch(() => null))
+    );
+    return prometheusText(mergeSnapshots([...perWorker, ...saved.filter(Boolean)]), perWorker.length);
+  } catch (error) {
+    throw `Error collecting metrics: ${error}`;
+  }
+}
 
-function runPythonScript(word,limit) {
-  return new Promise((resolve, reject) => {
-    const pythonProcess = spawn("python", ["./search-query/searchDos.py", word,limit]);
-    
-    let output = "";
-    let errorOutput = "";
 
-    pythonProcess.stdout.on("data", (data) => {
-      output += data.toString();
+// Long-lived search workers (search-query/searchDaemon.py) shared by every request
+const SEARCH_WORKERS = parseInt(process.env.SEARCH_WORKERS || "2", 10);
+// Milliseconds a search request may wait for a worker and its answer before it is rejected
+const SEARCH_TIMEOUT_MS = parseInt(process.env.SEARCH_TIMEOUT_MS || "30000", 10);
+
+class SearchWorker {
+  // onAvailable is called whenever the worker (re)starts and can take requests
+  constructor(onAvailable) {
+    this.pending = new Map();
+    this.nextId = 0;
+    this.buffer = "";
+    this.available = false;
+    this.onAvailable = onAvailable;
+    this.start();
+  }
+
+  start() {
+    const child = spawn("python", ["./search-query/searchDaemon.py"]);
+    this.process = child;
+    this.process.stdin.on("error", (error) => {
+      console.error(`Search worker stdin error: ${error}`);
     });
 
-    pythonProcess.stderr.on("data", (data) => {
-      errorOutput += data.toString();
+    this.process.on("spawn", () => {
+      this.available = true;
+      this.onAvailable?.();
     });
 
-    pythonProcess.on("close", (code) => {
-      if (code === 0) {
-        try {
-          // Parse JSON output
-          const results = JSON.parse(output.trim());
-          resolve(results);
-        } catch (error) {
-          reject(`Failed to parse Python script output for word "${word}": ${error}`);
+    this.process.stdout.on("data", (data) => {
+      this.buffer += data.toString();
+      let newline;
+      while ((newline = this.buffer.indexOf("\n")) !== -1) {
+        const line = this.buffer.slice(0, newline).trim();
+        this.buffer = this.buffer.slice(newline + 1);
+        if (line) {
+          this.handleResponse(line);
         }
-      } else {
-        reject(`Python script exited with code ${code} for word "${word}": ${errorOutput}`);
       }
     });
+
+    this.process.stderr.on("data", (data) => {
+      console.log(`Search worker: ${data.toString()}`);
+    });
+
+    // A worker that fails to spawn emits "error", one that dies emits "close" (possibly both): restart once
+    let stopped = false;
+    const stop = (reason) => {
+      if (stopped) {
+        return;
+      }
+      stopped = true;
+      console.error(`Search worker ${reason}, restarting`);
+      // Take the worker out of the pool until its replacement runs, and fail everything still in flight on it
+      this.available = false;
+      for (const { reject, timer } of this.pending.values()) {
+        clearTimeout(timer);
+        reject(`Search worker ${reason}`);
+      }
+      this.pending.clear();
+      this.buffer = "";
+      setTimeout(() => this.start(), 1000);
+    };
+    this.process.on("error", (error) => stop(`failed: ${error}`));
+    this.process.on("close", (code) => stop(`exited with code ${code}`));
+  }
+
+  handleResponse(line) {
+    let response;
+    try {
+      response = JSON.parse(line);
+    } catch (error) {
+      console.error(`Failed to parse search worker output: ${error}`);
+      return;
+    }
+    const request = this.pending.get(response.id);
+    if (!request) {
+      return; // Timed out already
+    }
+    this.pending.delete(response.id);
+    clearTimeout(request.timer);
+    if (response.error && !request.raw) {
+      request.reject(response.error);
+    } else {
+      request.resolve(request.raw ? response : response.result);
+    }
+  }
+
+  // With raw set the promise resolves to the whole response (e.g. to read "timings"), errors included.
+  // The promise is rejected if no answer arrives within timeout milliseconds.
+  send(request, raw = false, timeout = SEARCH_TIMEOUT_MS) {
+    return new Promise((resolve, reject) => {
+      if (!this.available) {
+        reject("Search worker is restarting");
+        return;
+      }
+      const id = this.nextId++;
+      const timer = setTimeout(() => {
+        if (this.pending.delete(id)) {
+          reject(`Search request timed out after ${timeout} ms`);
+        }
+      }, timeout);
+      this.pending.set(id, { resolve, reject, raw, timer });
+      this.process.stdin.write(JSON.stringify({ ...request, id }) + "\n");
+    });
+  }
+}
+
+class SearchWorkerPool {
+  constructor(size) {
+    this.waiting = []; // Requests that arrived while no worker was running
+    this.workers = Array.from({ length: size }, () => new SearchWorker(() => this.drain()));
+  }
+
+  // The running worker with the fewest requests in flight, or null while every worker is restarting
+  pick() {
+    return this.workers
+      .filter((worker) => worker.available)
+      .reduce((least, current) => (!least || current.pending.size < least.pending.size ? current : least), null);
+  }
+
+  send(request, raw = false, timeout = SEARCH_TIMEOUT_MS) {
+    const worker = this.pick();
+    if (worker) {
+      return worker.send(request, raw, timeout);
+    }
+    // Wait for a worker to come back, within the same overall timeout
+    return new Promise((resolve, reject) => {
+      const entry = { request, raw, resolve, reject, deadline: Date.now() + timeout };
+      entry.timer = setTimeout(() => {
+        this.waiting = this.waiting.filter((waiting) => waiting !== entry);
+        reject(`Search request timed out after ${timeout} ms waiting for a search worker`);
+      }, timeout);
+      this.waiting.push(entry);
+    });
+  }
+
+  // Hand the waiting requests to the workers that are running again
+  drain() {
+    let worker;
+    while (this.waiting.length && (worker = this.pick())) {
+      const entry = this.waiting.shift();
+      clearTimeout(entry.timer);
+      worker
+        .send(entry.request, entry.raw, Math.max(entry.deadline - Date.now(), 1))
+        .then(entry.resolve, entry.reject);
+    }
+  }
+
+  // Send the request to every running worker, e.g. to collect per-process counters
+  broadcast(request) {
+    const running = this.workers.filter((worker) => worker.available);
+    if (!running.length) {
+      return Promise.reject("No search worker is running");
+    }
+    return Promise.all(running.map((worker) => worker.send(request)));
+  }
+}
+
+let searchPool = null;
+
+function getSearchPool() {
+  if (!searchPool) {
+    searchPool = new SearchWorkerPool(SEARCH_WORKERS);
+  }
+  return searchPool;
+}
+
+
+// Background compactor (file-upload/compactor.py) folding upload segments into the barrels
+export function startCompactor() {
+  const compactor = spawn("python", ["./file-upload/compactor.py", "--watch"]);
+
+  compactor.stdout.on("data", (data) => {
+    console.log(`Compactor: ${data.toString()}`);
+  });
+
+  compactor.stderr.on("data", (data) => {
+    console.log(`Compactor error: ${data.toString()}`);
+  });
+
+  compactor.on("close", (code) => {
+    console.error(`Compactor exited with code ${code}, restarting`);
+    setTimeout(startCompactor, 5000);
   });
 }
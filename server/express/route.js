@@ -1,6 +1,6 @@
 import { Router } from "express";
 import fse from "fs-extra";
-import { uploadDocument, searchDocuments } from "./childprocess_functions.js"; 
+import { uploadDocument, searchDocuments, explainQuery, suggestTerms, cacheStats, metricsText } from "./childprocess_functions.js"; 
 import path from "path";
 import multer from "multer"
 
@@ -26,7 +26,13 @@ router.get("/documents", async (req, res) => {
     console.log("called")
     const args = req.query.args 
     const limit=req.query.limit
-    const documents = await searchDocuments(args.trim(),limit);
+    // ?explain=1 returns the query plan instead of the documents
+    if (req.query.explain === "1") {
+      return res.json(await explainQuery(args.trim(), limit, req.query.fields));
+    }
+    // ?fields=Id,Title,Score keeps result lists from reading the Body / Answer blobs
+    // ?timings=1 answers { results, timings } with the per-stage time breakdown of the search
+    const documents = await searchDocuments(args.trim(),limit,req.query.fields,req.query.timings === "1");
     if(!documents){
       return res.status(404).json({ error: "No documents found" });
     } 
@@ -37,6 +43,40 @@ router.get("/documents", async (req, res) => {
   }
 });
 
+router.get("/suggest", async (req, res) => {
+  try {
+    const prefix = (req.query.prefix || "").trim();
+    if (!prefix) {
+      return res.json([]);
+    }
+    const suggestions = await suggestTerms(prefix, req.query.limit);
+    return res.json(suggestions.map(([term, frequency]) => ({ term, frequency })));
+  } catch (error) {
+    console.error("Error in GET /suggest:", error);
+    return res.status(500).json({ error: "Internal Server Error" });
+  }
+});
+
+router.get("/cache-stats", async (req, res) => {
+  try {
+    return res.json(await cacheStats());
+  } catch (error) {
+    console.error("Error in GET /cache-stats:", error);
+    return res.status(500).json({ error: "Internal Server Error" });
+  }
+});
+
+// Search, upload and compaction metrics in the Prometheus text format
+router.get("/metrics", async (req, res) => {
+  try {
+    res.set("Content-Type", "text/plain; version=0.0.4");
+    return res.send(await metricsText());
+  } catch (error) {
+    console.error("Error in GET /metrics:", error);
+    return res.status(500).json({ error: "Internal Server Error" });
+  }
+});
+
 router.post("/documents", upload.single("file"), async (req, res) => {
   
   try {
@@ -0,0 +1,179 @@
+import sys
+import os
+import csv
+import time
+
+functions = os.path.join(os.getcwd(), "file-upload", 'components')  # Construct the path
+if functions not in sys.path:  # Add the directory to sys.path only if it's not already there
+    sys.path.append(functions)
+
+# Add the 'server/lemmatizer' directory to the sys.path for the lexicon
+lemmatizer_dir = os.path.join(os.getcwd(), "lemmatizer")
+if lemmatizer_dir not in sys.path:
+    sys.path.append(lemmatizer_dir)
+
+from inverted_index import apply_postings
+from segments import get_segments, merge_segments, newest_postings, plan_compaction, remove_segment
+from documentIndex import document_barrel_name, update_document_index
+from columnStore import add_documents, build_column_store, column_store_is_current, has_column_store
+from metrics import count, save_metrics, span
+from lexicon import Lexicon
+
+try:
+    import fcntl  # Keeps a single compactor per segment folder (not available on Windows)
+except ImportError:
+    fcntl = None
+
+# Seconds between two compaction passes of the background compactor
+COMPACT_INTERVAL = float(os.environ.get('BOLT_COMPACT_INTERVAL', 5))
+# The lexicon uploads log their new terms to (see lemmatizer/lexicon.py)
+LEXICON_PATH = os.environ.get('BOLT_LEXICON', './dataset/lexicon.bin')
+
+
+def fold_documents(segments, document_folder):
+    """Appends the segment documents to their DocumentBarrels (skipping Ids already there), one write per barrel."""
+    rows_by_barrel = {}
+    for segment in sorted(segments, key=lambda segment: segment.order):
+        header, rows = segment.all_documents()
+        for row in rows:
+            document = dict(zip(header, row))
+            doc_id = document.get('Id')
+            if doc_id:
+                barrel_path = os.path.join(document_folder, document_barrel_name(doc_id))
+                rows_by_barrel.setdefault(barrel_path, {})[doc_id] = (header, document)
+
+    for barrel_path, documents in rows_by_barrel.items():
+        if not os.path.exists(barrel_path) and has_column_store(barrel_path):
+            # A migrated barrel only exists as its compressed column store
+            added = add_documents(barrel_path, {doc_id: document for doc_id, (_, document) in documents.items()})
+            print(f"Folded {added} document(s) into the column store of {barrel_path}")
+            continue
+        if os.path.exists(barrel_path):
+            index = update_document_index(barrel_path)
+            barrel_header = index['header']
+            documents = {doc_id: row for doc_id, row in documents.items() if doc_id not in index['rows']}
+            mode = 'a'
+        else:
+            barrel_header = next(iter(documents.values()))[0]
+            mode = 'w'
+        if not documents:
+            continue
+
+        with open(barrel_path, mode, encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            if mode == 'w':
+                writer.writerow(barrel_header)
+            for _, document in documents.values():
+                writer.writerow([document.get(column, '') for column in barrel_header])
+        update_document_index(barrel_path)
+        build_column_store(barrel_path)  # Queries never build one: they read the CSV until it is rebuilt
+        print(f"Folded {len(documents)} document(s) into {barrel_path}")
+
+
+def fold_segments(segments, barrel_folder, document_folder):
+    """Folds segments into the base barrels and DocumentBarrels, then removes them."""
+    token_documents = newest_postings(segments)
+
+    # Base first, then unpublish: a query in between sees the postings twice, which the merge deduplicates
+    with span('compact.postings'):
+        apply_postings(token_documents, barrel_folder)
+    with span('compact.documents'):
+        fold_documents(segments, document_folder)
+    count('compact_folded_segments', len(segments))
+    for segment in segments:
+        remove_segment(segment.path)
+
+
+def refresh_column_stores(document_folder):
+    """
+    Builds the column stores queries cannot use yet: missing ones, those written by another version and those
+    older than their CSV (an upload that failed before rebuilding it). Queries read the CSV of those barrels.
+
+    Returns:
+        int: Number of column stores built.
+    """
+    if not os.path.isdir(document_folder):
+        return 0
+    built = 0
+    for file_name in sorted(os.listdir(document_folder)):
+        if not (file_name.startswith('barrel_') and file_name.endswith('.csv')):
+            continue
+        barrel_path = os.path.join(document_folder, file_name)
+        if os.path.getsize(barrel_path) == 0 or column_store_is_current(barrel_path):
+            continue
+        with span('compact.column_store'):
+            build_column_store(barrel_path)
+        built += 1
+    count('column_stores_built', built)
+    return built
+
+
+def compact_lexicon(lexicon_path=LEXICON_PATH):
+    """Folds the terms uploads logged since the last fold into the lexicon's sorted table, so the log stays short."""
+    if not os.path.exists(lexicon_path):
+        return
+    lexicon = Lexicon(lexicon_path)
+    try:
+        with span('compact.lexicon'):
+            lexicon.compact()
+    finally:
+        lexicon.close()
+
+
+def compact(segment_folder, barrel_folder, document_folder):
+    """
+    Runs compaction steps until the size-tiered policy is satisfied.
+
+    Returns:
+        int: Number of steps performed.
+    """
+    steps = 0
+    while True:
+        segments = list(reversed(get_segments(segment_folder).segments))  # Oldest first
+        plan = plan_compaction(segments)
+        if plan is None:
+            return steps
+        action, chosen = plan
+        if action == 'fold':
+            print(f"Folding {len(chosen)} segment(s) into the base barrels")
+            with span('compact.fold'):
+                fold_segments(chosen, barrel_folder, document_folder)
+            compact_lexicon()
+        else:
+            with span('compact.merge'):
+                merged = merge_segments(segment_folder, chosen)
+            print(f"Merging {len(chosen)} segment(s) into {merged}")
+        steps += 1
+
+
+def run(segment_folder, barrel_folder, document_folder, watch=False):
+    os.makedirs(segment_folder, exist_ok=True)
+    with open(os.path.join(segment_folder, '.compactor.lock'), 'w') as lock:
+        if fcntl:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                print("Another compactor is already running.")
+                return
+        while True:
+            try:
+                compact(segment_folder, barrel_folder, document_folder)
+                refresh_column_stores(document_folder)
+            except Exception as e:
+                count('compact_failures')
+                print(f"Compaction failed: {e}", file=sys.stderr)
+            # Nothing is written for idle passes: save_metrics skips empty totals
+            save_metrics(os.path.join(os.path.dirname(segment_folder), 'metrics', 'compactor.json'))
+            if not watch:
+                return
+            time.sleep(COMPACT_INTERVAL)
+
+
+if __name__ == "__main__":
+    # python file-upload/compactor.py [--watch]
+    run(
+        os.path.join(os.getcwd(), "dataset", "segments"),
+        os.path.join(os.getcwd(), "dataset", "barrels"),
+        os.path.join(os.getcwd(), "dataset", "DocumentBarrels"),
+        watch='--watch' in sys.argv[1:],
+    )
@@ -9,24 +9,45 @@ lemmatizer_dir = os.path.join(os.getcwd(), 'lemmatizer')  # Construct the path
 if lemmatizer_dir not in sys.path:  # Add the directory to sys.path only if it's not already there
     sys.path.append(lemmatizer_dir)
 
+# Add the 'server/Barrels' directory to the sys.path for module import
+document_barrels_dir = os.path.join(os.getcwd(), 'Barrels')
+if document_barrels_dir not in sys.path:
+    sys.path.append(document_barrels_dir)
+
+# Add the 'server/barrel' directory to the sys.path for module import
+barrel_dir = os.path.join(os.getcwd(), 'barrel')
+if barrel_dir not in sys.path:
+    sys.path.append(barrel_dir)
+
 # Now import the lemmatizer functions
-from lemmatizerfunctions import lemmatize_word
+from lemmatizerfunctions import lemmatize_tokens, lemma_cache_stats, termToken
+from documentIndex import document_barrel_name, document_row, update_document_index
+from columnStore import add_documents, build_column_store, get_column_store, has_column_store
+from segments import get_segments
 
 # Function to check if a document with the given ID already exists in the specific barrel file
 def is_document_exists_in_barrel(barrel_file_path, doc_id):
     """Check if the document ID already exists in the specific barrel file."""
     if os.path.exists(barrel_file_path):
         try:
-            barrel_data = pd.read_csv(barrel_file_path)
-            existing_ids = set(barrel_data['Id'].values)  # Convert to set for faster lookup
-            if doc_id in existing_ids:
-                return True  # Document ID exists in this barrel file
+            # The offset index already holds every Id of the barrel
+            return str(doc_id) in update_document_index(barrel_file_path)['rows']
         except Exception as e:
             print(f"Error reading {barrel_file_path}: {e}")
+    elif has_column_store(barrel_file_path):
+        # A migrated barrel only exists as its compressed column store
+        return get_column_store(barrel_file_path).position(int(doc_id)) is not None
     return False
 
-# Function to process and append new document to forward index barrel
-def process_and_append_to_barrel(input_file_path, barrel_folder):
+# Function to lemmatize and tokenize the new documents of an upload
+def prepare_documents(input_file_path, barrel_folder, segment_folder=None):
+    """
+    Reads an uploaded JSON file and computes the token IDs of every document that is not indexed yet
+    (neither in its DocumentBarrel nor, when segment_folder is given, in a live segment).
+
+    Returns:
+        tuple: (documents grouped by DocumentBarrel path, combined token IDs per document, document IDs)
+    """
     # Read the JSON dataset
     with open(input_file_path, 'r', encoding='ISO-8859-1') as f:
         data = json.load(f)
@@ -37,24 +58,8 @@ def process_and_append_to_barrel(input_file_path, barrel_folder):
             return []
         # Use a more comprehensive regular expression for tokenizing words
         tokens = re.findall(r'\b\w+\b', text.lower())  # Tokenize by word boundaries
-        return [lemmatize_word(token) for token in tokens]
-
-    # Function to generate a token ID by summing ASCII values of the characters in the word
-    def wordToken(text):
-        text = text.lower()  # Normalize to lowercase for case insensitivity
-        unique_sum = 0  # Initialize a sum to calculate uniqueness
-        prime = 31  # Prime number to reduce collisions
-
-        for index, char in enumerate(text, start=1):
-            unique_sum += ord(char) * index * prime  # Combine ASCII, position, and prime
-
-        # Add the length of the string and its ASCII sum for further uniqueness
-        unique_sum *= len(text)
-        ascii_sum = sum(ord(c) for c in text)
-        unique_sum += ascii_sum
-
-        # Ensure it’s a large and unique output
-        return abs(unique_sum)
+        # Lemmatized like query words (each tagged alone); table and memo misses are tagged in one batch
+        return lemmatize_tokens(tokens)
 
     # Helper function to process token IDs for title or tag
     def process_token_ids(tokens, is_title=False):
@@ -63,7 +68,7 @@ def process_and_append_to_barrel(input_file_path, barrel_folder):
         for token in tokens:
             token = token.strip()
             if token and token not in seen_tokens:  # Only process unique words
-                token_id = wordToken(token)  # Generate token ID using wordToken function
+                token_id = termToken(token, create=True)  # Term ID from the shared lexicon (or wordToken)
                 if is_title:
                     # Append "#" for tokens from the Title
                     token_ids.append(f"{token_id}#")
@@ -73,21 +78,28 @@ def process_and_append_to_barrel(input_file_path, barrel_folder):
                 seen_tokens.add(token)  # Mark this token as processed
         return ', '.join(token_ids)
 
-    # Initialize a list to store processed data and token IDs
-    processed_data = []
+    # Initialize the processed documents (grouped by target barrel) and their token IDs
+    processed_data = {}
     combined_token_ids_list = []
-    
+    document_ids = []
+    seen_doc_ids = set()
+
     # Process each document in the JSON data
     for doc in data:
         doc_id = doc.get('id')
 
         # Determine the barrel name and path based on document ID
-        barrel_name = f"barrel_{(doc_id // 4000) * 4000}_to_{(doc_id // 4000) * 4000 + 3999}.csv"
+        barrel_name = document_barrel_name(doc_id)
         barrel_file_path = os.path.join(barrel_folder, barrel_name)
 
-        if is_document_exists_in_barrel(barrel_file_path, doc_id):
+        if (
+            doc_id in seen_doc_ids
+            or is_document_exists_in_barrel(barrel_file_path, doc_id)
+            or (segment_folder and get_segments(segment_folder).contains_document(doc_id))
+        ):
             print(f"Document with ID {doc_id} already exists in barrel {barrel_name}. Skipping append.")
             continue  # Skip the document if it already exists in this barrel
+        seen_doc_ids.add(doc_id)
 
         # Process Title tokens
         title_tokens = process_text(doc.get('Title', ''))  # Lemmatize the Title tokens
@@ -100,33 +112,57 @@ def process_and_append_to_barrel(input_file_path, barrel_folder):
         # Combine title and tag token IDs into one column
         combined_token_ids = f"{title_token_ids}, {tag_token_ids}" if title_token_ids or tag_token_ids else ''
         combined_token_ids_list.append(combined_token_ids)
+        document_ids.append(doc_id)
 
         # Add the combined token IDs to the document
         doc['combined_token_ids'] = combined_token_ids
-        processed_data.append(doc)
+        processed_data.setdefault(barrel_file_path, []).append(doc)
+
+    stats = lemma_cache_stats()
+    print(f"Lemmatization memo hit rate {stats['hit_rate']:.1%} over {stats['tokens']} tokens.")
+
+    return processed_data, combined_token_ids_list, document_ids
+
+
+# Function to delete the uploaded JSON file once its documents are stored
+def remove_input_file(input_file_path):
+    try:
+        os.remove(input_file_path)
+        print(f"Deleted the JSON file: {input_file_path}")
+    except Exception as e:
+        print(f"Error deleting the JSON file: {e}")
+
 
-    # Convert the processed data into a DataFrame
-    processed_df = pd.DataFrame(processed_data)
+# Function to process and append new document to forward index barrel
+def process_and_append_to_barrel(input_file_path, barrel_folder):
+    processed_data, combined_token_ids_list, document_ids = prepare_documents(input_file_path, barrel_folder)
+
+    # Append each barrel's documents in one write
+    for barrel_file_path, documents in processed_data.items():
+        processed_df = pd.DataFrame(documents)
 
-    if processed_data:
         # Append or create the barrel file
+        if not os.path.exists(barrel_file_path) and has_column_store(barrel_file_path):
+            added = add_documents(barrel_file_path, {doc['id']: document_row(doc) for doc in documents})
+            print(f"{added} document(s) added to the column store of {barrel_file_path}")
+            continue
         if os.path.exists(barrel_file_path):
             processed_df.to_csv(barrel_file_path, mode='a', header=False, index=False)
-            print(f"Document appended to existing barrel: {barrel_file_path}")
+            print(f"{len(documents)} document(s) appended to existing barrel: {barrel_file_path}")
         else:
             processed_df.to_csv(barrel_file_path, index=False)
             print(f"New barrel created: {barrel_file_path}")
 
-    # Return the name of the newly added barrel and combined token IDs
+        # Index the appended rows so searches can seek straight to them
+        update_document_index(barrel_file_path)
+        build_column_store(barrel_file_path)
+
     # Delete the input JSON file after processing
-    try:
-        os.remove(input_file_path)
-        print(f"Deleted the JSON file: {input_file_path}")
-    except Exception as e:
-        print(f"Error deleting the JSON file: {e}")
+    remove_input_file(input_file_path)
 
     print(combined_token_ids_list)
-    return [combined_token_ids_list, doc_id]
+    # Return the combined token IDs of every appended document and the matching document IDs
+    return [combined_token_ids_list, document_ids]
 
 # Main function to execute the process
 def main():
@@ -1,120 +1,194 @@
-import pandas as pd
+import csv
 import os
 import re
+import sys
 
-def inverted_index(combined_token_ids, document_id, barrel_folder):
+# Add the 'server/barrel' directory to the sys.path for module import
+barrel_dir = os.path.join(os.getcwd(), 'barrel')
+if barrel_dir not in sys.path:
+    sys.path.append(barrel_dir)
+
+from binaryBarrels import BinaryBarrel, parse_document_ids, write_binary_barrel
+from barrelManifest import BarrelManifest, load_manifest, update_manifest
+
+CSV_HEADER = ['Token_ID', 'Document_IDs']
+
+
+def format_document_ids(doc_ids):
+    """Joins document IDs the way the barrel builders do: sorted numerically, comma-separated."""
+    return ','.join(str(doc_id) for doc_id in sorted(doc_ids))
+
+
+def group_by_barrel(token_documents, find_barrel):
+    """
+    Groups the buffered (Token_ID, document ID) pairs of an upload by target barrel.
+
+    Returns:
+        dict: barrel file name -> {Token_ID: set of document IDs}
     """
-    Inserts the document ID into the corresponding inverted index barrel based on token IDs.
-    Dynamically handles non-uniform barrel ranges and creates new barrels if needed.
+    pending = {}
+    for token_id, doc_ids in token_documents.items():
+        # Extract numeric part for determining barrel placement, handle '#' if present
+        numeric_token_id = int(re.sub(r'[^0-9]', '', token_id))
+        barrel_name = find_barrel(numeric_token_id)
+        pending.setdefault(barrel_name, {}).setdefault(token_id, set()).update(doc_ids)
+    return pending
+
+
+def merge_barrel(barrel_file_path, token_updates):
+    """
+    Merges the buffered postings of one barrel in a single pass and replaces the barrel atomically.
+
+    Existing rows are streamed to a temporary file, extending the rows of updated tokens; tokens new
+    to the barrel are appended at the end. The binary copy of the barrel, if any, is rewritten from
+    the same pass so searches never read stale postings.
+
+    Returns:
+        int: Number of tokens whose postings changed.
+    """
+    bin_path = os.path.splitext(barrel_file_path)[0] + '.bin'
+    keep_binary = os.path.exists(bin_path)
+    all_postings = {} if keep_binary else None
+    remaining = dict(token_updates)
+    changed = 0
+
+    if os.path.exists(barrel_file_path):
+        existing_rows = _read_csv_rows(barrel_file_path)
+    elif keep_binary:
+        # Only the binary barrel exists; its postings become the rows of the new CSV
+        with BinaryBarrel(bin_path) as barrel:
+            existing_rows = [[token, format_document_ids(doc_ids)] for token, doc_ids in barrel.items()]
+    else:
+        existing_rows = []
+
+    temp_path = f"{barrel_file_path}.tmp"
+    with open(temp_path, 'w', encoding='ISO-8859-1', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for row in existing_rows:
+            token_id = row[0].strip()
+            new_doc_ids = remaining.pop(token_id, None)
+            if new_doc_ids is not None or keep_binary:
+                doc_ids = set(parse_document_ids(row[1]))
+                if new_doc_ids is not None and not new_doc_ids <= doc_ids:
+                    doc_ids |= new_doc_ids
+                    row = [token_id, format_document_ids(doc_ids)]
+                    changed += 1
+                if keep_binary:
+                    all_postings.setdefault(token_id, set()).update(doc_ids)
+            writer.writerow(row)
+
+        # Tokens that were not in the barrel yet
+        for token_id, doc_ids in remaining.items():
+            writer.writerow([token_id, format_document_ids(doc_ids)])
+            if keep_binary:
+                all_postings.setdefault(token_id, set()).update(doc_ids)
+            changed += 1
+
+    if not changed:
+        os.remove(temp_path)
+        return 0
+    os.replace(temp_path, barrel_file_path)
+    if keep_binary:
+        write_binary_barrel(bin_path, all_postings)
+    return changed
+
+
+def _read_csv_rows(barrel_file_path):
+    with open(barrel_file_path, 'r', encoding='ISO-8859-1', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header
+        return [row for row in reader if len(row) >= 2 and row[0].strip()]
+
+
+def collect_postings(combined_token_ids, document_ids):
+    """
+    Buffers the postings of an upload.
 
     Args:
-        combined_token_ids (str): Comma-separated token IDs (e.g., "1234#, 5678").
-        document_id (int): The document ID to insert.
-        barrel_folder (str): Path to the folder containing inverted index barrels.
+        combined_token_ids (list): One comma-separated token ID string per document (e.g., "1234#, 5678").
+        document_ids (list): The document ID of each entry of combined_token_ids.
 
     Returns:
-        None
+        dict: Token_ID -> set of document IDs.
+    """
+    # A single document may still be passed as a plain ID
+    if not isinstance(document_ids, (list, tuple)):
+        document_ids = [document_ids] * len(combined_token_ids)
+
+    token_documents = {}
+    for token_ids, document_id in zip(combined_token_ids, document_ids):
+        for token_id in str(token_ids).split(','):
+            token_id = token_id.strip()
+            if not token_id or not re.search(r'[0-9]', token_id):
+                continue
+            try:
+                token_documents.setdefault(token_id, set()).add(int(document_id))
+            except (TypeError, ValueError):
+                print(f"Error: Invalid document ID {document_id} for TokenID {token_id}")
+    return token_documents
+
+
+def apply_postings(token_documents, barrel_folder):
     """
-    # Helper function to parse existing barrel ranges
-    def get_existing_ranges():
-        ranges = []
-        if not os.path.exists(barrel_folder):
-            os.makedirs(barrel_folder)
-        for file_name in os.listdir(barrel_folder):
-            match = re.match(r"(\d+)-(\d+)\.csv", file_name)
-            if match:
-                ranges.append((int(match.group(1)), int(match.group(2))))
-        return sorted(ranges)
-
-    # Helper function to generate new barrels until the token_id is covered
-    def ensure_barrel_exists(token_id, ranges):
-        if not ranges:
-            return [(0, 3999)]  # Start with the first range if no barrels exist
-
-        # Find the last range
-        _, last_end = ranges[-1]
-
-        while last_end < token_id:
-            new_start = last_end + 1
-            new_end = new_start + 3999
-            ranges.append((new_start, new_end))
-            last_end = new_end
-
-        return ranges
-
-    # Helper function to find the barrel for a token ID
-    def find_barrel(token_id, ranges):
-        for start, end in ranges:
-            if start <= token_id <= end:
-                return f"{start}-{end}.csv"
-        return None
-
-    # Split combined token IDs into individual tokens
-    token_ids = [token.strip() for token in combined_token_ids[0].split(',') if token.strip()]
-
-    # Get existing barrel ranges
-    existing_ranges = get_existing_ranges()
-
-    for token_id in token_ids:
-        clean_token_id = token_id.strip()
+    Merges buffered postings (Token_ID -> document IDs) into the inverted index barrels,
+    reading and rewriting each touched barrel exactly once. Dynamically handles non-uniform
+    barrel ranges and creates new barrels if needed.
 
+    Returns:
+        set: Names of the barrels that changed.
+    """
+    if not os.path.exists(barrel_folder):
+        os.makedirs(barrel_folder)
+
+    # Load the barrel manifest (sorted ranges with bisect lookup)
+    manifest = load_manifest(barrel_folder)
+
+    # Helper function to find the barrel for a token ID, allocating a new range if none holds it
+    def find_barrel(token_id):
+        nonlocal manifest
+        barrels = manifest.find(token_id)
+        if barrels:
+            return os.path.splitext(barrels[0]['file'])[0] + '.csv'
+
+        start, end = manifest.free_range(token_id)
+        barrel_name = f"{start}-{end}.csv"
+        # Remember the new range so later tokens of this upload land in the same barrel
+        manifest = BarrelManifest(manifest.barrels + [
+            {'start': start, 'end': end, 'file': barrel_name, 'posting_bytes': 0}
+        ])
+        return barrel_name
+
+    touched_barrels = set()
+    for barrel_name, token_updates in group_by_barrel(token_documents, find_barrel).items():
+        barrel_file_path = os.path.join(barrel_folder, barrel_name)
         try:
-            # Extract numeric part for determining barrel placement, handle '#' if present
-            numeric_token_id = int(re.sub(r'[^0-9]', '', clean_token_id))
-
-            # Ensure barrels exist to cover the token ID
-            existing_ranges = ensure_barrel_exists(numeric_token_id, existing_ranges)
-
-            # Find the barrel for the token ID
-            barrel_name = find_barrel(numeric_token_id, existing_ranges)
-
-            if barrel_name is None:
-                print(f"Error: No barrel found for TokenID {clean_token_id}")
-                continue  # Skip processing if no barrel is found
-
-            barrel_file_path = os.path.join(barrel_folder, barrel_name)
-
-            if os.path.exists(barrel_file_path):
-                # If the barrel exists, read it into a DataFrame
-                barrel_data = pd.read_csv(barrel_file_path, dtype={'Document_IDs': str, 'Token_ID': str})
-
-                # Check if the token ID already exists in the barrel
-                if 'Token_ID' not in barrel_data.columns:
-                    print(f"Error: Column 'TokenID' not found in barrel {barrel_name}")
-                    continue
-
-                token_row = barrel_data.loc[barrel_data['Token_ID'] == clean_token_id]
-
-                if not token_row.empty:
-                    # Token exists, append the document ID if not already present
-                    current_doc_ids = token_row.iloc[0]['Document_IDs']
-                    doc_id_list = set(current_doc_ids.split(','))  # Split and use a set to avoid duplicates
-
-                    # Add the document ID to the list if not already present
-                    if str(document_id) not in doc_id_list:
-                        doc_id_list.add(str(document_id))
-                        updated_doc_ids = ','.join(sorted(doc_id_list))  # Ensure sorted order
-                        barrel_data.loc[barrel_data['Token_ID'] == clean_token_id, 'Document_IDs'] = updated_doc_ids
-                        barrel_data.to_csv(barrel_file_path, index=False)  # Save the updated barrel
-                        print(f"Updated barrel {barrel_name} for TokenID {clean_token_id}")
-                else:
-                    # Token does not exist, add a new row
-                    new_row = {
-                        'Token_ID': clean_token_id,
-                        'Document_IDs': str(document_id)
-                    }
-                    barrel_data = pd.concat([barrel_data, pd.DataFrame([new_row])], ignore_index=True)
-                    barrel_data.to_csv(barrel_file_path, index=False)
-                    print(f"Inserted new TokenID {clean_token_id} in barrel {barrel_name}")
-            else:
-                # Barrel does not exist, create a new one
-                new_row = {
-                    'Token_ID': clean_token_id,
-                    'Document_IDs': str(document_id)
-                }
-                new_df = pd.DataFrame([new_row])
-                new_df.to_csv(barrel_file_path, index=False)
-                print(f"Created new barrel {barrel_name} with TokenID {clean_token_id}")
-
+            changed = merge_barrel(barrel_file_path, token_updates)
+            if changed:
+                touched_barrels.add(barrel_name)
+                print(f"Updated barrel {barrel_name}: {changed} of {len(token_updates)} tokens changed")
         except Exception as e:
-            print(f"Error processing TokenID {clean_token_id}: {e}")
+            print(f"Error updating barrel {barrel_name}: {e}")
+
+    # Record the new sizes and any newly created barrels in the manifest
+    if touched_barrels:
+        update_manifest(barrel_folder, touched_barrels)
+    return touched_barrels
+
+
+def inverted_index(combined_token_ids, document_ids, barrel_folder):
+    """
+    Inserts the uploaded documents straight into the inverted index barrels.
+
+    Every (token ID, document ID) pair of the upload is buffered first and grouped by target barrel,
+    so each touched barrel is read and rewritten exactly once.
+
+    Args:
+        combined_token_ids (list): One comma-separated token ID string per document (e.g., "1234#, 5678").
+        document_ids (list): The document ID of each entry of combined_token_ids.
+        barrel_folder (str): Path to the folder containing inverted index barrels.
+
+    Returns:
+        None
+    """
+    apply_postings(collect_postings(combined_token_ids, document_ids), barrel_folder)
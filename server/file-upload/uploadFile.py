@@ -7,45 +7,80 @@ print(functions)
 if functions not in sys.path:  # Add the directory to sys.path only if it's not already there
     sys.path.append(functions)
 
-from forward_index import process_and_append_to_barrel 
-from inverted_index import inverted_index 
+from forward_index import prepare_documents, remove_input_file
+from inverted_index import collect_postings
+from segments import write_segment
+from indexGeneration import bump_generation, generation_file
+from documentIndex import document_row
+from metrics import count, save_metrics, span
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python process_json.py <input_json_file_path>")
-        sys.exit(1)
-    print(sys.argv[1])
-    input_file_path = sys.argv[1]
-    forward_index_barrel_folder = os.path.join(os.getcwd(),"dataset","DocumentBarrels")
-    inverted_index_barrel_folder = os.path.join(os.getcwd(),"dataset","barrels")
+def process_upload(input_file_path, dataset_folder=None):
+    """
+    Indexes an uploaded JSON file as a new segment of the index in dataset_folder ('./dataset' by default).
+
+    Returns:
+        int: Number of documents published.
+    """
+    dataset_folder = dataset_folder or os.path.join(os.getcwd(), "dataset")
+    forward_index_barrel_folder = os.path.join(dataset_folder, "DocumentBarrels")
+    inverted_index_barrel_folder = os.path.join(dataset_folder, "barrels")
+    segment_folder = os.path.join(dataset_folder, "segments")
+    metrics_file = os.path.join(dataset_folder, "metrics", "upload.json")
 
     if not os.path.exists(input_file_path):
-        print(f"Error: The file {input_file_path} does not exist.")
-        sys.exit(1)
+        raise FileNotFoundError(f"The file {input_file_path} does not exist.")
 
     if not os.path.exists(forward_index_barrel_folder):
-        print(f"Error: The forward index barrel folder {forward_index_barrel_folder} does not exist.")
-        sys.exit(1)
+        raise FileNotFoundError(f"The forward index barrel folder {forward_index_barrel_folder} does not exist.")
 
     if not os.path.exists(inverted_index_barrel_folder):
-        print(f"Error: The inverted index barrel folder {inverted_index_barrel_folder} does not exist.")
-        sys.exit(1)
+        raise FileNotFoundError(f"The inverted index barrel folder {inverted_index_barrel_folder} does not exist.")
 
-    try:
-        print(f"Processing file {input_file_path} and appending to forward index barrels in {forward_index_barrel_folder}...")
-        combined_token_ids_list = process_and_append_to_barrel(input_file_path, forward_index_barrel_folder)
-        print("Received combined_token_ids_list:", combined_token_ids_list)
-        
-        if combined_token_ids_list and len(combined_token_ids_list) == 2:
-            inverted_index(combined_token_ids_list[0], combined_token_ids_list[1], inverted_index_barrel_folder)
+    print(f"Processing file {input_file_path} into a new index segment in {segment_folder}...")
+    with span('upload.total'):
+        with span('upload.prepare'):
+            processed_data, combined_token_ids_list, document_ids = prepare_documents(
+                input_file_path, forward_index_barrel_folder, segment_folder
+            )
+
+        # The upload becomes a small immutable segment, searchable as soon as it is published;
+        # compactor.py folds segments into the barrels in the background
+        documents = []
+        if document_ids:
+            documents = [document_row(doc) for docs in processed_data.values() for doc in docs]
+            with span('upload.postings'):
+                postings = collect_postings(combined_token_ids_list, document_ids)
+            count('upload_postings', sum(len(doc_ids) for doc_ids in postings.values()))
+            with span('upload.segment'):
+                segment_path = write_segment(segment_folder, postings, documents)
+            print(f"Published segment {segment_path} with {len(documents)} document(s)")
+            # Cached search results of the previous generation no longer match
+            print(f"Index generation {bump_generation(generation_file(inverted_index_barrel_folder))}")
         else:
-            print(f"Error: Invalid token list returned: {combined_token_ids_list}")
-            sys.exit(1)
+            print("No new documents to index.")
+        remove_input_file(input_file_path)
+    count('upload_documents', len(documents))
+    save_metrics(metrics_file)
+    return len(documents)
 
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python process_json.py <input_json_file_path>")
+        sys.exit(1)
+    print(sys.argv[1])
+
+    try:
+        process_upload(sys.argv[1])
         print("Processing completed successfully.")
 
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"An error occurred: {e}")
         sys.exit(1)
 
-main()
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ import pandas as pd
 import re
 import sys
 import os
+import time
+import shutil
+from multiprocessing import Pool
 
 # Add the 'server/lemmatizer' directory to the sys.path for module import
 lemmatizer_dir = os.path.join(os.getcwd(), 'lemmatizer')  # Construct the path
@@ -9,74 +12,61 @@ if lemmatizer_dir not in sys.path:  # Add the directory to sys.path only if it's
     sys.path.append(lemmatizer_dir)
 
 # Now import the lemmatizer functions
-from lemmatizerfunctions import lemmatize_word, wordToken
+from lemmatizerfunctions import lemmatize_tokens, lemma_cache_stats, termToken
+
+# Rows per chunk handed to a worker process by the parallel build
+CHUNK_SIZE = int(os.environ.get('BOLT_FORWARD_CHUNK', 20000))
+
+
+# Helper function to lemmatize and split text
+def process_text(text):
+    if not isinstance(text, str):  # Handle NaN or None values
+        return []
+    tokens = re.split(r'[ ,]', text)
+    # Lemmatized like query words (each tagged alone); table and memo misses are tagged in one batch
+    return lemmatize_tokens([token.strip() for token in tokens if token.strip()])
+
+
+# Helper function to process token IDs for title or tag
+def process_token_ids(tokens, is_title=False):
+    token_ids = []
+    seen_tokens = set()  # Set to keep track of already processed tokens
+    for token in tokens:
+        token = token.strip()
+        if token and token not in seen_tokens:  # Only process unique words
+            token_id = termToken(token, create=True)  # Term ID from the shared lexicon (or wordToken)
+            if is_title:
+                # Append "#" for tokens from the Title
+                token_ids.append(f"{token_id}#")
+            else:
+                # Keep the token ID as is for the Tags
+                token_ids.append(str(token_id))  # Convert to string for consistency
+            seen_tokens.add(token)  # Mark this token as processed
+    return ', '.join(token_ids)
+
+
+def combined_token_ids(row):
+    # Process Title tokens (assuming Title tokens are separated by commas or spaces)
+    title_token_ids = process_token_ids(process_text(row['Title']), is_title=True)
+    # Process Tag tokens (assuming Tag tokens are separated by commas or spaces)
+    tag_token_ids = process_token_ids(process_text(row['Tag']), is_title=False)
+    # Combine title and tag token IDs into one column
+    return f"{title_token_ids}, {tag_token_ids}" if title_token_ids or tag_token_ids else ''
 
 
 def process_data(input_file_path, output_file_path):
     # Read the dataset
     data = pd.read_csv(input_file_path, encoding='ISO-8859-1')
 
-    # Helper function to lemmatize and split text
-    def process_text(text):
-        if not isinstance(text, str):  # Handle NaN or None values
-            return []
-        tokens = re.split(r'[ ,]', text)
-        return [lemmatize_word(token.strip()) for token in tokens if token.strip()]
-
-    # Function to generate a token ID by summing ASCII values of the characters in the word
-    def wordToken(text):
-        text = text.lower()  # Normalize to lowercase for case insensitivity
-        unique_sum = 0  # Initialize a sum to calculate uniqueness
-        prime = 31  # Prime number to reduce collisions
-
-        for index, char in enumerate(text, start=1):
-            unique_sum += ord(char) * index * prime  # Combine ASCII, position, and prime
-
-        # Add the length of the string and its ASCII sum for further uniqueness
-        unique_sum *= len(text)
-        ascii_sum = sum(ord(c) for c in text)
-        unique_sum += ascii_sum
-
-        # Ensure it’s a large and unique output
-        return abs(unique_sum)
-
-    # Helper function to process token IDs for title or tag
-    def process_token_ids(tokens, is_title=False):
-        token_ids = []
-        seen_tokens = set()  # Set to keep track of already processed tokens
-        for token in tokens:
-            token = token.strip()
-            if token and token not in seen_tokens:  # Only process unique words
-                token_id = wordToken(token)  # Generate token ID using wordToken function
-                if is_title:
-                    # Append "#" for tokens from the Title
-                    token_ids.append(f"{token_id}#")
-                else:
-                    # Keep the token ID as is for the Tags
-                    token_ids.append(str(token_id))  # Convert to string for consistency
-                seen_tokens.add(token)  # Mark this token as processed
-        return ', '.join(token_ids)
-
     # Initialize a list to store processed data
     processed_data = []
 
     # Process each row in the dataset
     for _, row in data.iterrows():
-        # Process Title tokens (assuming Title tokens are separated by commas or spaces)
-        title_tokens = process_text(row['Title'])  # Lemmatize the Title tokens
-        title_token_ids = process_token_ids(title_tokens, is_title=True)
-
-        # Process Tag tokens (assuming Tag tokens are separated by commas or spaces)
-        tag_tokens = process_text(row['Tag'])  # Lemmatize the Tag tokens
-        tag_token_ids = process_token_ids(tag_tokens, is_title=False)
-
-        # Combine title and tag token IDs into one column
-        combined_token_ids = f"{title_token_ids}, {tag_token_ids}" if title_token_ids or tag_token_ids else ''
-
         # Append the row's original data along with the combined token ID column
         processed_data.append({
             **row.to_dict(),  # Keep all original columns
-            'combined_token_ids': combined_token_ids  # Add the combined token ID column
+            'combined_token_ids': combined_token_ids(row)  # Add the combined token ID column
         })
 
     # Convert the processed data into a DataFrame
@@ -113,5 +103,94 @@ def process_data(input_file_path, output_file_path):
     # Call the function to remove duplicates and save the cleaned data
     remove_duplicates_and_save(output_file_path)
 
-
-process_data("./dataset/mdsample.csv", "./dataset/mdtokenssample.csv")
+    stats = lemma_cache_stats()
+    print(f"Lemmatized {stats['tokens']} tokens in {stats['batches']} batches, "
+          f"memo hit rate {stats['hit_rate']:.1%} ({stats['size']} entries).")
+
+
+def process_chunk(chunk):
+    """Adds the combined token ID column to one chunk of rows (runs in a worker process)."""
+    chunk = chunk.copy()
+    chunk['combined_token_ids'] = [combined_token_ids(row) for _, row in chunk.iterrows()]
+    return chunk
+
+
+def deduplicated_chunks(input_file_path, chunk_size, seen_ids):
+    """Streams the input in chunks, dropping rows whose Id was already seen (in this or an earlier chunk)."""
+    for chunk in pd.read_csv(input_file_path, encoding='ISO-8859-1', chunksize=chunk_size):
+        chunk = chunk.drop_duplicates(subset='Id', keep='first')
+        chunk = chunk[~chunk['Id'].isin(seen_ids)]
+        seen_ids.update(chunk['Id'].tolist())
+        if len(chunk):
+            yield chunk
+
+
+def process_data_parallel(input_file_path, output_file_path, workers=None, chunk_size=CHUNK_SIZE, keep_shards=False):
+    """
+    Parallel forward-index build.
+
+    The input is streamed in chunks of chunk_size rows and deduplicated by Id as it is read; a pool of
+    worker processes tokenizes, lemmatizes and assigns term IDs, and the results come back in input
+    order as numbered shards ('<output>.shards/part-00000.csv', ...) that are finally concatenated
+    into output_file_path (the shard folder is removed afterwards unless keep_shards is set).
+    Rows whose Id is already in an existing output file are skipped.
+    """
+    workers = workers or os.cpu_count() or 1
+    shard_folder = f"{output_file_path}.shards"
+    if os.path.exists(shard_folder):
+        shutil.rmtree(shard_folder)
+    os.makedirs(shard_folder)
+
+    # Ids already in the output are not processed again
+    seen_ids = set()
+    append = os.path.exists(output_file_path) and os.stat(output_file_path).st_size > 0
+    if append:
+        seen_ids.update(pd.read_csv(output_file_path, usecols=['Id'], encoding='ISO-8859-1')['Id'].tolist())
+
+    started = time.time()
+    rows = 0
+    shard_paths = []
+    with Pool(workers) as pool:
+        # imap keeps the shards in input order while the workers run ahead
+        chunks = deduplicated_chunks(input_file_path, chunk_size, seen_ids)
+        for shard_number, processed in enumerate(pool.imap(process_chunk, chunks)):
+            shard_path = os.path.join(shard_folder, f"part-{shard_number:05d}.csv")
+            processed.to_csv(shard_path, index=False)
+            shard_paths.append(shard_path)
+
+            rows += len(processed)
+            elapsed = time.time() - started
+            print(f"Shard {shard_number}: {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+    # Concatenate the shards, keeping only the header of the first one (none when appending)
+    with open(output_file_path, 'ab' if append else 'wb') as output:
+        for index, shard_path in enumerate(shard_paths):
+            with open(shard_path, 'rb') as shard:
+                if append or index > 0:
+                    shard.readline()  # Skip the shard header
+                shutil.copyfileobj(shard, output)
+    if not keep_shards:
+        shutil.rmtree(shard_folder)
+
+    elapsed = time.time() - started
+    print(f"Forward index of {rows} rows written to {output_file_path} with {workers} workers "
+          f"in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    # python forwardindexer/forwardindexer.py [input.csv] [output.csv] [--workers N] [--serial] [--keep-shards]
+    arguments = []
+    worker_count = None
+    argv = iter(sys.argv[1:])
+    for argument in argv:
+        if argument == '--workers':
+            worker_count = int(next(argv))
+        elif not argument.startswith('--'):
+            arguments.append(argument)
+    input_file = arguments[0] if len(arguments) > 0 else "./dataset/mdsample.csv"
+    output_file = arguments[1] if len(arguments) > 1 else "./dataset/mdtokenssample.csv"
+
+    if '--serial' in sys.argv:
+        process_data(input_file, output_file)
+    else:
+        process_data_parallel(input_file, output_file, worker_count, keep_shards='--keep-shards' in sys.argv)
@@ -1,9 +1,12 @@
 import pandas as pd
 import re
 import os
-from lemmatizerfunctions import lemmatize_word, wordToken, remove_duplicates_and_save
+from lemmatizerfunctions import (
+    nltk_lemmatize_word, termToken, remove_duplicates_and_save,
+    load_lemma_table, save_lemma_table, LEMMA_TABLE_PATH,
+)
 
-def lemmatize_and_save(input_file_path, lemmatized_file_path):
+def lemmatize_and_save(input_file_path, lemmatized_file_path, lemma_table_path=LEMMA_TABLE_PATH):
     # Check if the lemmatized file exists; if not, create it
     if not os.path.exists(lemmatized_file_path) or os.stat(lemmatized_file_path).st_size == 0:
         pd.DataFrame(columns=['id', 'lemmatizedtag']).to_csv(lemmatized_file_path, index=False)
@@ -11,12 +14,22 @@ def lemmatize_and_save(input_file_path, lemmatized_file_path):
     # Read the dataset
     data = pd.read_csv(input_file_path, encoding='ISO-8859-1')
 
+    # Surface form -> lemma for every word of the vocabulary, saved as the lemma lookup table
+    lemma_table = {}
+
     # Helper function to lemmatize and split text
     def process_text(text):
         if not isinstance(text, str):  # Handle NaN or None values
             return []
         tokens = re.split(r'[ ,]', text)
-        return [lemmatize_word(token.strip()) for token in tokens if token.strip()]
+        lemmas = []
+        for token in tokens:
+            token = token.strip()
+            if token:
+                if token not in lemma_table:
+                    lemma_table[token] = nltk_lemmatize_word(token)
+                lemmas.append(lemma_table[token])
+        return lemmas
 
     # Initialize a list to store the new lemmatized data
     lemmatized_data = []
@@ -26,13 +39,13 @@ def lemmatize_and_save(input_file_path, lemmatized_file_path):
         lemmatized_title = process_text(row['Title'])
         if lemmatized_title:
             for word in lemmatized_title:
-                word_id = wordToken(word)
+                word_id = termToken(word, create=True)
                 lemmatized_data.append({'id': f"{word_id}#", 'lemmatizedtag': word.lower()})
 
         lemmatized_tags = process_text(row['Tag'])
         if lemmatized_tags:
             for word in lemmatized_tags:
-                word_id = wordToken(word)
+                word_id = termToken(word, create=True)
                 lemmatized_data.append({'id': str(word_id), 'lemmatizedtag': word.lower()})
 
     # Convert the new lemmatized data into a DataFrame
@@ -67,8 +80,15 @@ def lemmatize_and_save(input_file_path, lemmatized_file_path):
 
     print("Lemmatized data has been appended with uniqueness ensured.")
 
+    # Merge with the existing lemma table so query and ingest paths can skip NLTK for known words
+    existing_table = load_lemma_table(lemma_table_path)
+    existing_table.update(lemma_table)
+    save_lemma_table(existing_table, lemma_table_path)
+    print(f"Lemma table with {len(existing_table)} surface forms saved to {lemma_table_path}.")
+
 # Example usage
-lemmatize_and_save(
-    input_file_path="./dataset/mdsample.csv",
-    lemmatized_file_path="./dataset/lt1.csv"
-)
+if __name__ == "__main__":
+    lemmatize_and_save(
+        input_file_path="./dataset/mdsample.csv",
+        lemmatized_file_path="./dataset/lt1.csv"
+    )
@@ -1,16 +1,73 @@
-import nltk
-import pandas as pd
-from nltk.stem import WordNetLemmatizer
-from nltk import pos_tag, word_tokenize
 import os
+from collections import OrderedDict
+from functools import lru_cache
 
 # # Download necessary NLTK resources
 # nltk.download('punkt')
 # nltk.download('averaged_perceptron_tagger')
 # nltk.download('wordnet')
 
-# Initialize the lemmatizer
-lemmatizer = WordNetLemmatizer()
+# Precomputed surface form -> lemma table for the corpus vocabulary (one "surface<TAB>lemma" per line,
+# with an empty lemma when the word is its own lemma). Built by lemmatizer_and_tokenizer.lemmatize_and_save.
+LEMMA_TABLE_PATH = os.environ.get('BOLT_LEMMA_TABLE', './dataset/lemma_table.tsv')
+
+# Dense term dictionary (see lexicon.py). When it exists, term IDs come from it instead of wordToken.
+LEXICON_PATH = os.environ.get('BOLT_LEXICON', './dataset/lexicon.bin')
+
+# Bound on the token -> lemma memo used by the batched ingest path (least recently used tokens are evicted)
+LEMMA_CACHE_SIZE = int(os.environ.get('BOLT_LEMMA_CACHE', 200000))
+
+_lemma_table = None
+_lexicon = None
+_nltk = None
+_token_lemmas = OrderedDict()
+_batch_stats = {'batches': 0, 'tokens': 0, 'hits': 0, 'misses': 0}
+
+
+def load_nltk():
+    """Imports NLTK and builds the WordNet lemmatizer on first use only (out-of-vocabulary words)."""
+    global _nltk
+    if _nltk is None:
+        from nltk.stem import WordNetLemmatizer
+        from nltk import pos_tag, pos_tag_sents, word_tokenize
+        _nltk = {
+            'lemmatizer': WordNetLemmatizer(),
+            'pos_tag': pos_tag,
+            'pos_tag_sents': pos_tag_sents,
+            'word_tokenize': word_tokenize,
+        }
+    return _nltk
+
+
+def load_lemma_table(table_path=LEMMA_TABLE_PATH):
+    """Reads a lemma table into a dictionary; a missing table gives an empty one."""
+    table = {}
+    if os.path.exists(table_path):
+        with open(table_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                surface, _, lemma = line.rstrip('\n').partition('\t')
+                if surface:
+                    table[surface] = lemma or surface
+    return table
+
+
+def get_lemma_table():
+    global _lemma_table
+    if _lemma_table is None:
+        _lemma_table = load_lemma_table()
+    return _lemma_table
+
+
+def save_lemma_table(table, table_path=LEMMA_TABLE_PATH):
+    """Writes a surface form -> lemma dictionary as a lemma table (atomically)."""
+    temp_path = f"{table_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for surface in sorted(table):
+            lemma = table[surface]
+            if '\t' in surface or '\n' in surface:
+                continue
+            f.write(f"{surface}\t{'' if lemma == surface else lemma}\n")
+    os.replace(temp_path, table_path)
 
 # Function to get WordNet POS tag from Penn Treebank POS tag
 def get_wordnet_pos(tag):
@@ -25,25 +82,85 @@ def get_wordnet_pos(tag):
     else:
         return 'n'  # Default to noun
 
-# Function to lemmatize a word based on its POS tag
-def lemmatize_word(word):
-    tokenized_word = word_tokenize(word)
-    pos_tagged = pos_tag(tokenized_word)
+# Function to lemmatize a word with NLTK based on its POS tag
+def nltk_lemmatize_word(word):
+    nltk_tools = load_nltk()
+    tokenized_word = nltk_tools['word_tokenize'](word)
+    pos_tagged = nltk_tools['pos_tag'](tokenized_word)
     word, tag = pos_tagged[0]
     wordnet_pos = get_wordnet_pos(tag)
-    return lemmatizer.lemmatize(word, wordnet_pos)
+    return nltk_tools['lemmatizer'].lemmatize(word, wordnet_pos)
+
+# Function to lemmatize a word: O(1) table lookup for the corpus vocabulary, NLTK otherwise
+def lemmatize_word(word):
+    lemma = get_lemma_table().get(word)
+    if lemma is not None:
+        return lemma
+    return nltk_lemmatize_word(word)
+
+# Memoized WordNet lemmatization of a (word, WordNet POS) pair
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize_with_pos(word, wordnet_pos):
+    return load_nltk()['lemmatizer'].lemmatize(word, wordnet_pos)
+
+# Function to lemmatize a whole sequence of tokens (e.g. one title) at index time. Every token gets the
+# lemma lemmatize_word gives it as a query word (lemma table, else its own word_tokenize pieces tagged alone,
+# not the surrounding title), so indexed and queried words map to the same term ID. The tokens missing
+# from the table and the memo are tagged together with a single pos_tag_sents call.
+def lemmatize_tokens(tokens):
+    tokens = [token for token in tokens if token]
+    if not tokens:
+        return []
+    table = get_lemma_table()
+    lemmas = {}  # Lemmas of this batch's tokens outside the table, safe from the evictions below
+    missing = []
+    for token in dict.fromkeys(tokens):
+        if token in table:
+            continue
+        if token in _token_lemmas:
+            _token_lemmas.move_to_end(token)
+            lemmas[token] = _token_lemmas[token]
+        else:
+            missing.append(token)
+    if missing:
+        nltk_tools = load_nltk()
+        sentences = nltk_tools['pos_tag_sents']([nltk_tools['word_tokenize'](token) or [token] for token in missing])
+        for token, pos_tagged in zip(missing, sentences):
+            word, tag = pos_tagged[0]
+            lemmas[token] = _token_lemmas[token] = lemmatize_with_pos(word, get_wordnet_pos(tag))
+        while len(_token_lemmas) > LEMMA_CACHE_SIZE:
+            _token_lemmas.popitem(last=False)
+    _batch_stats['batches'] += 1
+    _batch_stats['tokens'] += len(tokens)
+    _batch_stats['misses'] += len(missing)
+    _batch_stats['hits'] += len(tokens) - len(missing)
+    return [table[token] if token in table else lemmas[token] for token in tokens]
+
+# Hit-rate statistics of the lemmatization memo (lemma table and token memo together)
+def lemma_cache_stats():
+    lookups = _batch_stats['hits'] + _batch_stats['misses']
+    return {
+        'batches': _batch_stats['batches'],
+        'tokens': _batch_stats['tokens'],
+        'hits': _batch_stats['hits'],
+        'misses': _batch_stats['misses'],
+        'hit_rate': _batch_stats['hits'] / lookups if lookups else 0.0,
+        'size': len(_token_lemmas),
+        'max_size': LEMMA_CACHE_SIZE,
+    }
 
 # Function to apply lemmatization to text
 def apply_processing(text):
-    tokenized_words = word_tokenize(text)  # Tokenize the text
-    pos_tagged = pos_tag(tokenized_words)  # Get POS tags
+    nltk_tools = load_nltk()
+    tokenized_words = nltk_tools['word_tokenize'](text)  # Tokenize the text
+    pos_tagged = nltk_tools['pos_tag'](tokenized_words)  # Get POS tags
     
     lemmatized_words = []
     
     # Lemmatize each word based on its POS tag
     for word, tag in pos_tagged:
         wordnet_pos = get_wordnet_pos(tag)  # Map to WordNet POS
-        lemmatized_word = lemmatizer.lemmatize(word, wordnet_pos)
+        lemmatized_word = nltk_tools['lemmatizer'].lemmatize(word, wordnet_pos)
         lemmatized_words.append(lemmatized_word)
     
     # Join the lemmatized words back into a string
@@ -69,7 +186,26 @@ def wordToken(text):
 
 
 
+def get_lexicon():
+    """Opens the lexicon once per process; returns None while no lexicon has been built."""
+    global _lexicon
+    if _lexicon is None and os.path.exists(LEXICON_PATH):
+        from lexicon import Lexicon
+        _lexicon = Lexicon(LEXICON_PATH)
+    return _lexicon
+
+
+# Function to map a lemmatized word to its term ID. With a lexicon the ID is dense and collision-free
+# (create=True assigns IDs to new words, as ingest does); without one it falls back to wordToken.
+def termToken(text, create=False):
+    lexicon = get_lexicon()
+    if lexicon is None:
+        return wordToken(text)
+    return lexicon.add(text) if create else lexicon.lookup(text)
+
+
 def remove_duplicates_and_save(file_path):
+    import pandas as pd  # Only needed by the offline vocabulary build
  
     if not os.path.exists(file_path):
         print(f"File not found: {file_path}")
@@ -0,0 +1,284 @@
+import os
+import sys
+import csv
+import mmap
+import struct
+import threading
+
+try:
+    import fcntl  # Serialises appends from concurrent upload processes (not available on Windows)
+except ImportError:
+    fcntl = None
+
+# Lexicon: lemmatized term -> dense integer term ID (IDs start at 1).
+#   lexicon.bin : header (magic, term count, next free ID, generation), then an offset array (u32, count + 1),
+#                 an ID array (u32, count) and the UTF-8 term strings, sorted, back to back
+#   lexicon.log : a "<TAB>generation<TAB>N" line naming the table generation the log extends, then
+#                 "term<TAB>id" lines appended for terms added since the last compaction
+# Every compaction writes the table with the next generation before it empties the log, so a reader
+# finding another generation at the head of the log knows its table and log offset are stale.
+MAGIC = b'BOLTLEX2'
+HEADER = struct.Struct('<8sIII')
+# Tables written before the generation was added; read as generation 0
+MAGIC_V1 = b'BOLTLEX1'
+HEADER_V1 = struct.Struct('<8sII')
+U32 = struct.Struct('<I')
+LOG_HEADER = b'\tgeneration\t'
+DEFAULT_LEXICON_PATH = './dataset/lexicon.bin'
+
+
+def normalize_term(term):
+    return str(term).strip().lower()
+
+
+def write_lexicon(path, term_ids, generation=0):
+    """Writes a sorted string table for a term -> ID dictionary, atomically."""
+    encoded = sorted((normalize_term(term).encode('utf-8'), term_id) for term, term_id in term_ids.items())
+    offsets = bytearray()
+    ids = bytearray()
+    blob = bytearray()
+    for term, term_id in encoded:
+        offsets += U32.pack(len(blob))
+        ids += U32.pack(term_id)
+        blob += term
+    offsets += U32.pack(len(blob))
+
+    next_id = max(term_ids.values(), default=0) + 1
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(encoded), next_id, generation))
+        f.write(offsets)
+        f.write(ids)
+        f.write(blob)
+    os.replace(temp_path, path)
+
+
+def read_log_generation(log):
+    """Generation named by the first line of an open log file (None while the log is empty, 0 for headerless logs)."""
+    log.seek(0)
+    first_line = log.readline()
+    if not first_line:
+        return None
+    if first_line.startswith(LOG_HEADER) and first_line.endswith(b'\n'):
+        return int(first_line[len(LOG_HEADER):])
+    return 0
+
+
+def reset_log(log, generation):
+    """Empties a log (opened for appending and locked) and starts it for a table of the given generation."""
+    log.truncate(0)
+    log.write(LOG_HEADER + f"{generation}\n".encode('utf-8'))
+    log.flush()
+
+
+class Lexicon:
+    """Memory-mapped sorted term table plus an append-only log of newer terms."""
+
+    def __init__(self, path=DEFAULT_LEXICON_PATH):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + '.log'
+        self._lock = threading.Lock()
+        self._map = None
+        self._open_table()
+        self._read_log()
+
+    def _open_table(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self.count = 0
+        self.next_id = 1
+        self.generation = 0
+        self._appended = {}
+        self._log_offset = 0
+        self._log_generation = None
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic = self._map[:len(MAGIC)]
+            if magic == MAGIC:
+                _, self.count, self.next_id, self.generation = HEADER.unpack_from(self._map, 0)
+                header_size = HEADER.size
+            elif magic == MAGIC_V1:
+                _, self.count, self.next_id = HEADER_V1.unpack_from(self._map, 0)
+                header_size = HEADER_V1.size
+            else:
+                self._map.close()
+                raise ValueError(f"{self.path} is not a lexicon")
+            self._offsets_start = header_size
+            self._ids_start = self._offsets_start + (self.count + 1) * U32.size
+            self._blob_start = self._ids_start + self.count * U32.size
+
+    def _term_at(self, index):
+        start = U32.unpack_from(self._map, self._offsets_start + index * U32.size)[0]
+        end = U32.unpack_from(self._map, self._offsets_start + (index + 1) * U32.size)[0]
+        return self._map[self._blob_start + start:self._blob_start + end]
+
+    def _table_lookup(self, term_bytes):
+        # Binary search over the sorted string table
+        low, high = 0, self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            current = self._term_at(middle)
+            if current < term_bytes:
+                low = middle + 1
+            elif current > term_bytes:
+                high = middle - 1
+            else:
+                return U32.unpack_from(self._map, self._ids_start + middle * U32.size)[0]
+        return None
+
+    def _read_log(self):
+        """Reads log lines appended since the last read (by this or another process)."""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'rb') as f:
+            log_generation = read_log_generation(f)
+            if log_generation is None:
+                return  # Empty, or being reset by a compaction
+            if log_generation != self._log_generation:
+                # Another process compacted the log into a new table: the table was replaced before
+                # the log was reset, so reopen it and read the log from its start
+                if self._log_generation is not None or log_generation != self.generation:
+                    self._open_table()
+                self._log_generation = log_generation
+                self._log_offset = 0
+            f.seek(self._log_offset)
+            data = f.read()
+        # Only consume complete lines; a concurrent writer may be mid-line
+        complete = data[:data.rfind(b'\n') + 1]
+        self._log_offset += len(complete)
+        for line in complete.decode('utf-8').splitlines():
+            term, _, term_id = line.partition('\t')
+            if term and term_id:
+                self._appended[term] = int(term_id)
+                self.next_id = max(self.next_id, int(term_id) + 1)
+
+    def _lookup(self, term):
+        if term in self._appended:
+            return self._appended[term]
+        if self._map is not None:
+            return self._table_lookup(term.encode('utf-8'))
+        return None
+
+    def lookup(self, term):
+        """Returns the ID of a term, or None if the term has never been added."""
+        term = normalize_term(term)
+        with self._lock:
+            term_id = self._lookup(term)
+            if term_id is None:
+                self._read_log()  # An upload may have added it since
+                term_id = self._lookup(term)
+            return term_id
+
+    def add(self, term):
+        """Returns the ID of a term, assigning the next dense ID (and logging it) if it is new."""
+        term = normalize_term(term)
+        if not term or '\t' in term or '\n' in term:
+            return None
+        with self._lock:
+            term_id = self._lookup(term)
+            if term_id is not None:
+                return term_id
+            with open(self.log_path, 'ab') as log:
+                if fcntl:
+                    fcntl.flock(log, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(log.fileno()).st_size == 0:
+                        reset_log(log, self.generation)  # First term logged against this table
+                    self._read_log()
+                    term_id = self._lookup(term)
+                    if term_id is None:
+                        term_id = self.next_id
+                        log.write(f"{term}\t{term_id}\n".encode('utf-8'))
+                        log.flush()
+                        self._appended[term] = term_id
+                        self.next_id = term_id + 1
+                        self._log_offset = log.tell()
+                finally:
+                    if fcntl:
+                        fcntl.flock(log, fcntl.LOCK_UN)
+            return term_id
+
+    def items(self):
+        """Yields every (term, ID) pair: the sorted table first, then logged terms."""
+        for index in range(self.count):
+            term = self._term_at(index).decode('utf-8')
+            if term not in self._appended:
+                yield term, U32.unpack_from(self._map, self._ids_start + index * U32.size)[0]
+        yield from self._appended.items()
+
+    def __len__(self):
+        return self.count + len(self._appended)
+
+    def compact(self):
+        """Folds the log into the sorted table and empties the log."""
+        with self._lock, open(self.log_path, 'ab') as log:
+            # Hold the append lock so no term is logged between the rewrite and the truncation
+            if fcntl:
+                fcntl.flock(log, fcntl.LOCK_EX)
+            try:
+                self._read_log()
+                if not self._appended:
+                    return
+                # The table gets the next generation before the log is reset, see the format notes above
+                generation = max(self.generation, self._log_generation or 0) + 1
+                write_lexicon(self.path, dict(self.items()), generation)
+                reset_log(log, generation)
+                self._open_table()
+                self._log_generation = generation
+                self._log_offset = log.tell()
+            finally:
+                if fcntl:
+                    fcntl.flock(log, fcntl.LOCK_UN)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+
+
+def build_lexicon(terms, path=DEFAULT_LEXICON_PATH):
+    """Builds a lexicon giving dense IDs (in sorted order) to a vocabulary, keeping IDs already assigned."""
+    log_path = os.path.splitext(path)[0] + '.log'
+    with open(log_path, 'ab') as log:
+        # Hold the append lock like compaction: a term logged by an upload meanwhile would be lost with the log
+        if fcntl:
+            fcntl.flock(log, fcntl.LOCK_EX)
+        try:
+            generation = 0
+            existing = {}
+            if os.path.exists(path):
+                lexicon = Lexicon(path)
+                existing = dict(lexicon.items())
+                generation = max(lexicon.generation, lexicon._log_generation or 0) + 1
+                lexicon.close()
+            term_ids = dict(existing)
+            next_id = max(term_ids.values(), default=0) + 1
+            for term in sorted({normalize_term(term) for term in terms} - set(existing)):
+                if term and '\t' not in term and '\n' not in term:
+                    term_ids[term] = next_id
+                    next_id += 1
+            write_lexicon(path, term_ids, generation)
+            reset_log(log, generation)
+        finally:
+            if fcntl:
+                fcntl.flock(log, fcntl.LOCK_UN)
+    return len(term_ids)
+
+
+if __name__ == "__main__":
+    # python lexicon.py build <vocabulary csv> [lexicon path]  |  python lexicon.py compact [lexicon path]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    if command == 'compact':
+        lexicon = Lexicon(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_LEXICON_PATH)
+        lexicon.compact()
+        print(f"Lexicon compacted: {len(lexicon)} terms.")
+    else:
+        vocabulary_file = sys.argv[2] if len(sys.argv) > 2 else './dataset/lt1.csv'
+        lexicon_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_LEXICON_PATH
+        csv.field_size_limit(2**31 - 1)
+        with open(vocabulary_file, 'r', encoding='ISO-8859-1', newline='') as f:
+            reader = csv.DictReader(f)
+            vocabulary = [row['lemmatizedtag'] for row in reader if row.get('lemmatizedtag')]
+        print(f"Lexicon built with {build_lexicon(vocabulary, lexicon_path)} terms at {lexicon_path}.")
@@ -0,0 +1,153 @@
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+
+# Roaring-style compressed bitmap of document IDs. IDs are split by their high 16 bits into chunks;
+# a chunk with at most ARRAY_LIMIT members is a sorted array('H') of its low 16 bits, a denser chunk is a
+# 65536-bit Python int whose bitwise operators run in C. AND, OR and ANDNOT work chunk by chunk.
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+LOW_MASK = CHUNK_SIZE - 1
+ARRAY_LIMIT = 4096
+CHUNK_BYTES = CHUNK_SIZE // 8
+# Chunks computed by AND / ANDNOT are transient, so they stay as bits unless they are very sparse
+RESULT_ARRAY_LIMIT = 256
+
+_SET_BIT = re.compile('1')
+
+
+def popcount(value):
+    return bin(value).count('1')
+
+
+if hasattr(int, 'bit_count'):  # Python 3.10+
+    popcount = int.bit_count
+
+
+def lows_to_bits(lows):
+    bits = bytearray(CHUNK_BYTES)
+    for low in lows:
+        bits[low >> 3] |= 1 << (low & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def bits_to_lows(bits):
+    # Scan the reversed binary string in C rather than testing bits one by one
+    return array('H', [match.start() for match in _SET_BIT.finditer(bin(bits)[:1:-1])])
+
+
+def _compact(bits, limit=RESULT_ARRAY_LIMIT):
+    """Turns a chunk of bits holding at most limit members into a sorted array."""
+    if popcount(bits) > limit:
+        return bits
+    return bits_to_lows(bits)
+
+
+def _and_chunks(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return _compact(a & b)
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return array('H', (low for low in a if b >> low & 1))
+    return array('H', sorted(set(a).intersection(b)))
+
+
+def _or_chunks(a, b):
+    if isinstance(a, int) or isinstance(b, int) or len(a) + len(b) > ARRAY_LIMIT:
+        return (a if isinstance(a, int) else lows_to_bits(a)) | (b if isinstance(b, int) else lows_to_bits(b))
+    return array('H', sorted(set(a).union(b)))
+
+
+def _andnot_chunks(a, b):
+    if isinstance(a, int):
+        return _compact(a & ~(b if isinstance(b, int) else lows_to_bits(b)))
+    if isinstance(b, int):
+        return array('H', (low for low in a if not b >> low & 1))
+    return array('H', sorted(set(a).difference(b)))
+
+
+def _chunk_length(chunk):
+    return popcount(chunk) if isinstance(chunk, int) else len(chunk)
+
+
+class RoaringBitmap:
+    """Immutable set of non-negative document IDs; iteration yields them in increasing order."""
+
+    __slots__ = ('chunks', 'keys', 'length')
+
+    def __init__(self, chunks=None):
+        self.chunks = {high: chunk for high, chunk in (chunks or {}).items() if _chunk_length(chunk)}
+        self.keys = sorted(self.chunks)
+        self.length = sum(_chunk_length(chunk) for chunk in self.chunks.values())
+
+    @classmethod
+    def from_sorted(cls, doc_ids):
+        """Builds a bitmap from sorted, non-negative document IDs."""
+        chunks = {}
+        for high, group in groupby(doc_ids, key=lambda doc_id: doc_id >> CHUNK_BITS):
+            lows = array('H', (doc_id & LOW_MASK for doc_id in group))
+            if len(lows) > ARRAY_LIMIT:
+                chunks[high] = _compact(lows_to_bits(lows), ARRAY_LIMIT)
+            else:
+                chunks[high] = array('H', sorted(set(lows)))
+        return cls(chunks)
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, doc_id):
+        chunk = self.chunks.get(doc_id >> CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = doc_id & LOW_MASK
+        if isinstance(chunk, int):
+            return bool(chunk >> low & 1)
+        position = bisect_left(chunk, low)
+        return position < len(chunk) and chunk[position] == low
+
+    def __iter__(self):
+        for high in self.keys:
+            chunk = self.chunks[high]
+            base = high << CHUNK_BITS
+            for low in (bits_to_lows(chunk) if isinstance(chunk, int) else chunk):
+                yield base + low
+
+    def to_list(self):
+        return list(self)
+
+    def __and__(self, other):
+        return RoaringBitmap({
+            high: _and_chunks(chunk, other.chunks[high])
+            for high, chunk in self.chunks.items() if high in other.chunks
+        })
+
+    def __or__(self, other):
+        chunks = dict(self.chunks)
+        for high, chunk in other.chunks.items():
+            chunks[high] = _or_chunks(chunks[high], chunk) if high in chunks else chunk
+        return RoaringBitmap(chunks)
+
+    def andnot(self, other):
+        return RoaringBitmap({
+            high: _andnot_chunks(chunk, other.chunks[high]) if high in other.chunks else chunk
+            for high, chunk in self.chunks.items()
+        })
+
+    __sub__ = andnot
+
+    def select(self, doc_ids):
+        """Returns the members of an iterable of document IDs that are in the bitmap, in their order."""
+        return [doc_id for doc_id in doc_ids if doc_id in self]
+
+    def memory_bytes(self):
+        """Approximate resident size of the chunks."""
+        return sum(
+            CHUNK_BYTES if isinstance(chunk, int) else sys.getsizeof(chunk)
+            for chunk in self.chunks.values()
+        ) + 64 * len(self.chunks)
+
+    def __repr__(self):
+        return f"RoaringBitmap({self.length} ids in {len(self.chunks)} chunks)"
@@ -1,19 +1,34 @@
 
+# Columns returned to the client, in their fixed order
+DOCUMENT_FIELDS = ['Id', 'CreationDate', 'Score', 'Title', 'Body', 'Tag', 'Answer', 'combined_token_ids']
+
+
+def field_projection(fields):
+    """
+    Normalizes a requested projection, e.g. "id,title,score" or ['Title'], to known document fields
+    in output order. 'Id' is always kept; None (or nothing known) means every field.
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    requested = {str(field).strip().lower() for field in fields}
+    if not any(field.lower() in requested for field in DOCUMENT_FIELDS):
+        return None
+    return [field for field in DOCUMENT_FIELDS if field.lower() in requested or field == 'Id']
+
+
+def final_Document(row, fields=None):
+    # Keep only the columns returned to the client (or the requested projection), in a fixed order
+    return {field: row.get(field) for field in (fields or DOCUMENT_FIELDS)}
+
+
 def final_Documents(documents):
     # Normalize and lemmatize the input words/phrases
     # Convert sorted DataFrame to a list of dictionaries (instead of tuples)
     result_dicts = [
-        {
-            'Id': row['Id'],
-            'CreationDate': row['CreationDate'],
-            'Score': row['Score'],
-            'Title': row['Title'],
-            'Body': row['Body'],
-            'Tag': row['Tag'],
-            'Answer': row['Answer'],
-            'combined_token_ids': row['combined_token_ids'],
-        }
+        final_Document(row)
         for _, row in documents.iterrows()
     ]
-    
+
     return result_dicts
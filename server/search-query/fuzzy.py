@@ -0,0 +1,164 @@
+import sys
+import os
+import threading
+
+# Make the sibling modules importable regardless of how the builder is started
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from suggest import load_term_frequencies, VOCABULARY_FILE
+
+# Symmetric-delete (SymSpell-style) index over the lemmatized vocabulary, built offline:
+#   first line : "max_distance<TAB>prefix_length<TAB>term count"
+#   then       : one "term<TAB>document frequency" line per term
+#   then       : one "delete<TAB>term index,term index,..." line per delete variant
+# Deletes are generated from the first prefix_length characters only, which bounds the index size.
+FUZZY_INDEX_FILE = './dataset/barrels/symspell.tsv'
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+# Ranking weight multiplier applied once per edit of a corrected term
+DISTANCE_PENALTY = 0.5
+MAX_CANDIDATES = 3
+
+_index_lock = threading.Lock()
+_index = {'mtime': None, 'index': None}
+
+
+def deletes(word, max_distance):
+    """Returns every string obtained by deleting up to max_distance characters from word."""
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for current in frontier:
+            for position in range(len(current)):
+                next_frontier.add(current[:position] + current[position + 1:])
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance (adjacent transpositions count as one edit), capped at max_distance + 1."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class SymSpellIndex:
+    """Maps a misspelled word to vocabulary terms within MAX_DISTANCE edits without scanning the vocabulary."""
+
+    def __init__(self, terms, frequencies, delete_map, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.terms = terms
+        self.frequencies = frequencies
+        self.deletes = delete_map
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+
+    @classmethod
+    def build(cls, term_frequencies, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        terms = sorted(term_frequencies)
+        delete_map = {}
+        for index, term in enumerate(terms):
+            for variant in deletes(term[:prefix_length], max_distance):
+                delete_map.setdefault(variant, []).append(index)
+        return cls(terms, [term_frequencies[term] for term in terms], delete_map, max_distance, prefix_length)
+
+    def save(self, path):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{self.max_distance}\t{self.prefix_length}\t{len(self.terms)}\n")
+            for term, frequency in zip(self.terms, self.frequencies):
+                f.write(f"{term}\t{frequency}\n")
+            for variant, indexes in self.deletes.items():
+                f.write(f"{variant}\t{','.join(map(str, indexes))}\n")
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            max_distance, prefix_length, term_count = map(int, f.readline().split('\t'))
+            terms = []
+            frequencies = []
+            for _ in range(term_count):
+                term, _, frequency = f.readline().rstrip('\n').rpartition('\t')
+                terms.append(term)
+                frequencies.append(int(frequency))
+            delete_map = {}
+            for line in f:
+                variant, _, indexes = line.rstrip('\n').rpartition('\t')
+                delete_map[variant] = [int(index) for index in indexes.split(',')]
+        return cls(terms, frequencies, delete_map, max_distance, prefix_length)
+
+    def lookup(self, word, max_distance=None, limit=MAX_CANDIDATES):
+        """
+        Returns up to limit (term, distance, document frequency) corrections of word,
+        closest first and then most frequent.
+        """
+        word = word.strip().lower()
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates = set()
+        for variant in deletes(word[:self.prefix_length], max_distance):
+            candidates.update(self.deletes.get(variant, ()))
+
+        corrections = []
+        for index in candidates:
+            term = self.terms[index]
+            distance = edit_distance(word, term, max_distance)
+            if distance <= max_distance:
+                corrections.append((distance, -self.frequencies[index], term))
+        corrections.sort()
+        return [(term, distance, -frequency) for distance, frequency, term in corrections[:limit]]
+
+
+def build_fuzzy_index(vocabulary_file=VOCABULARY_FILE, output_path=FUZZY_INDEX_FILE):
+    """Builds the symmetric-delete index of the lemmatized vocabulary (offline step)."""
+    index = SymSpellIndex.build(load_term_frequencies(vocabulary_file))
+    index.save(output_path)
+    print(f"Fuzzy index with {len(index.terms)} terms and {len(index.deletes)} deletes written to {output_path}")
+    return index
+
+
+def get_fuzzy_index(path=FUZZY_INDEX_FILE):
+    """Returns the resident fuzzy index (loaded once per process), or None if it has not been built."""
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    with _index_lock:
+        if _index['mtime'] == mtime:
+            return _index['index']
+    index = SymSpellIndex.load(path)
+    with _index_lock:
+        _index['mtime'] = mtime
+        _index['index'] = index
+    return index
+
+
+def corrections(word):
+    """Returns (term, distance, weight) corrections of a word that has no postings, best first."""
+    index = get_fuzzy_index()
+    if index is None:
+        return []
+    return [
+        (term, distance, DISTANCE_PENALTY ** distance)
+        for term, distance, _ in index.lookup(word)
+        if distance > 0
+    ]
+
+
+if __name__ == "__main__":
+    build_fuzzy_index(
+        sys.argv[1] if len(sys.argv) > 1 else VOCABULARY_FILE,
+        sys.argv[2] if len(sys.argv) > 2 else FUZZY_INDEX_FILE,
+    )
@@ -0,0 +1,260 @@
+import sys
+import os
+import heapq
+import json
+from bisect import bisect_left
+
+# Make the sibling modules importable regardless of how the engine is started
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from searchDos import SearchError, word_terms, fetch_documents
+from ranking import TermScorer, get_field_stats, top_k
+from bitmaps import RoaringBitmap
+from documents_parser import field_projection
+from metrics import count, note, note_item, span
+
+# Query syntax: words are ANDed together, "OR" separates alternatives,
+# and "NOT word" or "-word" excludes documents containing the word.
+# Required words with no postings match their closest spelling corrections; excluded words never do.
+OPERATOR_AND = 'AND'
+OPERATOR_OR = 'OR'
+OPERATOR_NOT = 'NOT'
+
+# Posting lists are sorted lists, or RoaringBitmaps for frequent terms. Each pair of operands is combined
+# with the fastest method for their forms; two lists gallop when one is GALLOP_RATIO times longer.
+GALLOP_RATIO = 16
+
+
+def parse_query(query):
+    """
+    Parses a query into OR-separated clauses.
+
+    Args:
+        query (str): e.g. "python pandas OR numpy -java"
+
+    Returns:
+        tuple: (clauses, explicit) where clauses is a list of {'must': [...], 'not': [...]} word lists
+        and explicit tells whether the query used any operator.
+    """
+    clauses = [{'must': [], 'not': []}]
+    explicit = False
+    negate_next = False
+    for word in query.split():
+        if word == OPERATOR_OR:
+            explicit = True
+            if clauses[-1]['must'] or clauses[-1]['not']:
+                clauses.append({'must': [], 'not': []})
+            continue
+        if word == OPERATOR_AND:
+            explicit = True
+            continue
+        if word == OPERATOR_NOT:
+            explicit = True
+            negate_next = True
+            continue
+        if word.startswith('-') and len(word) > 1:
+            explicit = True
+            clauses[-1]['not'].append(word[1:])
+        elif negate_next:
+            clauses[-1]['not'].append(word)
+        else:
+            clauses[-1]['must'].append(word)
+        negate_next = False
+    return [clause for clause in clauses if clause['must']], explicit
+
+
+def gallop(postings, target, low):
+    """Returns the first index >= low with postings[index] >= target, probing in doubling steps."""
+    step = 1
+    high = low
+    while high < len(postings) and postings[high] < target:
+        low = high + 1
+        high = low + step
+        step *= 2
+    return bisect_left(postings, target, low, min(high, len(postings)))
+
+
+def intersect(short, long):
+    """Intersects two sorted lists by galloping through the longer one for each element of the shorter."""
+    if len(short) > len(long):
+        short, long = long, short
+    result = []
+    position = 0
+    for doc_id in short:
+        position = gallop(long, doc_id, position)
+        if position == len(long):
+            break
+        if long[position] == doc_id:
+            result.append(doc_id)
+    return result
+
+
+def intersect_pair(a, b):
+    """Intersects two posting lists or bitmaps: bitmap AND, probing a bitmap, galloping or a set intersection."""
+    if isinstance(a, RoaringBitmap) and isinstance(b, RoaringBitmap):
+        return a & b
+    if isinstance(a, RoaringBitmap):
+        a, b = b, a
+    if isinstance(b, RoaringBitmap):
+        return b.select(a)
+    short, long = (a, b) if len(a) <= len(b) else (b, a)
+    if len(long) >= GALLOP_RATIO * len(short):
+        return intersect(short, long)
+    return sorted(set(short).intersection(long))
+
+
+def intersect_all(posting_lists):
+    """Intersects posting lists shortest first, stopping as soon as the candidate set is empty."""
+    if not posting_lists:
+        return []
+    posting_lists = sorted(posting_lists, key=len)
+    result = posting_lists[0]
+    for postings in posting_lists[1:]:
+        if not result:
+            break
+        result = intersect_pair(result, postings)
+    return result
+
+
+def union_all(posting_lists):
+    """Merges posting lists into one without duplicates: a bitmap OR when any operand is a bitmap."""
+    bitmaps = [postings for postings in posting_lists if isinstance(postings, RoaringBitmap)]
+    if bitmaps:
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result | bitmap
+        lists = [postings for postings in posting_lists if not isinstance(postings, RoaringBitmap) and postings]
+        if lists:
+            result = result | RoaringBitmap.from_sorted(union_all(lists))
+        return result
+
+    result = []
+    for doc_id in heapq.merge(*posting_lists):
+        if not result or result[-1] != doc_id:
+            result.append(doc_id)
+    return result
+
+
+def difference(postings, excluded):
+    """Returns the elements of postings that are not in excluded (ANDNOT), as a bitmap when postings is one."""
+    if not excluded:
+        return postings
+    if isinstance(excluded, RoaringBitmap):
+        if isinstance(postings, RoaringBitmap):
+            return postings.andnot(excluded)
+        return [doc_id for doc_id in postings if doc_id not in excluded]
+    if isinstance(postings, RoaringBitmap):
+        return postings.andnot(RoaringBitmap.from_sorted(excluded))
+    result = []
+    position = 0
+    for doc_id in postings:
+        position = gallop(excluded, doc_id, position)
+        if position == len(excluded) or excluded[position] != doc_id:
+            result.append(doc_id)
+    return result
+
+
+class QueryEvaluator:
+    """Evaluates a parsed query over posting lists, looking each word up once."""
+
+    def __init__(self):
+        self.terms = {}
+        self.postings = {}
+
+    def word_terms(self, word, fuzzy=True):
+        if (word, fuzzy) not in self.terms:
+            self.terms[(word, fuzzy)] = word_terms(word, fuzzy)
+        return self.terms[(word, fuzzy)]
+
+    def word_postings(self, word, fuzzy=True):
+        if (word, fuzzy) not in self.postings:
+            self.postings[(word, fuzzy)] = union_all([
+                postings for _, field_postings, _ in self.word_terms(word, fuzzy)
+                for postings in (field_postings['title'], field_postings['tag'])
+            ])
+        return self.postings[(word, fuzzy)]
+
+    def evaluate_clause(self, clause):
+        required = [self.word_postings(word) for word in clause['must']]
+        candidates = intersect_all(required)
+        excluded = union_all([self.word_postings(word, fuzzy=False) for word in clause['not']])
+        result = difference(candidates, excluded)
+        note_item('clauses', {
+            'must': clause['must'], 'not': clause['not'],
+            'postings': [len(postings) for postings in required],
+            'intersection': len(candidates), 'excluded': len(excluded), 'result': len(result),
+        })
+        return result
+
+    def evaluate(self, clauses):
+        return union_all([self.evaluate_clause(clause) for clause in clauses])
+
+    def scorers(self, words, stats):
+        return [
+            TermScorer(int(token), field_postings, stats, weight)
+            for word in words
+            for token, field_postings, weight in self.word_terms(word)
+        ]
+
+
+def rank(evaluator, candidates, words, limit):
+    """Keeps the BM25F top-k candidates (title and tag fields), best first."""
+    stats = get_field_stats()
+    return [doc_id for _, doc_id in top_k(candidates, evaluator.scorers(words, stats), limit, stats)]
+
+
+def searchQuery(query, limit=30, fields=None):
+    """
+    Evaluates a whole query over the posting lists and fetches only the final top-k documents.
+
+    Args:
+        query (str): The raw query, e.g. "python pandas -java".
+        limit (int): Maximum number of documents to return.
+        fields (str | list): Optional projection, e.g. "Id,Title,Score"; every field by default.
+
+    Returns:
+        list | dict: The ranked documents, or a dict with an "error" key.
+    """
+    try:
+        with span('query.parse'):
+            clauses, explicit = parse_query(query)
+        if not clauses:
+            return {"error": "Query has no search terms."}
+
+        evaluator = QueryEvaluator()
+        with span('query.evaluate'):
+            candidates = evaluator.evaluate(clauses)
+
+            # A plain word list with no document holding every word falls back to matching any of them
+            if not candidates and not explicit:
+                candidates = union_all([evaluator.word_postings(word) for word in clauses[0]['must']])
+                note('fallback', 'any word')
+        count('candidates', len(candidates))
+        note('candidates', len(candidates))
+
+        words = sorted({word for clause in clauses for word in clause['must']})
+        with span('query.rank'):
+            ranked = rank(evaluator, candidates, words, limit)
+        note('ranked', len(ranked))
+        results = fetch_documents(ranked, field_projection(fields))
+
+        if results:
+            return results
+        else:
+            return {"error": "No results found."}
+
+    except SearchError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        print(f"Unexpected error: {e}", file=sys.stderr)
+        return {"error": f"An unexpected error occurred: {e}"}
+
+
+# Entry point
+if __name__ == "__main__":
+    try:
+        query = sys.argv[1]
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 30  # Default to 30 if no limit is provided
+        print(json.dumps(searchQuery(query, limit), default=str))
+    except Exception as e:
+        print(json.dumps({"error": f"An unexpected error occurred: {e}"}))
@@ -0,0 +1,193 @@
+import sys
+import os
+import math
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+
+# Add the '../InvertedIndexer' folder to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'InvertedIndexer'))
+
+from fieldStats import FieldStats, DEFAULT_STATS_DIR, current_stats_folder
+
+# BM25F parameters: per-field weights and length normalisation, shared saturation k1
+K1 = 1.2
+FIELD_WEIGHTS = {'title': 2.0, 'tag': 1.0}
+FIELD_B = {'title': 0.75, 'tag': 0.5}
+
+_stats_lock = threading.Lock()
+_field_stats = {'version': None, 'stats': None}
+
+
+def get_field_stats(stats_dir=DEFAULT_STATS_DIR):
+    """
+    Returns the resident FieldStats, reloading them when the index build rewrites them.
+    Returns None when no statistics have been built; ranking then falls back to live posting lengths.
+    """
+    # Builds publish each generation in a folder of its own, so (folder, mtime) identifies a complete set
+    folder = current_stats_folder(stats_dir)
+    summary_path = os.path.join(folder, 'summary.json')
+    try:
+        version = (folder, os.path.getmtime(summary_path))
+    except OSError:
+        return None
+    with _stats_lock:
+        if _field_stats['version'] == version:
+            return _field_stats['stats']
+    try:
+        stats = FieldStats(stats_dir, folder)
+    except (OSError, ValueError, KeyError, EOFError) as e:
+        print(f"Error reading field statistics from {folder}: {e}", file=sys.stderr)
+        return None
+    with _stats_lock:
+        _field_stats['version'] = version
+        _field_stats['stats'] = stats
+    return stats
+
+
+def contains(postings, doc_id):
+    if not isinstance(postings, list):
+        return doc_id in postings  # Resident bitmap of a frequent term
+    position = bisect_left(postings, doc_id)
+    return position < len(postings) and postings[position] == doc_id
+
+
+class TermScorer:
+    """BM25F contribution of one query term, with an upper bound used for MaxScore pruning."""
+
+    def __init__(self, term_id, field_postings, stats, weight=1.0):
+        self.field_postings = field_postings
+        self.stats = stats
+        self.weight = weight
+
+        df = stats.document_frequency(term_id) if stats else None
+        if df is None:
+            # Terms added by uploads after the last build: use the live posting lists
+            df = len(set(field_postings['title']) | set(field_postings['tag']))
+        document_count = max(stats.document_count if stats else df, df, 1)
+        self.idf = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+
+        # Highest possible pseudo-frequency: present in every field with the shortest length
+        max_tf = sum(FIELD_WEIGHTS[field] / (1 - FIELD_B[field]) for field in FIELD_WEIGHTS)
+        self.upper_bound = self.weight * self.idf * max_tf / (K1 + max_tf)
+        self._doc_ids = None
+
+    def doc_ids(self):
+        """Sorted document IDs holding the term in any field (built on first use)."""
+        if self._doc_ids is None:
+            self._doc_ids = sorted(set(self.field_postings['title']) | set(self.field_postings['tag']))
+        return self._doc_ids
+
+    def score(self, doc_id, lengths):
+        tf = 0.0
+        for field, postings in self.field_postings.items():
+            if contains(postings, doc_id):
+                average = self.stats.average_length[field] if self.stats else 0
+                if average and lengths:
+                    norm = 1 - FIELD_B[field] + FIELD_B[field] * lengths[field] / average
+                else:
+                    norm = 1.0
+                tf += FIELD_WEIGHTS[field] / max(norm, 1e-9)
+        if not tf:
+            return 0.0
+        return self.weight * self.idf * tf / (K1 + tf)
+
+
+def push(heap, limit, score, doc_id):
+    """Offers a scored document to the bounded min-heap of the top-k."""
+    if len(heap) < limit:
+        heapq.heappush(heap, (score, doc_id))
+    elif (score, doc_id) > heap[0]:
+        # Candidates arrive in increasing Id order and ties go to the higher Id
+        heapq.heapreplace(heap, (score, doc_id))
+
+
+def top_k(candidates, scorers, limit, stats, prune=True):
+    """
+    Scores candidates with BM25F and returns the best (score, doc_id) pairs, best first.
+
+    A bounded min-heap keeps only the current top-k. With prune=True this is MaxScore: once the heap is
+    full, the terms are split by upper bound into non-essential ones (the lowest bounds, which together
+    cannot reach the k-th best score) and essential ones. Only documents of the essential terms' postings
+    are visited; a document found in non-essential postings alone cannot enter the top-k and is never
+    looked at. A visited document is first bounded with the terms it is known to hold, and its field
+    lengths are read only when that bound can still beat the k-th best score.
+
+    Args:
+        candidates (list | RoaringBitmap): Document IDs allowed in the result, in increasing order.
+        scorers (list): TermScorer of every query term.
+        limit (int): Number of results to keep.
+        stats (FieldStats): Field statistics, or None.
+        prune (bool): Use MaxScore; False scores every candidate (the reference behaviour).
+    """
+    if limit <= 0:
+        return []
+    # Terms by increasing upper bound; every score is summed in this order, so that equal scores stay equal
+    # whichever terms pruning skipped. bounds[i] is the best total the first i terms can add to a document.
+    scorers = sorted(scorers, key=lambda scorer: scorer.upper_bound)
+    bounds = [0.0]
+    for scorer in scorers:
+        bounds.append(bounds[-1] + scorer.upper_bound)
+
+    heap = []
+    remaining = iter(candidates)
+    last_doc_id = None
+
+    # Until every slot holds a document with a positive score, any candidate can enter: score them in order
+    for doc_id in remaining:
+        lengths = stats.lengths(doc_id) if stats else None
+        push(heap, limit, sum(scorer.score(doc_id, lengths) for scorer in scorers), doc_id)
+        last_doc_id = doc_id
+        if prune and len(heap) == limit and heap[0][0] > 0:
+            break
+    else:
+        return sorted(heap, reverse=True)
+
+    def non_essential_count(threshold):
+        count = 0
+        while count < len(scorers) and bounds[count + 1] < threshold:
+            count += 1
+        return count
+
+    essential_from = non_essential_count(heap[0][0])
+    positions = {}  # Term index -> next position in its document list, for the essential terms
+    while essential_from < len(scorers):
+        # Next document after last_doc_id in the postings of the essential terms
+        doc_id = None
+        for index in range(essential_from, len(scorers)):
+            doc_ids = scorers[index].doc_ids()
+            position = positions.get(index)
+            if position is None:
+                position = positions[index] = bisect_right(doc_ids, last_doc_id)
+            if position < len(doc_ids) and (doc_id is None or doc_ids[position] < doc_id):
+                doc_id = doc_ids[position]
+        if doc_id is None:
+            break
+        matched = []
+        for index in range(essential_from, len(scorers)):
+            doc_ids = scorers[index].doc_ids()
+            if positions[index] < len(doc_ids) and doc_ids[positions[index]] == doc_id:
+                positions[index] += 1
+                matched.append(index)
+        last_doc_id = doc_id
+        if not contains(candidates, doc_id):
+            continue
+
+        # Bound from the essential terms holding the document plus every non-essential term, before any lookup
+        threshold = heap[0][0]
+        if bounds[essential_from] + sum(scorers[index].upper_bound for index in matched) < threshold:
+            continue
+        lengths = stats.lengths(doc_id) if stats else None
+        parts = {index: scorers[index].score(doc_id, lengths) for index in matched}
+        score = sum(parts.values())
+        # Non-essential terms, highest bound first, while the document can still get in
+        for index in range(essential_from - 1, -1, -1):
+            if score + bounds[index + 1] < threshold:
+                break
+            parts[index] = scorers[index].score(doc_id, lengths)
+            score += parts[index]
+        else:
+            push(heap, limit, sum(parts[index] for index in sorted(parts)), doc_id)
+            essential_from = max(essential_from, non_essential_count(heap[0][0]))
+
+    return sorted(heap, reverse=True)
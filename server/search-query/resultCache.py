@@ -0,0 +1,218 @@
+import sys
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Add the '../barrel' folder to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'barrel'))
+
+from indexGeneration import GENERATION_FILE, current_generation
+
+# Query results are cached under (op, normalized query, limit, projection, index generation). An upload
+# bumps the generation, so entries of older generations simply stop matching and age out of the LRU.
+# The in-process tier is bounded by RESULT_CACHE_BYTES of serialized results; the file tier under
+# RESULT_CACHE_FOLDER is shared by every search worker and bounded by RESULT_CACHE_FILE_BYTES.
+RESULT_CACHE_BYTES = int(os.environ.get('BOLT_RESULT_CACHE_BYTES', 32 * 1024 * 1024))
+RESULT_CACHE_FILE_BYTES = int(os.environ.get('BOLT_RESULT_CACHE_FILE_BYTES', 256 * 1024 * 1024))
+RESULT_CACHE_FOLDER = os.environ.get('BOLT_RESULT_CACHE_FOLDER', './dataset/result_cache')
+# The file tier is trimmed once every this many writes
+FILE_TRIM_INTERVAL = 64
+
+
+def normalize_query(query):
+    """Collapses whitespace so equivalent spellings of a query share an entry (operators stay case-sensitive)."""
+    return ' '.join(str(query).split())
+
+
+def is_cacheable(result):
+    """Results and the "No results found." answer are cached; other errors are not."""
+    return isinstance(result, list) or result == {"error": "No results found."}
+
+
+class ResultCache:
+    """
+    Two-tier LRU cache of search results: an in-process OrderedDict bounded by serialized bytes,
+    backed by one JSON file per entry in a per-generation folder shared by all workers.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES, folder=RESULT_CACHE_FOLDER,
+                 max_file_bytes=RESULT_CACHE_FILE_BYTES, generation_file=GENERATION_FILE):
+        self.max_bytes = max_bytes
+        self.folder = folder
+        self.max_file_bytes = max_file_bytes
+        self.generation_file = generation_file
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (size, serialized result)
+        self.bytes = 0
+        self.file_writes = 0
+        self.last_generation = None
+        self.stats = {'hits': 0, 'file_hits': 0, 'misses': 0, 'evictions': 0, 'file_evictions': 0, 'stores': 0}
+
+    def _generation(self):
+        generation = current_generation(self.generation_file)
+        if generation != self.last_generation:
+            self.last_generation = generation
+            self._remove_stale_folders(generation)
+        return generation
+
+    def _generation_folder(self, generation):
+        return os.path.join(self.folder, f"g{generation}")
+
+    def _remove_stale_folders(self, generation):
+        # Files of older generations can never match again
+        if not self.folder or not os.path.isdir(self.folder):
+            return
+        current = f"g{generation}"
+        for name in os.listdir(self.folder):
+            if name.startswith('g') and name != current:
+                shutil.rmtree(os.path.join(self.folder, name), ignore_errors=True)
+
+    def _file_path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+        return os.path.join(self._generation_folder(key[-1]), digest + '.json')
+
+    def _read_file(self, key):
+        path = self._file_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored.get('key') != list(key):
+            return None  # Hash collision
+        try:
+            os.utime(path)  # Most recently used files survive trimming
+        except OSError:
+            pass
+        return json.dumps(stored['result'], default=str)
+
+    def _write_file(self, key, serialized):
+        path = self._file_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write('{"key": ' + json.dumps(list(key)) + ', "result": ' + serialized + '}')
+        os.replace(temp_path, path)
+
+        self.file_writes += 1
+        if self.file_writes % FILE_TRIM_INTERVAL == 0:
+            self._trim_files(os.path.dirname(path))
+
+    def _trim_files(self, folder):
+        # Remove the least recently used files until the folder fits the file budget
+        files = []
+        for entry in os.scandir(folder):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_file_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats['file_evictions'] += 1
+
+    def _store(self, key, serialized):
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[0]
+        self.entries[key] = (size, serialized)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (evicted_size, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.stats['evictions'] += 1
+
+    def get_or_compute(self, op, query, limit, compute, fields=None):
+        """
+        Returns the cached result of (op, query, limit, fields) at the current index generation,
+        or computes and caches it.
+
+        Args:
+            op (str): The daemon operation, e.g. 'query' or 'search'.
+            query (str): The raw query text.
+            limit (int): The result limit.
+            compute (callable): Computes the result on a miss.
+            fields (list): The normalized field projection, or None for every field.
+        """
+        key = (op, normalize_query(query), int(limit), ','.join(fields or []), self._generation())
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return json.loads(entry[1])
+
+        serialized = self._read_file(key) if self.folder else None
+        if serialized is not None:
+            with self.lock:
+                self.stats['file_hits'] += 1
+                self._store(key, serialized)
+            return json.loads(serialized)
+
+        with self.lock:
+            self.stats['misses'] += 1
+        result = compute()
+        if is_cacheable(result):
+            serialized = json.dumps(result, default=str)
+            with self.lock:
+                self.stats['stores'] += 1
+                self._store(key, serialized)
+            if self.folder:
+                try:
+                    self._write_file(key, serialized)
+                except OSError as e:
+                    print(f"Result cache write failed: {e}", file=sys.stderr)
+        return result
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters and the size of the in-process tier."""
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['file_hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': (self.stats['hits'] + self.stats['file_hits']) / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'generation': self.last_generation,
+            }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Returns the process-wide result cache."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
+
+
+if __name__ == "__main__":
+    # python search-query/resultCache.py [--clear]
+    if '--clear' in sys.argv[1:]:
+        shutil.rmtree(RESULT_CACHE_FOLDER, ignore_errors=True)
+        print(f"Removed {RESULT_CACHE_FOLDER}")
+    else:
+        print(f"Index generation: {current_generation()}")
+        if os.path.isdir(RESULT_CACHE_FOLDER):
+            for name in sorted(os.listdir(RESULT_CACHE_FOLDER)):
+                folder = os.path.join(RESULT_CACHE_FOLDER, name)
+                files = [entry for entry in os.scandir(folder) if entry.name.endswith('.json')]
+                print(f"{name}: {len(files)} entries, {sum(entry.stat().st_size for entry in files)} bytes")
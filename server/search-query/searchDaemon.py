@@ -0,0 +1,156 @@
+import sys
+import os
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Make the sibling modules importable regardless of how the daemon is started
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from searchDos import searchWord, resident_stats
+from queryEngine import searchQuery
+from suggest import suggest, get_trie
+from fuzzy import get_fuzzy_index
+from documents_parser import field_projection
+from resultCache import get_result_cache
+from metrics import count, observe, snapshot, span, trace
+from columnStore import block_cache_stats
+from slowQueryLog import is_slow, log_slow_query, query_plan
+
+# Number of requests served concurrently by one daemon process
+SEARCH_THREADS = int(os.environ.get('BOLT_SEARCH_THREADS', 4))
+# Ops whose latency is recorded as a 'request.<op>' stage
+TIMED_OPS = ('search', 'query', 'suggest')
+
+
+def metrics_snapshot():
+    """The metrics of this worker: stage histograms and counters, plus the cache counters and sizes."""
+    current = snapshot()
+    cache = get_result_cache().cache_stats()
+    for name in ('hits', 'file_hits', 'misses', 'evictions', 'file_evictions', 'stores'):
+        current['counters'][f"result_cache_{name}"] = cache[name]
+    # The document block cache hits and misses are counted per request by the fetch (see read_barrel)
+    blocks = block_cache_stats()
+    current['gauges'] = {
+        'result_cache_entries': cache['entries'],
+        'result_cache_bytes': cache['bytes'],
+        'document_block_cache_bytes': blocks['bytes'],
+        **resident_stats(),
+    }
+    return current
+
+
+def explain(op, query, limit, compute):
+    """Runs a search outside the result cache, so every stage executes, and returns its plan."""
+    with trace() as request_trace:
+        result = compute()
+    return query_plan(request_trace, op, query, limit, result)
+
+
+def handle_request(request):
+    """
+    Executes a single protocol request and returns the response payload.
+
+    Requests are JSON objects such as {"id": 1, "op": "query", "query": "python -java", "limit": 30}
+    or {"id": 2, "op": "search", "word": "python", "limit": 30}; both accept an optional "fields" projection
+    such as ["Id", "Title", "Score"] so result lists skip the Body / Answer blobs. Search and query results are served
+    from the result cache while the index generation is unchanged; {"op": "cache_stats"} returns its counters.
+    {"op": "metrics"} returns the stage histograms and counters of this worker (see barrel/metrics.py).
+    With "explain": true a search or query runs uncached and returns its plan (slowQueryLog.query_plan) instead of results.
+    """
+    op = request.get('op', 'search')
+    if op == 'ping':
+        return {"result": "pong"}
+    if op == 'search':
+        word = request.get('word')
+        if not word:
+            return {"error": "Missing 'word' in search request."}
+        limit = int(request.get('limit') or 30)
+        fields = field_projection(request.get('fields'))
+        if request.get('explain'):
+            return {"result": explain(op, word, limit, lambda: searchWord(word, limit, fields))}
+        return {"result": get_result_cache().get_or_compute(
+            op, word, limit, lambda: searchWord(word, limit, fields), fields
+        )}
+    if op == 'query':
+        query = request.get('query')
+        if not query:
+            return {"error": "Missing 'query' in query request."}
+        limit = int(request.get('limit') or 30)
+        fields = field_projection(request.get('fields'))
+        if request.get('explain'):
+            return {"result": explain(op, query, limit, lambda: searchQuery(query, limit, fields))}
+        return {"result": get_result_cache().get_or_compute(
+            op, query, limit, lambda: searchQuery(query, limit, fields), fields
+        )}
+    if op == 'suggest':
+        limit = int(request.get('limit') or 10)
+        return {"result": suggest(request.get('prefix'), limit)}
+    if op == 'cache_stats':
+        return {"result": get_result_cache().cache_stats()}
+    if op == 'metrics':
+        return {"result": metrics_snapshot()}
+    return {"error": f"Unknown op '{op}'."}
+
+
+def serve(input_stream, output_stream):
+    """
+    Serves line-delimited JSON requests from input_stream until it is closed.
+    Each response is one JSON line carrying the "id" of its request, so responses may arrive out of order.
+    A request with "timings": true also gets the per-stage breakdown of its own execution in "timings".
+    """
+    write_lock = threading.Lock()
+
+    def respond(request_id, payload):
+        payload['id'] = request_id
+        with span('request.encode'):
+            line = json.dumps(payload, default=str)
+        with write_lock:
+            output_stream.write(line + '\n')
+            output_stream.flush()
+
+    def run(request):
+        op = request.get('op', 'search')
+        started = time.perf_counter()
+        with trace() as request_trace:
+            try:
+                payload = handle_request(request)
+            except Exception as e:
+                payload = {"error": f"An unexpected error occurred: {e}"}
+        elapsed = time.perf_counter() - started
+        if op in TIMED_OPS:
+            observe(f"request.{op}", elapsed)
+        if op in ('search', 'query') and not request.get('explain') and is_slow(elapsed * 1000):
+            count('slow_queries')
+            log_slow_query(query_plan(
+                request_trace, op, request.get('query') or request.get('word'), request.get('limit'),
+                payload.get('result', payload),
+            ))
+        if 'error' in payload:
+            count('request_errors')
+        if request.get('timings'):
+            payload['timings'] = request_trace.breakdown()
+        respond(request.get('id'), payload)
+
+    with ThreadPoolExecutor(max_workers=SEARCH_THREADS) as executor:
+        for line in input_stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                respond(None, {"error": f"Invalid request: {e}"})
+                continue
+            executor.submit(run, request)
+
+
+if __name__ == "__main__":
+    # Keep stdout for the protocol only; stray prints from the search code go to stderr
+    protocol_output = sys.stdout
+    sys.stdout = sys.stderr
+    # Build the completion trie and load the fuzzy index in the background so the first lookups are fast
+    threading.Thread(target=get_trie, daemon=True).start()
+    threading.Thread(target=get_fuzzy_index, daemon=True).start()
+    serve(sys.stdin, protocol_output)
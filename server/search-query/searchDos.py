@@ -1,123 +1,434 @@
 import sys
 import os
-import pandas as pd
-from collections import defaultdict
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, OrderedDict
 import json
 import documents_parser as dp
 
 # Add the '../lemmatizer' folder to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lemmatizer'))
 
+# Add the '../barrel' and '../Barrels' folders to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'barrel'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Barrels'))
+
 # Import custom lemmatizer functions
-from lemmatizerfunctions import lemmatize_word, wordToken
+from lemmatizerfunctions import lemmatize_word, termToken
+from binaryBarrels import BinaryBarrel
+from barrelManifest import load_manifest, manifest_path
+from indexGeneration import current_generation, generation_file
+from segments import get_segments
+from documentIndex import document_barrel_name, read_documents
+from columnStore import OutdatedColumnStore, has_column_store, read_columns
+from ranking import TermScorer, get_field_stats, top_k
+from fuzzy import corrections
+from bitmaps import RoaringBitmap
+from metrics import count, note, note_item, observe, span
 
-def searchWord():
-    try:
-        word = sys.argv[1]
-        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 30  # Default to 30 if no limit is provided
+token_barrel_folder = './dataset/barrels'
+document_barrel_folder = './dataset/DocumentBarrels'
+segment_folder = './dataset/segments'
+
+# Number of parsed token barrels kept in memory when running inside searchDaemon.py
+HOT_BARREL_LIMIT = int(os.environ.get('BOLT_HOT_BARRELS', 64))
+# Field posting lists of at least BITMAP_DF documents are kept resident as compressed bitmaps,
+# up to BITMAP_CACHE_BYTES in total, until the index generation changes
+BITMAP_DF = int(os.environ.get('BOLT_BITMAP_DF', 5000))
+BITMAP_CACHE_BYTES = int(os.environ.get('BOLT_BITMAP_CACHE_BYTES', 64 * 1024 * 1024))
+# DocumentBarrels of one result page are read concurrently by a pool of this many threads, shared by
+# every request of the process; 1 reads them one after another on the request thread
+FETCH_THREADS = int(os.environ.get('BOLT_FETCH_THREADS', 8))
+
+# Resident state shared by every searchWord call of a long-lived process
+_cache_lock = threading.Lock()
+_barrel_manifest = {'mtime': None, 'manifest': None}
+_hot_barrels = OrderedDict()  # file_path -> (mtime, token_dict)
+_hot_bitmaps = OrderedDict()  # token -> (generation, bytes, field postings)
+_hot_bitmap_bytes = [0]
+_fetch_pool = [None]
+
+
+def get_barrel_manifest(folder):
+    """
+    Returns the barrel manifest of the folder, keeping it resident until the manifest file changes.
+    """
+    path = manifest_path(folder)
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    with _cache_lock:
+        if mtime is not None and _barrel_manifest['mtime'] == mtime:
+            return _barrel_manifest['manifest']
+
+    manifest = load_manifest(folder)  # Builds and saves the manifest when it is missing
+    with _cache_lock:
+        _barrel_manifest['mtime'] = os.path.getmtime(path)
+        _barrel_manifest['manifest'] = manifest
+    return manifest
+
+
+def load_token_barrel(file_path):
+    """
+    Returns a token barrel ready for lookups: a memory-mapped BinaryBarrel for '.bin' files,
+    otherwise the Token_ID -> Document_IDs dictionary of the CSV.
+    Loaded barrels stay resident (least recently used first out) until the file changes on disk.
+    """
+    mtime = os.path.getmtime(file_path)
+    with _cache_lock:
+        cached = _hot_barrels.get(file_path)
+        if cached and cached[0] == mtime:
+            _hot_barrels.move_to_end(file_path)
+            count('barrel_cache_hits')
+            return cached[1]
+
+    count('barrels_opened')
+    with span('search.barrel_load'):
+        if file_path.endswith('.bin'):
+            token_dict = BinaryBarrel(file_path)
+        else:
+            import pandas as pd  # Only CSV barrels need pandas, so binary-only setups start faster
+
+            # Read the CSV file and create a dictionary for token lookups
+            df = pd.read_csv(file_path)
+            count('barrel_bytes_read', os.path.getsize(file_path))
+            token_dict = defaultdict(str)
+            for _, row in df.iterrows():
+                token_dict[str(row['Token_ID'])] = row['Document_IDs']
+
+    with _cache_lock:
+        _hot_barrels[file_path] = (mtime, token_dict)
+        _hot_barrels.move_to_end(file_path)
+        while len(_hot_barrels) > HOT_BARREL_LIMIT:
+            _hot_barrels.popitem(last=False)
+    return token_dict
+
+
+def resident_stats():
+    """Sizes of the resident barrel and bitmap caches of this process."""
+    with _cache_lock:
+        return {'hot_barrels': len(_hot_barrels), 'hot_bitmaps': len(_hot_bitmaps), 'hot_bitmap_bytes': _hot_bitmap_bytes[0]}
 
-        # Step 1: Lemmatize and tokenize the word
+
+def token_postings(token_dict, token):
+    """Returns the document IDs (as strings) stored for a Token_ID in a loaded token barrel."""
+    if isinstance(token_dict, BinaryBarrel):
+        postings = [str(doc_id) for doc_id in token_dict.lookup(token)]
+    elif token in token_dict:
+        postings = str(token_dict[token]).split(',')
+    else:
+        postings = []
+    count('postings_decoded', len(postings))
+    return postings
+
+
+class SearchError(Exception):
+    """Raised when the dataset folders needed by a search are missing."""
+
+
+def word_token(word):
+    """Lemmatizes a raw query word and returns its Token_ID string, or None for an invalid word."""
+    with span('search.lemmatize'):
         lemmatized_word = lemmatize_word(word)
-        token = wordToken(lemmatized_word)
-
-        if not token:
-            return json.dumps({"error": "Invalid token generated from the word."})
-
-        # Step 2: Search for relevant token barrel files
-        token_barrel_folder = './dataset/barrels'
-        if not os.path.isdir(token_barrel_folder):
-            return json.dumps({"error": f"Token barrel folder '{token_barrel_folder}' does not exist."})
-
-        found_token_files = []
-        for file in os.listdir(token_barrel_folder):
-            if '-' in file:
-                try:
-                    # Extract start and end ranges, removing any extra spaces or file extensions
-                    start, end = file.split('-')
-                    start = start.strip().split('.')[0]  # Remove trailing file extensions, if any
-                    end = end.strip().split('.')[0]
-
-                    # Check if the token falls within the range
-                    if int(start) <= int(token) <= int(end):
-                        found_token_files.append(file)
-                except ValueError:
-                    pass  # Skip invalid files
-
-        document_ids = []
-        opened_files = {}  # Cache to store opened files and their data
-
-        for file in found_token_files:
-            file_path = os.path.join(token_barrel_folder, file)
-
-            if os.path.isfile(file_path) and os.path.getsize(file_path) > 0:
-                # Check if the file has already been opened and cached
-                if file_path not in opened_files:
-                    try:
-                        # Read the CSV file and store its data in the cache
-                        df = pd.read_csv(file_path)
-
-                        # Create a dictionary for token lookups
-                        token_dict = defaultdict(str)
-                        for _, row in df.iterrows():
-                            token_dict[str(row['Token_ID'])] = row['Document_IDs']
-
-                        # Cache the token_dict for future use
-                        opened_files[file_path] = token_dict
-                    except Exception as e:
-                        print(f"Error reading file {file_path}: {e}")  # Log the specific error for file reading
-                        continue
-
-                # Use the cached token_dict to search for tokens
-                token_dict = opened_files[file_path]
-                if token in token_dict:
-                    document_ids.extend(token_dict[token].split(','))
-                if f"{token}#" in token_dict:
-                    document_ids.extend(token_dict[f"{token}#"].split(','))
-
-        # Step 4: Search for documents in corresponding document barrels
-        document_barrel_folder = './dataset/DocumentBarrels'
-        if not os.path.isdir(document_barrel_folder):
-            return json.dumps({"error": f"Document barrel folder '{document_barrel_folder}' does not exist."})
-
-        results = []
-        document_ids = list(set(document_ids))  # Remove duplicates
-        document_ids = document_ids[:limit]  # Apply the limit
-
-        if document_ids:
-            for doc_id in document_ids:
-                barrel_file = f"barrel_{(int(doc_id) // 4000) * 4000}_to_{(int(doc_id) // 4000) * 4000 + 3999}.csv"
-                file_path = os.path.join(document_barrel_folder, barrel_file)
-
-                if os.path.isfile(file_path) and os.path.getsize(file_path) > 0:
-                    try:
-                        # Read the document barrel file
-                        df = pd.read_csv(file_path)
-
-                        # Filter for the document ID
-                        matching_docs = df[df['Id'] == int(doc_id)]
-                        if not matching_docs.empty:
-                            # Clean the data to remove NaN values
-                            cleaned_docs = matching_docs.where(pd.notnull(matching_docs), None)
-                            ranked_docs = dp.final_Documents(cleaned_docs)
-                            results.extend(ranked_docs)  # Add results (list of dicts)
-
-                    except Exception as e:
-                        print(f"Error reading document barrel file {file_path}: {e}")  # Log the error for document barrel files
+        token = termToken(lemmatized_word)  # None for words the lexicon has never seen
+    note_item('terms', {'word': word, 'lemma': lemmatized_word, 'token': str(token) if token else None})
+    return str(token) if token else None
+
+
+def token_field_postings(token):
+    """
+    Returns the document IDs of a Token_ID per field: {'tag': ..., 'title': ...}.
+    Lists shorter than BITMAP_DF are sorted lists of ints; longer ones are resident RoaringBitmaps.
+    """
+    generation = current_generation(generation_file(token_barrel_folder))
+    with _cache_lock:
+        cached = _hot_bitmaps.get(token)
+        if cached and cached[0] == generation:
+            _hot_bitmaps.move_to_end(token)
+            count('bitmap_cache_hits')
+            note_item('postings', {'token': token, 'source': 'bitmap cache',
+                                   **{field: len(postings) for field, postings in cached[2].items()}})
+            return cached[2]
+
+    with span('search.postings'):
+        field_postings = read_field_postings(token)
+    if max(len(postings) for postings in field_postings.values()) < BITMAP_DF:
+        return field_postings
+
+    field_postings = {
+        field: RoaringBitmap.from_sorted(postings) if len(postings) >= BITMAP_DF else postings
+        for field, postings in field_postings.items()
+    }
+    size = sum(
+        postings.memory_bytes() if isinstance(postings, RoaringBitmap) else 8 * len(postings)
+        for postings in field_postings.values()
+    )
+    with _cache_lock:
+        if token in _hot_bitmaps:
+            _hot_bitmap_bytes[0] -= _hot_bitmaps.pop(token)[1]
+        _hot_bitmaps[token] = (generation, size, field_postings)
+        _hot_bitmap_bytes[0] += size
+        while _hot_bitmap_bytes[0] > BITMAP_CACHE_BYTES and len(_hot_bitmaps) > 1:
+            _hot_bitmap_bytes[0] -= _hot_bitmaps.popitem(last=False)[1][1]
+    return field_postings
+
+
+def read_field_postings(token):
+    """
+    Reads the sorted document IDs (ints) of a Token_ID per field from every barrel whose range holds it:
+    {'tag': [...], 'title': [...]} where title postings are stored under the '#'-suffixed Token_ID.
+    """
+    if not os.path.isdir(token_barrel_folder):
+        raise SearchError(f"Token barrel folder '{token_barrel_folder}' does not exist.")
+
+    # Bisect the barrel manifest for the ranges that hold the token
+    with span('search.manifest'):
+        found_token_files = [barrel['file'] for barrel in get_barrel_manifest(token_barrel_folder).find(token)]
+
+    field_ids = {'tag': set(), 'title': set()}
+    for file in found_token_files:
+        file_path = os.path.join(token_barrel_folder, file)
+
+        if os.path.isfile(file_path) and os.path.getsize(file_path) > 0:
+            try:
+                token_dict = load_token_barrel(file_path)
+            except Exception as e:
+                print(f"Error reading file {file_path}: {e}", file=sys.stderr)  # Log the specific error for file reading
+                continue
+
+            for field, field_token in (('tag', token), ('title', f"{token}#")):
+                for doc_id in token_postings(token_dict, field_token):
+                    doc_id = doc_id.strip()
+                    if doc_id:
+                        try:
+                            field_ids[field].add(int(float(doc_id)))
+                        except ValueError:
+                            pass  # Skip 'nan' and other junk
+
+    # Uploads not yet folded into the barrels live in small segments
+    with span('search.segments'):
+        segments = get_segments(segment_folder)
+        for field, field_token in (('tag', token), ('title', f"{token}#")):
+            field_ids[field].update(segments.lookup(field_token))
+    note_item('postings', {'token': token, 'source': 'barrels', 'barrels': found_token_files,
+                           **{field: len(doc_ids) for field, doc_ids in field_ids.items()}})
+    return {field: sorted(doc_ids) for field, doc_ids in field_ids.items()}
+
+
+def has_postings(field_postings):
+    return bool(field_postings['title'] or field_postings['tag'])
+
+
+def word_terms(word, fuzzy=True):
+    """
+    Returns the (Token_ID, field postings, ranking weight) terms a raw query word matches:
+    the word itself, or, when it has no postings and fuzzy is set, its closest spelling
+    corrections from the symmetric-delete index, weighted down by edit distance.
+    """
+    token = word_token(word)
+    field_postings = token_field_postings(token) if token else None
+    if field_postings and has_postings(field_postings):
+        return [(token, field_postings, 1.0)]
+    if not fuzzy:
+        return []
+
+    with span('search.fuzzy'):
+        candidates = corrections(lemmatize_word(word))
+    terms = []
+    for term, distance, weight in candidates:
+        corrected_token = termToken(term)
+        if not corrected_token:
+            continue
+        corrected_postings = token_field_postings(str(corrected_token))
+        if has_postings(corrected_postings):
+            print(f"Corrected '{word}' to '{term}' (distance {distance})", file=sys.stderr)
+            note_item('corrections', {'word': word, 'term': term, 'token': str(corrected_token),
+                                      'distance': distance, 'weight': weight})
+            terms.append((str(corrected_token), corrected_postings, weight))
+    return terms
+
+
+def token_document_ids(token):
+    """Returns the sorted document IDs (ints) holding a Token_ID in any field."""
+    field_postings = token_field_postings(token)
+    return sorted(set(field_postings['tag']) | set(field_postings['title']))
+
+
+def fetch_documents(document_ids, fields=None):
+    """
+    Reads the given documents from the DocumentBarrels, keeping the order of document_ids.
+    Rows come from the memory-mapped column store of each barrel, so a projection without
+    Body / Answer never reads the blob files; the CSV offset index is the fallback.
+    The barrels of a page are read concurrently (see read_barrel_documents).
+
+    Args:
+        document_ids (list): Document IDs to fetch.
+        fields (list): Projection from documents_parser.field_projection, or None for every field.
+    """
+    if not os.path.isdir(document_barrel_folder):
+        raise SearchError(f"Document barrel folder '{document_barrel_folder}' does not exist.")
+
+    # Group the hits by DocumentBarrel so each barrel is opened once
+    hits_by_barrel = OrderedDict()
+    for doc_id in document_ids:
+        hits_by_barrel.setdefault(document_barrel_name(doc_id), []).append(str(doc_id))
+
+    count('document_barrels_opened', len(hits_by_barrel))
+    note('document_barrels', list(hits_by_barrel))
+    # Time the request spends blocked on the barrel reads, however many run at once
+    with span('fetch.io_wait'):
+        found_documents = read_barrel_documents(hits_by_barrel, fields)
+
+    # Documents of live segments are not in the DocumentBarrels until the compactor folds them
+    missing = [str(doc_id) for doc_id in document_ids if str(doc_id) not in found_documents]
+    if missing:
+        with span('fetch.segments'):
+            found_documents.update(get_segments(segment_folder).read_documents(missing))
+
+    with span('fetch.format'):
+        results = [
+            dp.final_Document(found_documents[str(doc_id)], fields)
+            for doc_id in document_ids if str(doc_id) in found_documents
+        ]
+    count('documents_fetched', len(results))
+    note('documents_fetched', len(results))
+    count('document_bytes_read', sum(
+        len(value) for document in found_documents.values() for value in document.values() if isinstance(value, str)
+    ))
+    return results
+
+
+def get_fetch_pool():
+    """The bounded thread pool of the document reads, started on first use."""
+    with _cache_lock:
+        if _fetch_pool[0] is None:
+            _fetch_pool[0] = ThreadPoolExecutor(max_workers=FETCH_THREADS, thread_name_prefix='document-fetch')
+        return _fetch_pool[0]
+
+
+def read_barrel(barrel_file, barrel_doc_ids, fields):
+    """
+    Reads the hits of one DocumentBarrel. It may run on a fetch pool thread, outside the request's trace,
+    so its counters are returned for the request thread to record.
+
+    Returns:
+        tuple: ({doc ID (str): row}, seconds spent, error message or None, {counter name: value})
+    """
+    started = time.perf_counter()
+    file_path = os.path.join(document_barrel_folder, barrel_file)
+    documents = {}
+    error = None
+    counters = {}
+
+    # A migrated barrel may only exist as its column store (see Barrels/migrateDocumentStore.py). Stores are
+    # never built here: until the ingest or the compactor has (re)built one, the CSV is read as it is
+    if has_column_store(file_path):
+        try:
+            documents = read_columns(file_path, barrel_doc_ids, fields or dp.DOCUMENT_FIELDS, counters)
+            return documents, time.perf_counter() - started, None, counters
+        except OutdatedColumnStore:
+            counters['column_store_fallbacks'] = 1
+        except Exception as e:
+            error = f"Error reading column store of {file_path}: {e}"
+            print(error, file=sys.stderr)
+    if os.path.isfile(file_path) and os.path.getsize(file_path) > 0:
+        try:
+            # Seek straight to the indexed rows instead of parsing the whole barrel
+            documents = read_documents(file_path, barrel_doc_ids)
+            error = None
+        except Exception as e:
+            error = f"Error reading document barrel file {file_path}: {e}"
+            print(error, file=sys.stderr)  # Log the error for document barrel files
+    return documents, time.perf_counter() - started, error, counters
+
+
+def read_barrel_documents(hits_by_barrel, fields):
+    """
+    Reads the hits of each DocumentBarrel: {barrel file: [doc IDs]} -> {doc ID (str): row}.
+    Several barrels are read concurrently on the fetch pool (at most FETCH_THREADS at a time);
+    a barrel that fails only loses its own documents.
+    """
+    barrels = list(hits_by_barrel.items())
+    if FETCH_THREADS > 1 and len(barrels) > 1:
+        pool = get_fetch_pool()
+        futures = [pool.submit(read_barrel, barrel_file, doc_ids, fields) for barrel_file, doc_ids in barrels]
+        reads = []
+        for (barrel_file, _), future in zip(barrels, futures):
+            try:
+                reads.append(future.result())
+            except Exception as e:
+                reads.append(({}, 0.0, f"Error reading {barrel_file}: {e}", {}))
+                print(reads[-1][2], file=sys.stderr)
+    else:
+        reads = [read_barrel(barrel_file, doc_ids, fields) for barrel_file, doc_ids in barrels]
+    note('fetch_threads', min(FETCH_THREADS, len(barrels)))
+
+    found_documents = {}
+    for (barrel_file, _), (documents, seconds, error, counters) in zip(barrels, reads):
+        # Recorded here rather than on the pool threads so the reads show up in the request breakdown
+        observe('fetch.barrel_read', seconds)
+        for name, value in counters.items():
+            count(name, value)
+        if error:
+            count('document_barrel_errors')
+            note_item('barrel_errors', {'barrel': barrel_file, 'error': error})
+        found_documents.update(documents)
+    return found_documents
+
+
+def searchWord(word, limit=30, fields=None):
+    """
+    Searches the barrels for a single word.
+
+    Args:
+        word (str): The raw query word.
+        limit (int): Maximum number of documents to return.
+        fields (str | list): Optional projection, e.g. "Id,Title,Score"; every field by default.
+
+    Returns:
+        list | dict: The matching documents, or a dict with an "error" key.
+    """
+    try:
+        # Step 1: Lemmatize and tokenize the word, falling back to spelling corrections
+        terms = word_terms(word)
+        if not terms:
+            return {"error": "No results found."}
+
+        # Step 2: Collect the document IDs of the terms from the matching barrels
+        document_ids = sorted({
+            doc_id for _, field_postings, _ in terms
+            for postings in (field_postings['tag'], field_postings['title'])
+            for doc_id in postings
+        })
+
+        # Step 3: Rank with BM25F before applying the limit
+        with span('search.rank'):
+            stats = get_field_stats()
+            scorers = [TermScorer(int(token), field_postings, stats, weight) for token, field_postings, weight in terms]
+            ranked = top_k(document_ids, scorers, limit, stats)
+        note('candidates', len(document_ids))
+        note('ranked', len(ranked))
+
+        # Step 4: Fetch the documents from the corresponding document barrels
+        results = fetch_documents([doc_id for _, doc_id in ranked], dp.field_projection(fields))
 
         if results:
-            return json.dumps(results)  # Return the results as JSON
+            return results
         else:
-            return json.dumps({"error": "No results found."})
+            return {"error": "No results found."}
 
+    except SearchError as e:
+        return {"error": str(e)}
     except Exception as e:
-        print(f"Unexpected error: {e}")
-        return json.dumps({"error": f"An unexpected error occurred: {e}"})
+        print(f"Unexpected error: {e}", file=sys.stderr)
+        return {"error": f"An unexpected error occurred: {e}"}
 
 
 # Entry point
 if __name__ == "__main__":
     try:
-        results = searchWord()
-        print(results)  # Print results to stdout (this is what your server will capture)
+        word = sys.argv[1]
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 30  # Default to 30 if no limit is provided
+        results = searchWord(word, limit)
+        print(json.dumps(results))  # Print results to stdout (this is what your server will capture)
     except Exception as e:
         print(json.dumps({"error": f"An unexpected error occurred: {e}"}))
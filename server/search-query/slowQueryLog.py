@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import time
+import threading
+
+# Opt-in log of slow searches: with BOLT_SLOW_QUERY_MS set, every search or query taking at least that
+# many milliseconds appends its plan (see query_plan) as one JSON line to SLOW_QUERY_LOG.
+SLOW_QUERY_MS = float(os.environ.get('BOLT_SLOW_QUERY_MS', 0))
+SLOW_QUERY_LOG = os.environ.get('BOLT_SLOW_QUERY_LOG', './dataset/slow_queries.log')
+
+_log_lock = threading.Lock()
+
+
+def query_plan(request_trace, op, query, limit, result):
+    """
+    EXPLAIN-style description of how a search ran, from the notes and spans of its trace:
+    the normalized terms and chosen Token_IDs, corrections, the barrels and posting-list sizes
+    of every term, candidate counts before and after intersection, documents fetched and stage times.
+
+    Args:
+        request_trace (RequestTrace): The trace the search ran in (barrel/metrics.py).
+        op (str): 'search' or 'query'.
+        query (str): The raw word or query.
+        limit (int): The requested number of results.
+        result (list | dict): What the search returned.
+    """
+    breakdown = request_trace.breakdown()
+    plan = {'op': op, 'query': query, 'limit': limit}
+    plan.update(request_trace.plan)
+    if isinstance(result, list):
+        plan['results'] = len(result)
+    else:
+        plan['error'] = result.get('error')
+    plan['total_ms'] = breakdown['total_ms']
+    plan['stages'] = breakdown['stages']
+    plan['counters'] = breakdown['counters']
+    return plan
+
+
+def is_slow(elapsed_ms, threshold_ms=None):
+    threshold_ms = SLOW_QUERY_MS if threshold_ms is None else threshold_ms
+    return threshold_ms > 0 and elapsed_ms >= threshold_ms
+
+
+def log_slow_query(plan, path=None):
+    """Appends a plan to the slow-query log, one JSON object per line."""
+    path = path or SLOW_QUERY_LOG
+    entry = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), **plan}
+    line = json.dumps(entry, default=str) + '\n'
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _log_lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(line)  # A single append per entry, so lines of concurrent workers do not interleave
+    except OSError as e:
+        print(f"Error writing slow query log {path}: {e}", file=sys.stderr)
+
+
+def read_slow_queries(path=None):
+    entries = []
+    with open(path or SLOW_QUERY_LOG, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # A line cut short by a crash
+    return entries
+
+
+if __name__ == "__main__":
+    # python search-query/slowQueryLog.py [log file] [--top N]: the slowest logged searches and their costliest stages
+    arguments = sys.argv[1:]
+    top = int(arguments[arguments.index('--top') + 1]) if '--top' in arguments else 10
+    positional = [argument for index, argument in enumerate(arguments)
+                  if not argument.startswith('--') and (index == 0 or arguments[index - 1] != '--top')]
+    entries = sorted(read_slow_queries(positional[0] if positional else None), key=lambda entry: -entry['total_ms'])
+    for entry in entries[:top]:
+        stages = sorted(entry.get('stages', {}).items(), key=lambda item: -item[1]['ms'])[:3]
+        print(f"{entry['total_ms']:9.1f}ms  {entry['op']} {entry['query']!r}: {entry.get('candidates', 0)} candidates, "
+              f"{len(entry.get('postings', []))} posting lookups, {entry.get('documents_fetched', 0)} documents; "
+              + ', '.join(f"{stage} {timing['ms']:.1f}ms" for stage, timing in stages))
@@ -0,0 +1,128 @@
+import sys
+import os
+import csv
+import threading
+from bisect import bisect_left
+
+# Add the '../InvertedIndexer' and '../lemmatizer' folders to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'InvertedIndexer'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lemmatizer'))
+
+from fieldStats import DEFAULT_STATS_DIR
+from ranking import get_field_stats
+from lemmatizerfunctions import termToken
+
+VOCABULARY_FILE = './dataset/lt1.csv'
+# Completions precomputed per trie node
+TOP_COMPLETIONS = 10
+
+_trie_lock = threading.Lock()
+_trie = {'mtime': None, 'trie': None}
+
+
+class CompletionTrie:
+    """
+    Compact completion trie over the vocabulary.
+
+    Only "heavy" nodes (prefixes with more than `top` completions) are materialised, each holding its
+    precomputed best completions, so popular prefixes are a single O(len(prefix)) lookup. Lighter
+    prefixes cover at most `top` terms, found by bisecting the alphabetically sorted vocabulary.
+    """
+
+    def __init__(self, term_frequencies, top=TOP_COMPLETIONS):
+        # Rank order: document frequency, then alphabetical
+        ranked = sorted(term_frequencies.items(), key=lambda item: (-item[1], item[0]))
+        self.terms = [term for term, _ in ranked]
+        self.frequencies = [frequency for _, frequency in ranked]
+        self.rank = {term: index for index, term in enumerate(self.terms)}
+        self.sorted_terms = sorted(self.terms)
+
+        # Count completions per prefix to find the heavy nodes
+        counts = {}
+        for term in self.terms:
+            for end in range(len(term) + 1):
+                prefix = term[:end]
+                counts[prefix] = counts.get(prefix, 0) + 1
+        heavy = {prefix for prefix, count in counts.items() if count > top}
+        del counts
+
+        # Visiting terms in rank order fills every heavy node with exactly its best completions
+        nodes = {prefix: [] for prefix in heavy}
+        for index, term in enumerate(self.terms):
+            for end in range(len(term) + 1):
+                completions = nodes.get(term[:end])
+                if completions is not None and len(completions) < top:
+                    completions.append(index)
+        self.nodes = {prefix: tuple(completions) for prefix, completions in nodes.items()}
+
+    def complete(self, prefix, limit=TOP_COMPLETIONS):
+        """Returns up to limit [term, document frequency] pairs starting with prefix, most frequent first."""
+        prefix = prefix.lower()
+        completions = self.nodes.get(prefix)
+        if completions is None:
+            low = bisect_left(self.sorted_terms, prefix)
+            high = bisect_left(self.sorted_terms, prefix + '\U0010ffff', low)
+            completions = sorted(self.rank[term] for term in self.sorted_terms[low:high])
+        return [[self.terms[index], self.frequencies[index]] for index in completions[:limit]]
+
+
+def load_term_frequencies(vocabulary_file=VOCABULARY_FILE, stats_dir=DEFAULT_STATS_DIR):
+    """
+    Reads the lemmatized vocabulary (lt1.csv) and weights every term by its document frequency
+    from the index-build field statistics (1 when they are missing).
+
+    The df is looked up under the term's ID in the lexicon, which is what the index is built with;
+    lt1.csv's own 'id' column may still hold the wordToken IDs from before the lexicon, so it is
+    only used for terms the lexicon does not know.
+    """
+    stats = get_field_stats(stats_dir)
+
+    csv.field_size_limit(2**31 - 1)
+    frequencies = {}
+    with open(vocabulary_file, 'r', encoding='ISO-8859-1', newline='') as f:
+        for row in csv.DictReader(f):
+            term = (row.get('lemmatizedtag') or '').strip().lower()
+            if not term:
+                continue
+            frequency = None
+            term_id = termToken(term)
+            if term_id is None:
+                try:
+                    term_id = int(str(row.get('id', '')).strip().rstrip('#'))
+                except ValueError:
+                    pass  # Malformed id; keep the term with the default weight
+            if term_id is not None and stats:
+                frequency = stats.document_frequency(term_id)
+            frequencies[term] = max(frequencies.get(term, 0), frequency or 1)
+    return frequencies
+
+
+def get_trie(vocabulary_file=VOCABULARY_FILE):
+    """Returns the resident completion trie, rebuilding it when the vocabulary file changes."""
+    if not os.path.exists(vocabulary_file):
+        return None
+    mtime = os.path.getmtime(vocabulary_file)
+    with _trie_lock:
+        if _trie['mtime'] == mtime:
+            return _trie['trie']
+    trie = CompletionTrie(load_term_frequencies(vocabulary_file))
+    with _trie_lock:
+        _trie['mtime'] = mtime
+        _trie['trie'] = trie
+    return trie
+
+
+def suggest(prefix, limit=TOP_COMPLETIONS):
+    """
+    Returns the completions of a prefix.
+
+    Returns:
+        list | dict: [term, document frequency] pairs, or a dict with an "error" key.
+    """
+    prefix = (prefix or '').strip().lower()
+    if not prefix:
+        return []
+    trie = get_trie()
+    if trie is None:
+        return {"error": f"Vocabulary file '{VOCABULARY_FILE}' does not exist."}
+    return trie.complete(prefix, min(limit, TOP_COMPLETIONS))